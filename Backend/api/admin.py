@@ -1,12 +1,291 @@
-from django.contrib import admin
+import calendar
+from datetime import date, datetime, timedelta
 
+from django.conf import settings
 from django.contrib import admin
-from .models import Review, Payment
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Q
+from django.utils import formats, timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from django.utils.text import capfirst
+from django.utils.translation import gettext
+
+from .models import ArchivedPayment, Review, Payment, WebhookEvent
 
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ("author_name", "rating", "created_at")
 
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for tables too large to COUNT(*) on every page load.
+
+    The unfiltered list reports an estimate of the table size; a filtered list
+    counts at most `count_limit` matching rows. `count_kind` says which one
+    `count` is ("exact", "estimate" or "limit") so the template can label it.
+    """
+
+    count_limit = 10000
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_kind = "exact"
+
+    def _estimate(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            # -1 or 0 until the table has been vacuumed or analyzed
+            return row[0] if row and row[0] > 0 else None
+        if connection.vendor == "sqlite":
+            # Ids are handed out in order, so the highest one over-counts only by deleted rows
+            return queryset.aggregate(last=Max("pk"))["last"] or 0
+        return None
+
+    @cached_property
+    def count(self):
+        if not self.object_list.query.has_filters():
+            estimate = self._estimate()
+            if estimate is not None and estimate > self.count_limit:
+                self.count_kind = "estimate"
+                return estimate
+        # Ordering doesn't change a count and would only stop the database picking the cheapest index
+        count = self.object_list.order_by()[:self.count_limit].count()
+        if count == self.count_limit:
+            self.count_kind = "limit"
+        return count
+
+
+class PaymentChangeList(ChangeList):
+    """
+    Adds keyset navigation to the payment changelist: `?before=<created_at>,<id>`
+    lists the payments after that one in the newest-first order, so paging
+    deep into the table is an index seek instead of an ever larger OFFSET.
+    """
+
+    cursor_var = "before"
+    cursor = None
+
+    def get_queryset(self, request, exclude_parameters=None):
+        # Dropped from the params so filter, search and date links start again from the newest payment
+        self.params.pop(self.cursor_var, None)
+        self.filter_params.pop(self.cursor_var, None)
+        date_params = {
+            name: self.filter_params.pop(name)
+            for name in [f"{self.date_hierarchy}__{part}" for part in ("year", "month", "day")]
+            if name in self.filter_params
+        }
+        if date_params:
+            # For the date_hierarchy_links probes, which each bring their own range: given two
+            # ranges on created_at, SQLite seeks on the first and scans the whole of it
+            self.undated_queryset = super().get_queryset(request, exclude_parameters)
+            self.filter_params.update(date_params)
+        queryset = super().get_queryset(request, exclude_parameters)
+        if not date_params:
+            self.undated_queryset = queryset
+        self.cursor = request.GET.get(self.cursor_var)
+        if self.cursor:
+            created_at, pk = self.parse_cursor(self.cursor)
+            # The inclusive bound gives the index a range to start from; the OR breaks ties on id
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(id__lt=pk),
+                created_at__lte=created_at,
+            )
+        return queryset
+
+    @staticmethod
+    def parse_cursor(value):
+        created_at, _, pk = value.rpartition(",")
+        try:
+            moment = parse_datetime(created_at)
+            pk = int(pk)
+        except ValueError:
+            moment = None
+        if moment is None:
+            raise IncorrectLookupParameters(f"Invalid cursor: {value}")
+        return moment, pk
+
+    @cached_property
+    def newest_url(self):
+        return self.get_query_string()
+
+    @cached_property
+    def older_url(self):
+        """Link to the page after this one, or None on the last page."""
+        if self.show_all:
+            return None
+        rows = list(self.result_list)
+        if len(rows) < self.list_per_page:
+            return None
+        last = rows[-1]
+        return self.get_query_string({self.cursor_var: f"{last.created_at.isoformat()},{last.pk}"})
+
+    def _first_last(self):
+        # Two single-ended lookups, as MIN() and MAX() together make SQLite scan every row
+        dates = self.queryset.values_list(self.date_hierarchy, flat=True)
+        first = dates.order_by(self.date_hierarchy).first()
+        last = dates.order_by(f"-{self.date_hierarchy}").first()
+        if first is None:
+            return None, None
+        return timezone.localtime(first), timezone.localtime(last)
+
+    def _has_rows(self, year, month=None, day=None):
+        start = datetime(year, month or 1, day or 1)
+        if day:
+            end = start + timedelta(days=1)
+        elif month:
+            end = (start + timedelta(days=32)).replace(day=1)
+        else:
+            end = start.replace(year=year + 1)
+        if settings.USE_TZ:
+            start, end = timezone.make_aware(start), timezone.make_aware(end)
+        return self.undated_queryset.filter(**{
+            f"{self.date_hierarchy}__gte": start,
+            f"{self.date_hierarchy}__lt": end,
+        }).exists()
+
+    @cached_property
+    def date_hierarchy_links(self):
+        """
+        Context for admin/date_hierarchy.html, like the stock date_hierarchy tag
+        but without its SELECT DISTINCT over every matching row: each year,
+        month or day offered is checked with an indexed range EXISTS probe.
+        """
+        field_name = self.date_hierarchy
+        year_field, month_field, day_field = (f"{field_name}__{part}" for part in ("year", "month", "day"))
+        try:
+            year = int(self.params[year_field]) if year_field in self.params else None
+            month = int(self.params[month_field]) if month_field in self.params else None
+            day = int(self.params[day_field]) if day_field in self.params else None
+        except ValueError:
+            return {"show": False}
+
+        def link(filters):
+            return self.get_query_string(filters, [f"{field_name}__"])
+
+        if year is None:
+            first, last = self._first_last()
+            if first is None:
+                return {"show": True, "back": None, "choices": []}
+            if first.year == last.year:
+                year = first.year
+                if first.month == last.month:
+                    month = first.month
+
+        if year and month and day:
+            current = date(year, month, day)
+            return {
+                "show": True,
+                "back": {
+                    "link": link({year_field: year, month_field: month}),
+                    "title": capfirst(formats.date_format(current, "YEAR_MONTH_FORMAT")),
+                },
+                "choices": [{"title": capfirst(formats.date_format(current, "MONTH_DAY_FORMAT"))}],
+            }
+        if year and month:
+            return {
+                "show": True,
+                "back": {"link": link({year_field: year}), "title": str(year)},
+                "choices": [
+                    {
+                        "link": link({year_field: year, month_field: month, day_field: day}),
+                        "title": capfirst(formats.date_format(date(year, month, day), "MONTH_DAY_FORMAT")),
+                    }
+                    for day in range(1, calendar.monthrange(year, month)[1] + 1)
+                    if self._has_rows(year, month, day)
+                ],
+            }
+        if year:
+            return {
+                "show": True,
+                "back": {"link": link({}), "title": gettext("All dates")},
+                "choices": [
+                    {
+                        "link": link({year_field: year, month_field: month}),
+                        "title": capfirst(formats.date_format(date(year, month, 1), "YEAR_MONTH_FORMAT")),
+                    }
+                    for month in range(1, 13)
+                    if self._has_rows(year, month)
+                ],
+            }
+        return {
+            "show": True,
+            "back": None,
+            "choices": [
+                {"link": link({year_field: str(year)}), "title": str(year)}
+                for year in range(first.year, last.year + 1)
+                if self._has_rows(year)
+            ],
+        }
+
+
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
+    """
+    Changelist for a payments table with millions of rows: estimated counts,
+    filters and dates served by the (status, created_at) and (created_at, id)
+    indexes, exact-match search on unique or indexed columns only, and keyset
+    "Older" links alongside the page numbers.
+    """
+
     list_display = ("reference_number", "status", "amount", "currency", "created_at", "paid_at")
+    list_filter = ("status",)
+    date_hierarchy = "created_at"
+    # Newest first is the only order an index serves, so the columns aren't sortable
+    ordering = ("-created_at", "-id")
+    sortable_by = ()
+    search_fields = ("=reference_number", "=payment_request_id", "=email")
+    search_help_text = "Exact reference number, HitPay payment request ID or email address."
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+    def get_changelist(self, request, **kwargs):
+        return PaymentChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if "@" in term:
+            return queryset.filter(email=term), False
+        reference = Payment.parse_reference(term)
+        if reference is not None:
+            # HitPay payment request ids are UUIDs too
+            return queryset.filter(Q(reference_number=reference) | Q(payment_request_id=term)), False
+        return queryset.filter(payment_request_id=term), False
+
+
+@admin.register(ArchivedPayment)
+class ArchivedPaymentAdmin(PaymentAdmin):
+    """Read-only view of the archive, with the same exact-match search and keyset links."""
+
+    list_display = PaymentAdmin.list_display + ("archived_at",)
+    # The archive has no status index
+    list_filter = ()
+    change_list_template = "admin/api/payment/change_list.html"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ("payment_request_id", "status", "received_at", "processed_at", "error")
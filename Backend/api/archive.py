@@ -0,0 +1,76 @@
+"""
+Hot/cold split of the payments table.
+
+Completed and cancelled payments older than PAYMENT_ARCHIVE_AFTER_DAYS are moved, a batch at
+a time, from Payment into ArchivedPayment with their ids unchanged, which
+keeps the table and indexes that checkout and webhooks write to small.
+Lookups by reference number fall back to the archive.
+"""
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ArchivedPayment, Payment
+
+# Every column of the live table, id included; the archive has the same ones plus archived_at
+_COLUMNS = [field.column for field in Payment._meta.concrete_fields]
+
+
+def archive_batch(cutoff, batch_size):
+    """
+    Move up to `batch_size` completed or cancelled payments created before `cutoff` to the
+    archive in one transaction. Returns the number moved.
+
+    The rows are copied by the database (INSERT ... SELECT), so timestamps
+    are kept as they are rather than being reset by auto_now.
+    """
+    with transaction.atomic():
+        ids = list(
+            Payment.objects.select_for_update()
+            .filter(status__in=Payment.TERMINAL_STATUSES, created_at__lt=cutoff)
+            # Any order will do; sorting would mean reading every remaining candidate on each batch
+            .order_by()
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        quote = connection.ops.quote_name
+        columns = ', '.join(quote(column) for column in _COLUMNS)
+        placeholders = ', '.join(['%s'] * len(ids))
+        archived_at = connection.ops.adapt_datetimefield_value(timezone.now())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {quote(ArchivedPayment._meta.db_table)} ({columns}, {quote('archived_at')}) "
+                f"SELECT {columns}, %s FROM {quote(Payment._meta.db_table)} WHERE {quote('id')} IN ({placeholders})",
+                [archived_at, *ids],
+            )
+        Payment.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def get_payment(reference):
+    """The live or archived payment with this reference number (a UUID). Raises Payment.DoesNotExist."""
+    try:
+        return Payment.objects.get(reference_number=reference)
+    except Payment.DoesNotExist:
+        pass
+    try:
+        return ArchivedPayment.objects.get(reference_number=reference)
+    except ArchivedPayment.DoesNotExist:
+        raise Payment.DoesNotExist(f"No live or archived payment {reference}") from None
+
+
+def get_payments(references):
+    """
+    {reference: payment} for the live or archived payments among `references`
+    (UUIDs): one IN query on the live table, and one on the archive for the
+    references it did not have.
+    """
+    payments = {payment.reference_number: payment for payment in Payment.objects.filter(reference_number__in=references)}
+    missing = [reference for reference in references if reference not in payments]
+    if missing:
+        payments.update(
+            (payment.reference_number, payment)
+            for payment in ArchivedPayment.objects.filter(reference_number__in=missing)
+        )
+    return payments
+
@@ -0,0 +1,89 @@
+import os
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import quote_etag
+
+from . import archive, routers
+from .generations import bump_generation, start_generation
+from .models import Payment
+from .serializers import PaymentStatusSerializer
+
+_lock = threading.Lock()
+_counters = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+def _entry_key(reference_number):
+    return f"payment-status:{reference_number}"
+
+
+def _generation_key(reference_number):
+    return f"payment-status-gen:{reference_number}"
+
+
+def _count(name):
+    with _lock:
+        _counters[name] += 1
+
+
+def get_payment_status(reference_number):
+    """
+    Read-through cache of the status payload for one payment.
+
+    Returns a dict with 'data', 'etag', 'last_modified' (epoch seconds) and
+    'updated_at' (the payment's datetime), or None if the payment is neither
+    live nor archived. Entries carry the generation they were read under, so a
+    write that commits while a miss is being filled still invalidates the value
+    that miss stores.
+    """
+    reference = Payment.parse_reference(reference_number)
+    if reference is None:
+        return None
+    # Key on the canonical form so every spelling of a reference shares one entry
+    reference_number = str(reference)
+    entry_key = _entry_key(reference_number)
+    generation_key = _generation_key(reference_number)
+    cached = cache.get_many([entry_key, generation_key])
+    generation = cached.get(generation_key)
+    entry = cached.get(entry_key)
+    if entry is not None and entry['generation'] == generation:
+        _count('hits')
+        return entry
+
+    _count('misses')
+    if generation is None:
+        generation = start_generation(generation_key, settings.PAYMENT_STATUS_CACHE_TIMEOUT * 2)
+    # A miss right after a write must not fill the cache from a replica that lags behind it
+    try:
+        with routers.primary_reads(routers.recently_written(routers.payment_key(reference_number))):
+            payment = archive.get_payment(reference)
+    except Payment.DoesNotExist:
+        return None
+
+    updated_at = payment.updated_at.timestamp()
+    entry = {
+        'data': dict(PaymentStatusSerializer(payment).data),
+        'etag': quote_etag(f"{reference_number}-{int(updated_at * 1_000_000):x}"),
+        'last_modified': int(updated_at),
+        'updated_at': payment.updated_at,
+        'generation': generation,
+    }
+    cache.set(entry_key, entry, settings.PAYMENT_STATUS_CACHE_TIMEOUT)
+    return entry
+
+
+def invalidate_payment_status(reference_number):
+    bump_generation(_generation_key(reference_number), settings.PAYMENT_STATUS_CACHE_TIMEOUT * 2)
+    cache.delete(_entry_key(reference_number))
+    _count('invalidations')
+
+
+def cache_stats():
+    """Hit/miss counters for this worker process."""
+    with _lock:
+        stats = dict(_counters)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else None
+    stats['pid'] = os.getpid()
+    return stats
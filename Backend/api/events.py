@@ -0,0 +1,173 @@
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import routers
+from .cache import invalidate_payment_status
+from .models import Payment
+from .serializers import PaymentStatusSerializer
+
+
+def _event_key(reference_number):
+    return f"payment-status-event:{reference_number}"
+
+
+def _cache_shared():
+    """False for the per-process caches, whose entries other processes never see."""
+    return not settings.CACHES['default']['BACKEND'].endswith(('LocMemCache', 'DummyCache'))
+
+
+class Subscription:
+    """A single waiting stream connection, woken from any thread via its event loop."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.event = asyncio.Event()
+        self.payload = None
+
+    def push(self, payload):
+        try:
+            self.loop.call_soon_threadsafe(self._set, payload)
+        except RuntimeError:
+            # Loop already closed; the connection is gone
+            pass
+
+    def _set(self, payload):
+        self.payload = payload
+        self.event.set()
+
+    async def wait(self, timeout):
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self.event.clear()
+        return self.payload
+
+
+class StatusBroadcaster:
+    """
+    In-process fan-out of payment status changes to open status streams.
+
+    Waiting connections hold only an asyncio.Event. Writers in other processes
+    are picked up on each heartbeat through the cache entry, so with a shared
+    cache idle streams cost no DB queries; without one the heartbeat reads
+    updated_at from the database instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, reference_number):
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(reference_number, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, reference_number, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(reference_number)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[reference_number]
+
+    def publish(self, reference_number, payload):
+        cache.set(_event_key(reference_number), payload, settings.PAYMENT_STATUS_STREAM_MAX_AGE)
+        with self._lock:
+            subscribers = list(self._subscribers.get(reference_number, ()))
+        for subscription in subscribers:
+            subscription.push(payload)
+
+
+broadcaster = StatusBroadcaster()
+
+
+def publish_payment_status(payment):
+    """
+    Once the surrounding transaction commits: pin status reads to the primary,
+    invalidate the cached status and wake status streams.
+    """
+    reference_number = str(payment.reference_number)
+    payload = dict(PaymentStatusSerializer(payment).data)
+
+    def publish():
+        routers.mark_written(routers.payment_key(reference_number))
+        invalidate_payment_status(reference_number)
+        broadcaster.publish(reference_number, payload)
+
+    transaction.on_commit(publish)
+
+
+def _sse(payload):
+    return f"event: status\ndata: {json.dumps(payload)}\n\n"
+
+
+def status_snapshot(payload):
+    """
+    The current status as a complete event-stream body, for servers that can't
+    stream. EventSource reconnects after PAYMENT_STATUS_STREAM_RETRY_MS, so the
+    client polls at that interval.
+    """
+    return f"retry: {settings.PAYMENT_STATUS_STREAM_RETRY_MS}\n" + _sse(payload)
+
+
+async def _changed_since(reference_number, updated_at):
+    """
+    The payment's status payload and updated_at if it was written after
+    `updated_at`, else None. One indexed single-column read while unchanged.
+    """
+    latest = await (
+        Payment.objects.filter(reference_number=reference_number).values_list('updated_at', flat=True).afirst()
+    )
+    if latest is None or latest == updated_at:
+        return None
+    payment = await Payment.objects.filter(reference_number=reference_number).afirst()
+    if payment is None:
+        return None
+    return dict(PaymentStatusSerializer(payment).data), payment.updated_at
+
+
+async def stream_payment_status(reference_number, initial, updated_at):
+    """
+    Server-sent events for one payment: current status, then each change until completed or cancelled.
+
+    `updated_at` is when the payment behind `initial` was last written. Without
+    a shared cache, changes made by other processes (e.g. `process_webhooks`)
+    neither wake the stream nor reach its cache key, so each heartbeat then
+    checks updated_at in the database instead.
+    """
+    subscription = broadcaster.subscribe(reference_number)
+    poll_database = not _cache_shared()
+    heartbeat = settings.PAYMENT_STATUS_STREAM_HEARTBEAT
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.PAYMENT_STATUS_STREAM_MAX_AGE
+    try:
+        last = initial
+        yield f"retry: {settings.PAYMENT_STATUS_STREAM_RETRY_MS}\n"
+        yield _sse(last)
+
+        # Catch anything published between the initial read and subscribing
+        pending = await cache.aget(_event_key(reference_number))
+
+        while last['status'] not in Payment.TERMINAL_STATUSES and loop.time() < deadline:
+            payload = pending or await subscription.wait(min(heartbeat, max(deadline - loop.time(), 0)))
+            pending = None
+            if payload is None:
+                payload = await cache.aget(_event_key(reference_number))
+            if payload is None and poll_database:
+                changed = await _changed_since(reference_number, updated_at)
+                if changed is not None:
+                    payload, updated_at = changed
+            if payload is not None and payload != last:
+                last = payload
+                yield _sse(last)
+            else:
+                yield ": keep-alive\n\n"
+    finally:
+        broadcaster.unsubscribe(reference_number, subscription)
@@ -0,0 +1,167 @@
+import csv
+import heapq
+import json
+from datetime import datetime, time as dt_time, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import ArchivedPayment, Payment
+
+EXPORT_FIELDS = (
+    'reference_number', 'payment_request_id', 'status', 'amount', 'currency', 'name', 'email', 'phone',
+    'hitpay_payment_id', 'hitpay_status', 'created_at', 'updated_at', 'paid_at',
+)
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+# Rows joined into one chunk of output, so the response isn't written a row at a time
+ROWS_PER_CHUNK = 500
+
+
+def _parse_moment(value, name):
+    """A date (midnight UTC) or datetime string as an aware datetime."""
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is not None:
+                moment = datetime.combine(day, dt_time.min)
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValueError(f"{name} must be a date (YYYY-MM-DD) or ISO datetime")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, dt_timezone.utc)
+    return moment
+
+
+def parse_filters(params):
+    """
+    Export filters from query params or command options: start/end bound
+    created_at (start inclusive, end exclusive); status and currency take
+    comma-separated values. Raises ValueError for anything malformed.
+    """
+    filters = {}
+    if params.get('start'):
+        filters['created_at__gte'] = _parse_moment(params['start'], 'start')
+    if params.get('end'):
+        filters['created_at__lt'] = _parse_moment(params['end'], 'end')
+    if params.get('status'):
+        statuses = [value.strip() for value in params['status'].split(',') if value.strip()]
+        valid = {choice for choice, _ in Payment.STATUS_CHOICES}
+        unknown = [value for value in statuses if value not in valid]
+        if unknown:
+            raise ValueError(f"Unknown status: {', '.join(unknown)}")
+        filters['status__in'] = statuses
+    if params.get('currency'):
+        filters['currency__in'] = [value.strip().upper() for value in params['currency'].split(',') if value.strip()]
+    return filters
+
+
+def _ordered_rows(model, filters):
+    # (created_at, id) lead each row as the merge key
+    return (
+        model.objects.filter(**filters)
+        .order_by('created_at', 'id')
+        .values_list('created_at', 'id', *EXPORT_FIELDS)
+        .iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    )
+
+
+def export_rows(filters):
+    """
+    Matching live and archived payments as tuples of EXPORT_FIELDS, oldest first.
+
+    Each table is read EXPORT_CHUNK_SIZE rows at a time from a server-side
+    cursor and the two ordered streams are merged, so memory stays flat
+    however many rows match.
+    """
+    sources = [_ordered_rows(Payment, filters)]
+    statuses = filters.get('status__in')
+    # The archive only holds completed and cancelled payments
+    if statuses is None or set(statuses) & set(Payment.TERMINAL_STATUSES):
+        sources.insert(0, _ordered_rows(ArchivedPayment, filters))
+    return (row[2:] for row in heapq.merge(*sources, key=lambda row: row[:2]))
+
+
+_DATETIME_COLUMNS = [EXPORT_FIELDS.index(name) for name in ('created_at', 'updated_at', 'paid_at')]
+# Customer-entered columns; in CSV a leading =, +, - or @ would run as a spreadsheet formula
+_TEXT_COLUMNS = [EXPORT_FIELDS.index(name) for name in ('name', 'email', 'phone')]
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _with_isoformat(row):
+    row = list(row)
+    for index in _DATETIME_COLUMNS:
+        if row[index] is not None:
+            row[index] = row[index].isoformat()
+    return row
+
+
+class _Buffer:
+    """File-like target for csv.writer that hands back what was written."""
+
+    def write(self, value):
+        return value
+
+
+def _chunked(lines):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == ROWS_PER_CHUNK:
+            yield ''.join(chunk).encode('utf-8')
+            chunk = []
+    if chunk:
+        yield ''.join(chunk).encode('utf-8')
+
+
+def _csv_row(row):
+    row = _with_isoformat(row)
+    for index in _TEXT_COLUMNS:
+        value = row[index]
+        if value and value.startswith(_FORMULA_PREFIXES):
+            row[index] = "'" + value
+    return row
+
+
+def iter_csv(rows):
+    """CSV with a header row, as encoded chunks."""
+    writer = csv.writer(_Buffer())
+
+    def lines():
+        yield writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            # csv writes None as '' and str() for everything else
+            yield writer.writerow(_csv_row(row))
+
+    return _chunked(lines())
+
+
+def iter_ndjson(rows):
+    """One JSON object per line, as encoded chunks."""
+    return _chunked(json.dumps(dict(zip(EXPORT_FIELDS, _with_isoformat(row))), default=str) + '\n' for row in rows)
+
+
+def render(export_format, rows):
+    return iter_csv(rows) if export_format == 'csv' else iter_ndjson(rows)
+
+
+async def aiter_chunks(chunks):
+    """
+    The chunks of render() as an async iterator, for responses served over ASGI.
+
+    Django would read a sync iterator into a list before sending any of it;
+    here each chunk is fetched by its own sync_to_async call. They all run on
+    the same thread, which owns the database cursor.
+    """
+    fetch = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (chunk := await fetch(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close, thread_sensitive=True)()
@@ -0,0 +1,99 @@
+"""
+Pre-rendered pages of the public reviews feed (GET /api/reviews/).
+
+Each page is stored as the exact JSON bytes of its response, keyed by media
+type and absolute URL (the pagination links in the body are absolute).
+Entries carry the generation they were built under; any review write bumps
+the generation on commit, so every page is rebuilt on its next request and
+nothing is rebuilt while reviews don't change.
+
+On a miss, one request takes a short lock and renders the page. Concurrent
+misses for the same page, in any worker sharing the cache, wait for that
+render instead of all querying the database at once.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import metrics, routers
+from .generations import bump_generation, start_generation
+
+GENERATION_KEY = 'reviews-feed-gen'
+# Query parameters the feed understands; requests with any others are rendered normally
+CACHEABLE_PARAMS = {'page', 'pagination', 'cursor'}
+# How long a rebuild may hold the lock before another request takes over
+LOCK_TIMEOUT = 5
+
+
+def _page_key(media_type, url):
+    return f"reviews-feed:{hashlib.sha1(f'{media_type} {url}'.encode('utf-8')).hexdigest()}"
+
+
+def cacheable(request):
+    return (
+        settings.REVIEWS_FEED_CACHE_TIMEOUT > 0
+        and request.accepted_renderer.format == 'json'
+        and set(request.query_params) <= CACHEABLE_PARAMS
+    )
+
+
+def get_page(request, render):
+    """
+    The response body for this request's page, from the cache or from
+    render() (which returns bytes, or raises for a page that doesn't exist).
+    """
+    page_key = _page_key(request.accepted_media_type, request.build_absolute_uri())
+    cached = cache.get_many([page_key, GENERATION_KEY])
+    generation = cached.get(GENERATION_KEY)
+    if generation is None:
+        generation = start_generation(GENERATION_KEY, settings.REVIEWS_FEED_CACHE_TIMEOUT * 2)
+    entry = cached.get(page_key)
+    if entry is not None and entry[0] == generation:
+        metrics.inc('reviews_feed_requests_total', ('hit',))
+        return entry[1]
+
+    lock_key = f"{page_key}:lock"
+    if not cache.add(lock_key, True, LOCK_TIMEOUT):
+        body = _wait_for(page_key, generation)
+        if body is not None:
+            metrics.inc('reviews_feed_requests_total', ('waited',))
+            return body
+        # The rebuild is taking too long or its worker died; render this one ourselves
+        metrics.inc('reviews_feed_requests_total', ('timeout',))
+        return render()
+
+    try:
+        body = render()
+        cache.set(page_key, (generation, body), settings.REVIEWS_FEED_CACHE_TIMEOUT)
+    finally:
+        cache.delete(lock_key)
+    metrics.inc('reviews_feed_requests_total', ('rebuild',))
+    return body
+
+
+def _wait_for(page_key, generation):
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    delay = 0.005
+    while time.monotonic() < deadline:
+        time.sleep(delay)
+        delay = min(delay * 2, 0.1)
+        entry = cache.get(page_key)
+        if entry is not None and entry[0] >= generation:
+            return entry[1]
+    return None
+
+
+def invalidate():
+    bump_generation(GENERATION_KEY, settings.REVIEWS_FEED_CACHE_TIMEOUT * 2)
+
+
+def reviews_written():
+    """Call inside the transaction of any review write."""
+    def after_commit():
+        routers.mark_written('reviews')
+        invalidate()
+
+    transaction.on_commit(after_commit)
@@ -0,0 +1,27 @@
+"""
+Generation keys for caches whose entries are invalidated in bulk.
+
+An entry stores the generation it was built under and is only served while
+that is still the current generation; a write bumps the generation instead of
+finding and deleting every entry.
+
+Generations are timestamps rather than a counter: cache.incr() doesn't extend
+the key's TTL, and a counter restarted after expiry or eviction would repeat an
+old generation and revive the entries built under it. A timestamp never repeats.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def start_generation(key, timeout):
+    """The current generation at `key`, starting one if there is none."""
+    generation = time.time_ns()
+    if not cache.add(key, generation, timeout):
+        generation = cache.get(key, generation)
+    return generation
+
+
+def bump_generation(key, timeout):
+    """Start a new generation at `key`, invalidating every entry built under an older one."""
+    cache.set(key, time.time_ns(), timeout)
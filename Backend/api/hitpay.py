@@ -0,0 +1,280 @@
+import asyncio
+import math
+import random
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from django.conf import settings
+
+from . import metrics
+
+# One keep-alive session per process for the sync views
+_session = None
+
+# One keep-alive AsyncClient per event loop (one per process under ASGI)
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _timeout():
+    return (settings.HITPAY_CONNECT_TIMEOUT, settings.HITPAY_READ_TIMEOUT)
+
+
+def _headers():
+    return {
+        'X-BUSINESS-API-KEY': settings.HITPAY_API_KEY,
+        'Content-Type': 'application/x-www-form-urlencoded',
+        'X-Requested-With': 'XMLHttpRequest'
+    }
+
+
+def build_payment_request(payment, purpose=''):
+    """Form data for POST /payment-requests for a freshly created Payment."""
+    return {
+        'amount': str(payment.amount),
+        'currency': payment.currency,
+        'reference_number': str(payment.reference_number),
+        'name': payment.name,
+        'email': payment.email,
+        'phone': payment.phone,
+        'purpose': purpose,
+        'redirect_url': f"{settings.FRONTEND_URL}/payment/status?reference_number={payment.reference_number}",
+        'webhook': "https://goeasytrip.com/api/webhooks/hitpay",  # Temporary for testing - replace with your webhook URL
+    }
+
+
+class _Timing:
+    outcome = 'error'
+
+    def record(self, response):
+        self.outcome = str(response.status_code)
+        return response
+
+
+@contextmanager
+def _timed(operation):
+    """Record the call's latency as hitpay_request_duration_seconds; outcome is the status code or 'error'."""
+    timing = _Timing()
+    started = time.perf_counter()
+    try:
+        yield timing
+    finally:
+        metrics.observe('hitpay_request_duration_seconds', (operation, timing.outcome), time.perf_counter() - started)
+
+
+def get_session():
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.HITPAY_POOL_SIZE)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _session = session
+    return _session
+
+
+def get_async_client():
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.HITPAY_READ_TIMEOUT, connect=settings.HITPAY_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.HITPAY_POOL_SIZE,
+                max_keepalive_connections=settings.HITPAY_POOL_SIZE,
+            ),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+class HitPayUnavailable(Exception):
+    """HitPay could not be reached, or the circuit breaker is refusing calls; views answer 503."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Per-process circuit breaker for HitPay calls.
+
+    HITPAY_CIRCUIT_FAILURE_THRESHOLD consecutive failures (transport errors,
+    429 or 5xx) open the circuit, and calls then fail fast for
+    HITPAY_CIRCUIT_RESET_TIMEOUT seconds. After that one trial call is let
+    through (half-open): success closes the circuit, failure opens it again.
+    """
+    CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+    GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def _transition(self, state):
+        self.state = state
+        self._trial_in_flight = False
+        if state == self.OPEN:
+            self.opened_at = time.monotonic()
+        metrics.inc('hitpay_circuit_transitions_total', (state,))
+        metrics.set_gauge('hitpay_circuit_state', (), self.GAUGE[state])
+
+    def before_call(self, operation):
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = settings.HITPAY_CIRCUIT_RESET_TIMEOUT - (time.monotonic() - self.opened_at)
+                if remaining <= 0:
+                    self._transition(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            if self.state == self.CLOSED:
+                return
+            retry_after = max(1, math.ceil(settings.HITPAY_CIRCUIT_RESET_TIMEOUT - (time.monotonic() - self.opened_at)))
+        metrics.inc('hitpay_circuit_rejections_total', (operation,))
+        raise HitPayUnavailable('Payment provider is temporarily unavailable, please try again shortly', retry_after)
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state != self.CLOSED:
+                self._transition(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.failures >= settings.HITPAY_CIRCUIT_FAILURE_THRESHOLD
+            ):
+                self._transition(self.OPEN)
+
+    def abandon(self):
+        """A call ended without an outcome (e.g. cancelled); free the half-open trial slot."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def snapshot(self):
+        with self._lock:
+            return {'state': self.state, 'failures': self.failures}
+
+
+breaker = CircuitBreaker()
+
+
+def _provider_failure(response):
+    return response.status_code == 429 or response.status_code >= 500
+
+
+def _not_sent(exc):
+    """True if the request failed before reaching HitPay, so even a POST can be retried."""
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    if isinstance(exc, requests.ConnectionError) and exc.args:
+        return isinstance(getattr(exc.args[0], 'reason', None), NewConnectionError)
+    return False
+
+
+def _backoff(attempt):
+    """Full-jitter exponential backoff before retry number `attempt` (0-based)."""
+    return random.uniform(0, min(settings.HITPAY_RETRY_BACKOFF_MAX, settings.HITPAY_RETRY_BACKOFF * 2 ** attempt))
+
+
+def _call(operation, send, idempotent):
+    """
+    Send a request through the circuit breaker, retrying transient failures.
+
+    Idempotent calls are retried on any transport error, 429 or 5xx; others
+    only when the request never left this process. Raises HitPayUnavailable
+    when the circuit is open or the last attempt failed in transport.
+    """
+    for attempt in range(settings.HITPAY_MAX_RETRIES + 1):
+        last_attempt = attempt == settings.HITPAY_MAX_RETRIES
+        breaker.before_call(operation)
+        with _timed(operation) as timing:
+            try:
+                response = timing.record(send())
+            except requests.RequestException as e:
+                breaker.record_failure()
+                if last_attempt or not (idempotent or _not_sent(e)):
+                    raise HitPayUnavailable(f'Payment provider request failed: {e}') from e
+                response = None
+            except BaseException:
+                breaker.abandon()
+                raise
+        if response is not None:
+            if not _provider_failure(response):
+                breaker.record_success()
+                return response
+            breaker.record_failure()
+            if last_attempt or not idempotent:
+                return response
+        metrics.inc('hitpay_retries_total', (operation,))
+        time.sleep(_backoff(attempt))
+
+
+async def _acall(operation, send, idempotent):
+    """Async _call() for the httpx client."""
+    import httpx
+
+    for attempt in range(settings.HITPAY_MAX_RETRIES + 1):
+        last_attempt = attempt == settings.HITPAY_MAX_RETRIES
+        breaker.before_call(operation)
+        with _timed(operation) as timing:
+            try:
+                response = timing.record(await send())
+            except httpx.TransportError as e:
+                breaker.record_failure()
+                not_sent = isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                if last_attempt or not (idempotent or not_sent):
+                    raise HitPayUnavailable(f'Payment provider request failed: {e!r}') from e
+                response = None
+            except BaseException:
+                breaker.abandon()
+                raise
+        if response is not None:
+            if not _provider_failure(response):
+                breaker.record_success()
+                return response
+            breaker.record_failure()
+            if last_attempt or not idempotent:
+                return response
+        metrics.inc('hitpay_retries_total', (operation,))
+        await asyncio.sleep(_backoff(attempt))
+
+
+def create_payment_request(data):
+    """Create a HitPay payment request over the shared keep-alive session."""
+    return _call('create_payment_request', lambda: get_session().post(
+        f"{settings.HITPAY_API_BASE}/payment-requests",
+        data=data,
+        headers=_headers(),
+        timeout=_timeout(),
+    ), idempotent=False)
+
+
+def get_payment_request(payment_request_id):
+    """Fetch a payment request's current state from HitPay."""
+    return _call('get_payment_request', lambda: get_session().get(
+        f"{settings.HITPAY_API_BASE}/payment-requests/{payment_request_id}",
+        headers=_headers(),
+        timeout=_timeout(),
+    ), idempotent=True)
+
+
+async def acreate_payment_request(data):
+    """Async counterpart of create_payment_request using the shared AsyncClient."""
+    return await _acall('create_payment_request', lambda: get_async_client().post(
+        f"{settings.HITPAY_API_BASE}/payment-requests",
+        data=data,
+        headers=_headers(),
+    ), idempotent=False)
@@ -0,0 +1,114 @@
+import asyncio
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+
+class IdempotencyError(Exception):
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def fingerprint(path, data, fields):
+    """Hash of the endpoint and the request fields, so a key can't be reused for a different request."""
+    payload = json.dumps([path, {name: data.get(name) for name in fields}], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _claim(key, request_fingerprint):
+    """
+    One attempt to take ownership of `key`.
+
+    Returns (record, None) if this request now owns the key, or (None, record)
+    for an existing record that belongs to another request.
+    """
+    if not key or len(key) > IdempotencyKey._meta.get_field('key').max_length:
+        raise IdempotencyError(f'{HEADER} must be 1-255 characters', 400)
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(key=key, fingerprint=request_fingerprint), None
+    except IntegrityError:
+        pass
+
+    existing = IdempotencyKey.objects.filter(key=key).first()
+    if existing is None:
+        # Released between our insert and read; try again
+        return _claim(key, request_fingerprint)
+
+    now = timezone.now()
+    expired = existing.created_at < now - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+    # An in-flight claim older than the lock timeout belongs to a request that died
+    abandoned = (
+        existing.response_status is None
+        and existing.created_at < now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+    )
+    if expired or abandoned:
+        IdempotencyKey.objects.filter(pk=existing.pk, created_at=existing.created_at).delete()
+        return _claim(key, request_fingerprint)
+
+    if existing.fingerprint != request_fingerprint:
+        raise IdempotencyError(f'{HEADER} was already used for a different request', 422)
+    return None, existing
+
+
+def begin(key, request_fingerprint):
+    """
+    Claim `key` for this request, waiting out a concurrent request that holds it.
+
+    Returns (record, None) when the caller should do the work and then call
+    finish(record, ...), or (None, record) with the stored response to replay.
+    Raises IdempotencyError if the key is misused or the other request is
+    still running after IDEMPOTENCY_WAIT seconds.
+    """
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+    delay = 0.05
+    while True:
+        record, existing = _claim(key, request_fingerprint)
+        if record is not None or existing.response_status is not None:
+            return record, existing
+        if time.monotonic() >= deadline:
+            raise IdempotencyError('A request with this Idempotency-Key is still in progress', 409)
+        time.sleep(delay)
+        delay = min(delay * 2, 0.5)
+
+
+async def abegin(key, request_fingerprint):
+    """Async begin(): waits with asyncio.sleep so the event loop keeps serving other requests."""
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+    delay = 0.05
+    while True:
+        record, existing = await sync_to_async(_claim)(key, request_fingerprint)
+        if record is not None or existing.response_status is not None:
+            return record, existing
+        if time.monotonic() >= deadline:
+            raise IdempotencyError('A request with this Idempotency-Key is still in progress', 409)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.5)
+
+
+def finish(record, status_code, body):
+    """
+    Store a successful response for replay. Anything else releases the key, so
+    a retry after a validation or HitPay error runs again.
+    """
+    if 200 <= status_code < 300:
+        record.response_status = status_code
+        record.response_body = body
+        record.save(update_fields=['response_status', 'response_body'])
+    else:
+        record.delete()
+
+
+afinish = sync_to_async(finish)
@@ -0,0 +1,139 @@
+"""
+Bulk review import from CSV or JSON Lines.
+
+Input is read a line at a time and handled REVIEW_IMPORT_BATCH_SIZE rows at
+a time: each batch is validated with ReviewSerializer (the same rules as a
+single POST /api/reviews/), then its valid rows are inserted with one
+bulk_create and one ReviewStats update in a single transaction. Memory use
+depends on the batch size, not the file size. Invalid rows are skipped and
+reported by line number.
+"""
+import csv
+import json
+import time
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from . import feed
+from .models import Review, ReviewStats
+from .serializers import ReviewSerializer
+
+FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/jsonl': 'jsonl',
+    'application/x-ndjson': 'jsonl',
+}
+REQUIRED_COLUMNS = ('author_name', 'rating', 'text')
+# Invalid rows listed in the summary; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+
+def _decoded(lines):
+    """Text lines from byte lines, without a UTF-8 byte order mark."""
+    for number, line in enumerate(lines, start=1):
+        try:
+            text = line.decode('utf-8') if isinstance(line, bytes) else line
+        except UnicodeDecodeError:
+            raise ValueError(f"Line {number} is not valid UTF-8") from None
+        if number == 1:
+            text = text.lstrip('\ufeff')
+        yield text
+
+
+def _csv_records(lines):
+    reader = csv.DictReader(_decoded(lines))
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+    if missing:
+        raise ValueError(f"CSV header is missing: {', '.join(missing)}")
+    for record in reader:
+        # line_num is the last physical line of the record, which a quoted field can span
+        yield reader.line_num, record
+
+
+def _jsonl_records(lines):
+    for number, line in enumerate(_decoded(lines), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield number, record if isinstance(record, dict) else None
+
+
+def records(lines, import_format):
+    """(line number, dict) pairs; the dict is None for a line that isn't a JSON object."""
+    return _csv_records(lines) if import_format == 'csv' else _jsonl_records(lines)
+
+
+class ImportSummary:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.invalid = 0
+        self.errors = []
+        self.error = None
+        self.started = time.monotonic()
+
+    def reject(self, line, errors):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def as_dict(self):
+        seconds = time.monotonic() - self.started
+        return {
+            'error': self.error,
+            'rows': self.rows,
+            'imported': self.imported,
+            'invalid': self.invalid,
+            'errors': self.errors,
+            'seconds': round(seconds, 3),
+            'rows_per_second': round(self.rows / seconds) if seconds else None,
+        }
+
+
+def _import_batch(batch, summary):
+    validator = ReviewSerializer()
+    reviews = []
+    for line, record in batch:
+        if record is None:
+            summary.reject(line, {'non_field_errors': ['Expected a JSON object']})
+            continue
+        try:
+            reviews.append(Review(**validator.run_validation(record)))
+        except ValidationError as e:
+            summary.reject(line, e.detail)
+    if reviews:
+        with transaction.atomic():
+            Review.objects.bulk_create(reviews)
+            ReviewStats.record_many([review.rating for review in reviews])
+            feed.reviews_written()
+    summary.imported += len(reviews)
+
+
+def import_reviews(lines, import_format, batch_size=None):
+    """
+    Import reviews from an iterable of lines (bytes or str), committing each
+    batch as it goes. Returns the summary as a dict. A malformed file (no CSV
+    header, broken quoting, not UTF-8) stops the import with the reason in 'error'; rows
+    before the problem stay imported.
+    """
+    batch_size = batch_size or settings.REVIEW_IMPORT_BATCH_SIZE
+    summary = ImportSummary()
+    batch = []
+    try:
+        for line, record in records(lines, import_format):
+            summary.rows += 1
+            batch.append((line, record))
+            if len(batch) == batch_size:
+                _import_batch(batch, summary)
+                batch = []
+    except (ValueError, csv.Error) as e:
+        summary.error = str(e)
+    if batch:
+        _import_batch(batch, summary)
+    return summary.as_dict()
@@ -0,0 +1,37 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move completed and cancelled payments older than PAYMENT_ARCHIVE_AFTER_DAYS from the live payments table "
+        "to the archive, in batches. Safe to run from cron; status lookups and exports read both tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=settings.PAYMENT_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--batch-size', type=int, default=settings.PAYMENT_ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0.05,
+                            help='Seconds between batches, so checkout and webhook writes get the lock')
+        parser.add_argument('--limit', type=int, help='Stop after moving this many payments')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        limit = options['limit']
+        started = time.monotonic()
+        moved = 0
+        while limit is None or moved < limit:
+            batch_size = options['batch_size'] if limit is None else min(options['batch_size'], limit - moved)
+            count = archive.archive_batch(cutoff, batch_size)
+            moved += count
+            if count < batch_size:
+                break
+            time.sleep(options['pause'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(f"Archived {moved} payment(s) created before {cutoff:%Y-%m-%d %H:%M} in {elapsed:.1f}s")
@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import exports
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream payments as CSV or NDJSON, filtered by created_at range, status and currency. "
+        "Memory use stays constant regardless of the number of rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='created_at from (inclusive), YYYY-MM-DD or ISO datetime')
+        parser.add_argument('--end', help='created_at until (exclusive), YYYY-MM-DD or ISO datetime')
+        parser.add_argument('--status', help='Comma-separated statuses')
+        parser.add_argument('--currency', help='Comma-separated currencies')
+        parser.add_argument('--format', dest='export_format', choices=list(exports.FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help='File to write (default: stdout)')
+
+    def handle(self, *args, **options):
+        try:
+            filters = exports.parse_filters(options)
+        except ValueError as e:
+            raise CommandError(e)
+
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for chunk in exports.render(options['export_format'], exports.export_rows(filters)):
+                output.write(chunk)
+        finally:
+            if options['output']:
+                output.close()
+            else:
+                output.flush()
@@ -0,0 +1,49 @@
+import json
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import imports
+
+EXTENSIONS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Import reviews from a CSV (author_name,rating,text header) or JSON Lines file, validated and "
+        "inserted in batches. Memory use stays constant regardless of the file size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or - for stdin")
+        parser.add_argument('--format', dest='import_format', choices=imports.FORMATS,
+                            help='Default: from the file extension')
+        parser.add_argument('--batch-size', type=int, help='Default: REVIEW_IMPORT_BATCH_SIZE')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        import_format = options['import_format'] or EXTENSIONS.get(Path(path).suffix.lower())
+        if import_format is None:
+            raise CommandError("Can't tell the format from the file name; pass --format")
+
+        try:
+            source = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        except OSError as e:
+            raise CommandError(e)
+        try:
+            summary = imports.import_reviews(source, import_format, options['batch_size'])
+        finally:
+            if source is not sys.stdin.buffer:
+                source.close()
+
+        for rejected in summary['errors']:
+            self.stderr.write(f"Line {rejected['line']}: {json.dumps(rejected['errors'])}")
+        if summary['invalid'] > len(summary['errors']):
+            self.stderr.write(f"... and {summary['invalid'] - len(summary['errors'])} more invalid row(s)")
+        self.stdout.write(
+            f"Imported {summary['imported']} of {summary['rows']} row(s), {summary['invalid']} invalid, "
+            f"in {summary['seconds']:.1f}s ({summary['rows_per_second'] or 0} rows/s)"
+        )
+        if summary['error']:
+            raise CommandError(summary['error'])
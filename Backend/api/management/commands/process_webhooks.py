@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.webhooks import process_inbox
+
+
+class Command(BaseCommand):
+    help = "Drain the HitPay webhook inbox in batches, applying events to their payments."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--interval', type=float, default=0.5,
+                            help='Seconds to sleep when the inbox is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the inbox once and exit instead of running as a worker')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        while True:
+            processed = process_inbox(batch_size)
+            if processed:
+                self.stdout.write(f"Processed {processed} webhook event(s)")
+                continue
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.models import RevenueRollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the revenue rollups behind /api/payments/summary/ from the live and archived payments "
+        "tables. Run once after migrating, and after editing payments outside the API (e.g. in the admin). "
+        "Payment writes wait until it finishes."
+    )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rows = RevenueRollup.rebuild()
+        self.stdout.write(f"Rebuilt {rows} rollup row(s) in {time.monotonic() - started:.1f}s")
@@ -0,0 +1,141 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from api import events, hitpay
+from api.models import Payment
+from api.webhooks import apply_hitpay_status
+
+
+class RateLimiter:
+    """Token bucket shared by the worker threads: at most `rate` calls per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _hitpay_outcome(data):
+    """(status, payment_id) from a HitPay payment request, in webhook terms."""
+    payments = data.get('payments') or []
+    payment_id = payments[0].get('id') if payments else None
+    return data.get('status'), payment_id
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcile pending payments older than a threshold against HitPay, "
+        "for payments whose webhook never arrived."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=30,
+                            help='Only pending payments created more than this many minutes ago')
+        parser.add_argument('--limit', type=int, default=None, help='Stop after this many payments')
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent HitPay lookups')
+        parser.add_argument('--rate', type=float, default=10.0,
+                            help='Maximum HitPay lookups per second (0 for unlimited)')
+        parser.add_argument('--batch-size', type=int, default=100, help='Payments fetched and applied per batch')
+        parser.add_argument('--dry-run', action='store_true', help='Query HitPay but do not write anything')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['older_than'])
+        limiter = RateLimiter(options['rate'])
+        report = {'checked': 0, 'updated': 0, 'unchanged': 0, 'errors': 0}
+        error_samples = []
+
+        def lookup(payment_request_id):
+            limiter.acquire()
+            try:
+                response = hitpay.get_payment_request(payment_request_id)
+                if response.status_code != 200:
+                    return payment_request_id, None, f"HTTP {response.status_code}"
+                return payment_request_id, _hitpay_outcome(response.json()), None
+            except Exception as e:
+                return payment_request_id, None, str(e)
+
+        # Walks the (status, created_at) index in batches, resuming after the last (created_at, id) seen
+        stale = (
+            Payment.objects.filter(status='pending', created_at__lt=cutoff, payment_request_id__isnull=False)
+            .order_by('created_at', 'id')
+        )
+        started = time.perf_counter()
+        last = None
+        remaining = options['limit']
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while remaining is None or remaining > 0:
+                batch_size = options['batch_size'] if remaining is None else min(options['batch_size'], remaining)
+                page = stale
+                if last is not None:
+                    page = page.filter(Q(created_at__gt=last[0]) | Q(created_at=last[0], id__gt=last[1]))
+                batch = list(page.values_list('created_at', 'id', 'payment_request_id')[:batch_size])
+                if not batch:
+                    break
+                last = batch[-1][:2]
+                if remaining is not None:
+                    remaining -= len(batch)
+
+                outcomes = {}
+                for payment_request_id, outcome, error in pool.map(lookup, [row[2] for row in batch]):
+                    report['checked'] += 1
+                    if error:
+                        report['errors'] += 1
+                        if len(error_samples) < 10:
+                            error_samples.append(f"{payment_request_id}: {error}")
+                    elif outcome[0] in (None, 'pending'):
+                        report['unchanged'] += 1
+                    else:
+                        outcomes[payment_request_id] = outcome
+
+                report['updated'] += self._apply(outcomes, options['dry_run'])
+
+        elapsed = time.perf_counter() - started
+        prefix = '[dry run] ' if options['dry_run'] else ''
+        self.stdout.write(
+            f"{prefix}Checked {report['checked']} payment(s) in {elapsed:.2f}s "
+            f"({report['checked'] / elapsed if elapsed else 0:.1f}/s): "
+            f"{report['updated']} {'would be ' if options['dry_run'] else ''}updated, "
+            f"{report['unchanged']} still pending, {report['errors']} error(s)"
+        )
+        for sample in error_samples:
+            self.stderr.write(f"  {sample}")
+
+    def _apply(self, outcomes, dry_run):
+        """Apply one batch of HitPay outcomes in a single transaction; returns the number changed."""
+        if not outcomes:
+            return 0
+        if dry_run:
+            for payment_request_id, (hitpay_status, _) in outcomes.items():
+                self.stdout.write(f"  {payment_request_id}: pending -> {hitpay_status}")
+            return len(outcomes)
+
+        with transaction.atomic():
+            payments = Payment.objects.filter(status='pending', payment_request_id__in=outcomes)
+            now = timezone.now()
+            changed = []
+            for payment in payments:
+                hitpay_status, payment_id = outcomes[payment.payment_request_id]
+                # Conditional on the stored status, so a payment a webhook settled meanwhile is left alone
+                if apply_hitpay_status(payment, hitpay_status, payment_id, now):
+                    changed.append(payment)
+            for payment in changed:
+                events.publish_payment_status(payment)
+        return len(changed)
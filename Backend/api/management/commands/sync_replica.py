@@ -0,0 +1,47 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.routers import REPLICA
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database onto the replica file (DATABASE_REPLICA_NAME). "
+        "A stand-in for real replication when running the read replica locally."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds between copies, i.e. the simulated replication lag')
+        parser.add_argument('--once', action='store_true',
+                            help='Copy once and exit instead of running continuously')
+
+    def handle(self, *args, **options):
+        if REPLICA not in settings.DATABASES:
+            raise CommandError("No replica configured; set DATABASE_REPLICA_NAME.")
+        primary = settings.DATABASES['default']
+        replica = settings.DATABASES[REPLICA]
+        if primary['ENGINE'] != 'django.db.backends.sqlite3' or replica['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError("sync_replica only copies SQLite databases.")
+
+        while True:
+            started = time.perf_counter()
+            self.copy(str(primary['NAME']), str(replica['NAME']))
+            self.stdout.write(f"Copied primary to replica in {(time.perf_counter() - started) * 1000:.0f}ms")
+            if options['once']:
+                return
+            time.sleep(options['interval'])
+
+    def copy(self, source, target):
+        # The backup API copies a consistent snapshot and writes the target in a
+        # single transaction, so replica readers never see a half-copied file.
+        source_connection = sqlite3.connect(source)
+        target_connection = sqlite3.connect(target, timeout=20)
+        try:
+            source_connection.backup(target_connection)
+        finally:
+            target_connection.close()
+            source_connection.close()
@@ -0,0 +1,223 @@
+"""
+Lightweight request, database and HitPay metrics in Prometheus text format.
+
+Each process keeps its own counters and histograms in memory. When
+METRICS_DIR is set, every process also writes a snapshot there (at most
+once per METRICS_FLUSH_INTERVAL), and /metrics sums all snapshots, so the
+totals cover every worker rather than whichever one served the scrape.
+"""
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name -> (type, help, label names, histogram buckets). Gauges from several
+# processes are combined with max(), counters and histograms are summed.
+METRICS = {
+    'http_requests_total': (
+        'counter', 'Requests by route, method and response status.', ('route', 'method', 'status'), None,
+    ),
+    'http_request_duration_seconds': (
+        'histogram', 'Time to produce the response, by route and method.', ('route', 'method'), LATENCY_BUCKETS,
+    ),
+    'http_request_db_queries_total': (
+        'counter', 'Database queries run while handling requests, by route.', ('route',), None,
+    ),
+    'http_request_db_seconds_total': (
+        'counter', 'Time spent in database queries while handling requests, by route.', ('route',), None,
+    ),
+    'hitpay_request_duration_seconds': (
+        'histogram', 'Outbound HitPay API calls by operation and outcome.', ('operation', 'outcome'), LATENCY_BUCKETS,
+    ),
+    'hitpay_retries_total': (
+        'counter', 'HitPay calls retried after a transient failure, by operation.', ('operation',), None,
+    ),
+    'hitpay_circuit_rejections_total': (
+        'counter', 'HitPay calls refused without being sent because the circuit was open.', ('operation',), None,
+    ),
+    'hitpay_circuit_transitions_total': (
+        'counter', 'HitPay circuit breaker state changes, by new state.', ('state',), None,
+    ),
+    'reviews_feed_requests_total': (
+        'counter', 'Reviews feed page requests by outcome: hit, rebuild, waited (for another rebuild) or timeout.',
+        ('outcome',), None,
+    ),
+    'hitpay_circuit_state': (
+        'gauge', 'HitPay circuit breaker state: 0 closed, 1 half-open, 2 open (worst across workers).', (), None,
+    ),
+}
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_histograms = {}
+_last_flush = 0.0
+_snapshot_pid = None
+_snapshot_name = None
+
+# Query totals for the request being handled in this context, see record_query()
+current_request = ContextVar('metrics_request', default=None)
+
+
+class RequestStats:
+    __slots__ = ('queries', 'query_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+def inc(name, labels, value=1):
+    key = (name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name, labels, value):
+    with _lock:
+        _gauges[(name, labels)] = value
+
+
+def observe(name, labels, value):
+    buckets = METRICS[name][3]
+    key = (name, labels)
+    with _lock:
+        series = _histograms.get(key)
+        if series is None:
+            # One count per bucket plus +Inf, then sum
+            series = _histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+        series[bisect_left(buckets, value)] += 1
+        series[-1] += value
+
+
+def record_request(route, method, status_code, duration, stats):
+    with _lock:
+        for name, labels, value in (
+            ('http_requests_total', (route, method, str(status_code)), 1),
+            ('http_request_db_queries_total', (route,), stats.queries),
+            ('http_request_db_seconds_total', (route,), stats.query_seconds),
+        ):
+            key = (name, labels)
+            _counters[key] = _counters.get(key, 0) + value
+    observe('http_request_duration_seconds', (route, method), duration)
+    maybe_flush()
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper, installed on every connection by ApiConfig.ready()."""
+    stats = current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.query_seconds += time.perf_counter() - started
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def snapshot():
+    with _lock:
+        return {
+            'counters': [[name, list(labels), value] for (name, labels), value in _counters.items()],
+            'gauges': [[name, list(labels), value] for (name, labels), value in _gauges.items()],
+            'histograms': [[name, list(labels), list(series)] for (name, labels), series in _histograms.items()],
+        }
+
+
+def maybe_flush(force=False):
+    """Write this process's snapshot to METRICS_DIR, at most once per METRICS_FLUSH_INTERVAL."""
+    global _last_flush, _snapshot_pid, _snapshot_name
+    directory = settings.METRICS_DIR
+    if not directory:
+        return
+    now = time.monotonic()
+    if not force and now - _last_flush < settings.METRICS_FLUSH_INTERVAL:
+        return
+    _last_flush = now
+    if _snapshot_pid != os.getpid():
+        # Named per process (and start time, as PIDs get reused), chosen after any fork
+        _snapshot_pid = os.getpid()
+        _snapshot_name = f"{_snapshot_pid}-{int(time.time() * 1000)}.json"
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, _snapshot_name)
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w') as f:
+        json.dump(snapshot(), f)
+    os.replace(temporary, path)
+
+
+def _merged():
+    if not settings.METRICS_DIR:
+        return [snapshot()]
+    maybe_flush(force=True)
+    snapshots = []
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.json')):
+        try:
+            with open(path) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            # Removed or being replaced by its process; its next snapshot will be picked up
+            continue
+    return snapshots
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def render():
+    """All processes' metrics, summed per series, as Prometheus text exposition format."""
+    counters = {}
+    gauges = {}
+    histograms = {}
+    for data in _merged():
+        for name, labels, value in data['counters']:
+            key = (name, tuple(labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, value in data.get('gauges', ()):
+            key = (name, tuple(labels))
+            gauges[key] = max(gauges.get(key, value), value)
+        for name, labels, series in data['histograms']:
+            key = (name, tuple(labels))
+            merged = histograms.get(key)
+            histograms[key] = series if merged is None else [a + b for a, b in zip(merged, series)]
+
+    lines = []
+    for name, (kind, help_text, label_names, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind in ('counter', 'gauge'):
+            for (series_name, labels), value in sorted((counters if kind == 'counter' else gauges).items()):
+                if series_name == name:
+                    lines.append(f"{name}{_format_labels(label_names, labels)} {value}")
+            continue
+        for (series_name, labels), series in sorted(histograms.items()):
+            if series_name != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], series[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(label_names, labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(label_names, labels)} {series[-1]}")
+            lines.append(f"{name}_count{_format_labels(label_names, labels)} {cumulative}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:01
+
+from django.db import migrations, models
+
+
+def backfill_review_stats(apps, schema_editor):
+    Review = apps.get_model('api', 'Review')
+    ReviewStats = apps.get_model('api', 'ReviewStats')
+    totals = Review.objects.aggregate(count=models.Count('id'), rating_sum=models.Sum('rating'))
+    stars = dict(Review.objects.filter(rating__in=range(1, 6)).values_list('rating').annotate(models.Count('id')))
+    ReviewStats.objects.create(
+        pk=1,
+        count=totals['count'],
+        rating_sum=totals['rating_sum'] or 0,
+        **{f"star_{star}": stars.get(star, 0) for star in range(1, 6)},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_review_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0)),
+                ('rating_sum', models.BigIntegerField(default=0)),
+                ('star_1', models.IntegerField(default=0)),
+                ('star_2', models.IntegerField(default=0)),
+                ('star_3', models.IntegerField(default=0)),
+                ('star_4', models.IntegerField(default=0)),
+                ('star_5', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_review_stats, migrations.RunPython.noop),
+    ]
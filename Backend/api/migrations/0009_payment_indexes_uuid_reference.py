@@ -0,0 +1,76 @@
+import uuid
+
+from django.db import migrations, models
+
+
+def copy_references(apps, schema_editor):
+    """Fill reference_uuid from the string reference_number column."""
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        # Django stores UUIDs on SQLite as 32 lowercase hex chars
+        schema_editor.execute(
+            "UPDATE api_payment SET reference_uuid = lower(replace(reference_number, '-', '')) "
+            "WHERE reference_number IS NOT NULL"
+        )
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "UPDATE api_payment SET reference_uuid = reference_number::uuid WHERE reference_number IS NOT NULL"
+        )
+    else:
+        Payment = apps.get_model('api', 'Payment')
+        batch = []
+        for pk, reference in Payment.objects.exclude(reference_number=None).values_list('pk', 'reference_number').iterator(chunk_size=2000):
+            batch.append(Payment(pk=pk, reference_uuid=uuid.UUID(reference)))
+            if len(batch) == 2000:
+                Payment.objects.bulk_update(batch, ['reference_uuid'])
+                batch = []
+        Payment.objects.bulk_update(batch, ['reference_uuid'])
+
+
+def copy_references_back(apps, schema_editor):
+    Payment = apps.get_model('api', 'Payment')
+    batch = []
+    for pk, reference in Payment.objects.exclude(reference_uuid=None).values_list('pk', 'reference_uuid').iterator(chunk_size=2000):
+        batch.append(Payment(pk=pk, reference_number=str(reference)))
+        if len(batch) == 2000:
+            Payment.objects.bulk_update(batch, ['reference_number'])
+            batch = []
+    Payment.objects.bulk_update(batch, ['reference_number'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_payment_status_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['email', 'created_at'], name='payment_email_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['paid_at'], name='payment_paid_at_idx'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='reference_uuid',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.RunPython(copy_references, copy_references_back),
+        migrations.RemoveField(
+            model_name='payment',
+            name='reference_number',
+        ),
+        migrations.RenameField(
+            model_name='payment',
+            old_name='reference_uuid',
+            new_name='reference_number',
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='reference_number',
+            field=models.UUIDField(blank=True, null=True, unique=True),
+        ),
+    ]
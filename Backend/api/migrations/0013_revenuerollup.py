@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:20
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def backfill_revenue_rollups(apps, schema_editor):
+    """The same rows as RevenueRollup.rebuild(), so existing payments move between counted rows."""
+    RevenueRollup = apps.get_model('api', 'RevenueRollup')
+    day = models.Case(
+        models.When(status='completed', paid_at__isnull=False, then=TruncDate('paid_at')),
+        default=TruncDate('created_at'),
+        output_field=models.DateField(),
+    )
+    totals = {}
+    for model_name in ('ArchivedPayment', 'Payment'):
+        rows = (
+            apps.get_model('api', model_name).objects.order_by().annotate(day=day)
+            .values('day', 'currency', 'status')
+            .annotate(count=models.Count('id'), amount=models.Sum('amount'))
+        )
+        for row in rows:
+            key = (row['day'], row['currency'], row['status'])
+            count, amount = totals.get(key, (0, Decimal(0)))
+            totals[key] = (count + row['count'], amount + row['amount'])
+    RevenueRollup.objects.bulk_create(
+        [RevenueRollup(day=day, currency=currency, status=status, count=count, amount=amount)
+         for (day, currency, status), (count, amount) in totals.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_archivedpayment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('currency', models.CharField(max_length=3)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'currency', 'status'), name='unique_revenue_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_revenue_rollups, migrations.RunPython.noop),
+    ]
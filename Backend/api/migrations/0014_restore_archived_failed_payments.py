@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+def restore_failed_payments(apps, schema_editor):
+    """
+    Move failed payments back from the archive: a retried card can still
+    complete them, and webhooks only update the live table.
+    """
+    Payment = apps.get_model('api', 'Payment')
+    ArchivedPayment = apps.get_model('api', 'ArchivedPayment')
+    quote = schema_editor.connection.ops.quote_name
+    # New ids: SQLite may have handed an archived payment's id to a later payment
+    columns = ', '.join(
+        quote(field.column) for field in Payment._meta.concrete_fields if not field.primary_key
+    )
+    schema_editor.execute(
+        f"INSERT INTO {quote(Payment._meta.db_table)} ({columns}) "
+        f"SELECT {columns} FROM {quote(ArchivedPayment._meta.db_table)} WHERE {quote('status')} = %s",
+        ['failed'],
+    )
+    ArchivedPayment.objects.filter(status='failed').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_revenuerollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(restore_failed_payments, migrations.RunPython.noop),
+    ]
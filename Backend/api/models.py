@@ -1,4 +1,8 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models.functions import TruncDate
+from django.utils import timezone
 import uuid
 
 class Review(models.Model):
@@ -10,17 +14,109 @@ class Review(models.Model):
     def __str__(self):
         return f"{self.author_name} ({self.rating}★)"
 
-class Payment(models.Model):
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='review_created_id_idx'),
+        ]
+
+class ReviewStats(models.Model):
+    """
+    Running rating totals over all reviews, kept as a single row (pk=1).
+
+    Review writes apply their delta with one UPDATE in the same transaction,
+    so reading stats costs the same however many reviews exist.
+    """
+    STARS = range(1, 6)
+
+    count = models.IntegerField(default=0)
+    rating_sum = models.BigIntegerField(default=0)
+    star_1 = models.IntegerField(default=0)
+    star_2 = models.IntegerField(default=0)
+    star_3 = models.IntegerField(default=0)
+    star_4 = models.IntegerField(default=0)
+    star_5 = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Review stats ({self.count} reviews)"
+
+    @classmethod
+    def record(cls, added=None, removed=None):
+        """Apply a created (added), deleted (removed) or changed (both) review rating."""
+        deltas = {'count': 0, 'rating_sum': 0}
+        for rating, sign in ((added, 1), (removed, -1)):
+            if rating is None:
+                continue
+            deltas['count'] += sign
+            deltas['rating_sum'] += sign * rating
+            if rating in cls.STARS:
+                field = f"star_{rating}"
+                deltas[field] = deltas.get(field, 0) + sign
+        cls._apply(deltas)
+
+    @classmethod
+    def record_many(cls, ratings):
+        """Apply a batch of created review ratings with one UPDATE."""
+        deltas = {'count': len(ratings), 'rating_sum': sum(ratings)}
+        for rating in ratings:
+            if rating in cls.STARS:
+                field = f"star_{rating}"
+                deltas[field] = deltas.get(field, 0) + 1
+        cls._apply(deltas)
+
+    @classmethod
+    def _apply(cls, deltas):
+        changes = {field: models.F(field) + delta for field, delta in deltas.items() if delta}
+        if changes and not cls.objects.filter(pk=1).update(**changes):
+            cls.rebuild()
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute the summary row from the reviews table."""
+        totals = Review.objects.aggregate(count=models.Count('id'), rating_sum=models.Sum('rating'))
+        stars = dict(Review.objects.filter(rating__in=cls.STARS).values_list('rating').annotate(models.Count('id')))
+        defaults = {
+            'count': totals['count'],
+            'rating_sum': totals['rating_sum'] or 0,
+            **{f"star_{star}": stars.get(star, 0) for star in cls.STARS},
+        }
+        return cls.objects.update_or_create(pk=1, defaults=defaults)[0]
+
+    def summary(self, min_rating=None, max_rating=None):
+        """Count, mean and 1-5 histogram, optionally limited to a rating range."""
+        if min_rating is None and max_rating is None:
+            count, rating_sum = self.count, self.rating_sum
+            histogram = {str(star): getattr(self, f"star_{star}") for star in self.STARS}
+        else:
+            low = min_rating if min_rating is not None else 1
+            high = max_rating if max_rating is not None else 5
+            histogram = {
+                str(star): getattr(self, f"star_{star}") if low <= star <= high else 0
+                for star in self.STARS
+            }
+            count = sum(histogram.values())
+            rating_sum = sum(int(star) * n for star, n in histogram.items())
+        return {
+            'count': count,
+            'mean_rating': round(rating_sum / count, 2) if count else None,
+            'histogram': histogram,
+        }
+
+class BasePayment(models.Model):
+    """Columns shared by the live payments table and its archive."""
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('completed', 'Completed'),
         ('failed', 'Failed'),
         ('cancelled', 'Cancelled'),
     ]
+    # Statuses a payment never leaves. A failed payment isn't one: the customer can
+    # retry the card on the same HitPay payment request and complete it (api/transitions.py)
+    TERMINAL_STATUSES = ('completed', 'cancelled')
     
     # HitPay specific fields
     payment_request_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
-    reference_number = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    # Always a UUID; stored natively (or as 32 hex chars on SQLite) instead of a 255-char string
+    reference_number = models.UUIDField(unique=True, null=True, blank=True)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     currency = models.CharField(max_length=3, default='SGD')
     
@@ -42,8 +138,212 @@ class Payment(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     paid_at = models.DateTimeField(blank=True, null=True)
     
+    @staticmethod
+    def parse_reference(value):
+        """The UUID for a reference number string, or None if it cannot be one."""
+        try:
+            return uuid.UUID(str(value))
+        except ValueError:
+            return None
+
     def __str__(self):
         return f"Payment {self.reference_number} - {self.status} - {self.amount} {self.currency}"
-    
+
+    class Meta:
+        abstract = True
+
+class Payment(BasePayment):
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='payment_status_created_idx'),
+            models.Index(fields=['email', 'created_at'], name='payment_email_created_idx'),
+            models.Index(fields=['paid_at'], name='payment_paid_at_idx'),
+            # Date-range exports stream in (created_at, id) order straight off this index, with no sort
+            models.Index(fields=['created_at', 'id'], name='payment_created_id_idx'),
+        ]
+
+class ArchivedPayment(BasePayment):
+    """
+    Settled payment moved out of the live table by `manage.py archive_payments`,
+    keeping its original id. Nothing writes to it after archiving; the status
+    endpoints and exports read it when a payment isn't in the live table.
+    """
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='archived_created_id_idx'),
+            models.Index(fields=['email', 'created_at'], name='archived_email_created_idx'),
+        ]
+
+class RevenueRollup(models.Model):
+    """
+    Payment count and amount per day, currency and status.
+
+    Each payment is counted once, under its current status: completed payments
+    on the day they were paid, the rest on the day they were created. Payment
+    creation and every status transition move it between rows in the same
+    transaction (api/transitions.py), so reports read a few rows per day
+    however many payments there are. Archiving doesn't touch the rollups.
+    `manage.py rebuild_revenue_rollups` recomputes them from scratch.
+    """
+    day = models.DateField()
+    currency = models.CharField(max_length=3)
+    status = models.CharField(max_length=20, choices=BasePayment.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.day} {self.currency} {self.status}: {self.count} / {self.amount}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'currency', 'status'], name='unique_revenue_rollup'),
+        ]
+
+    @staticmethod
+    def bucket(payment, status=None):
+        """The (day, currency, status) row a payment counts under, with `status` in place of its own."""
+        status = status or payment.status
+        moment = payment.paid_at if status == 'completed' and payment.paid_at else payment.created_at
+        return timezone.localdate(moment), payment.currency, status
+
+    @classmethod
+    def record(cls, added=(), removed=()):
+        """Count payments into (added) or out of (removed) rows; both are (payment, status) pairs."""
+        deltas = {}
+        for entries, sign in ((added, 1), (removed, -1)):
+            for payment, status in entries:
+                key = cls.bucket(payment, status)
+                count, amount = deltas.get(key, (0, Decimal(0)))
+                deltas[key] = (count + sign, amount + sign * Decimal(str(payment.amount)))
+        for key, (count, amount) in deltas.items():
+            if count or amount:
+                cls._apply(key, count, amount)
+
+    @classmethod
+    def _apply(cls, key, count, amount):
+        day, currency, status = key
+        rows = cls.objects.filter(day=day, currency=currency, status=status)
+        changes = {'count': models.F('count') + count, 'amount': models.F('amount') + amount}
+        if rows.update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(day=day, currency=currency, status=status, count=count, amount=amount)
+        except IntegrityError:
+            # Another transaction created the row since the UPDATE
+            rows.update(**changes)
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute every row from the live and archived payments; returns the number of rows."""
+        day = models.Case(
+            models.When(status='completed', paid_at__isnull=False, then=TruncDate('paid_at')),
+            default=TruncDate('created_at'),
+            output_field=models.DateField(),
+        )
+        totals = {}
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Transitions wait on their rollup update until this commits, so none is lost or counted twice
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LOCK TABLE {cls._meta.db_table} IN EXCLUSIVE MODE')
+            for model in (ArchivedPayment, Payment):
+                rows = (
+                    model.objects.order_by().annotate(day=day).values('day', 'currency', 'status')
+                    .annotate(count=models.Count('id'), amount=models.Sum('amount'))
+                )
+                for row in rows:
+                    key = (row['day'], row['currency'], row['status'])
+                    count, amount = totals.get(key, (0, Decimal(0)))
+                    totals[key] = (count + row['count'], amount + row['amount'])
+            cls.objects.all().delete()
+            cls.objects.bulk_create(
+                [cls(day=day, currency=currency, status=status, count=count, amount=amount)
+                 for (day, currency, status), (count, amount) in totals.items()],
+                batch_size=1000,
+            )
+        return len(totals)
+
+    @classmethod
+    def summary(cls, start, end, group='day', currencies=None):
+        """
+        Revenue (completed amount) and counts per status for each period with
+        payments, and totals over the range, per currency. Days run from start
+        (inclusive) to end (exclusive); group is 'day' or 'month'.
+        """
+        rows = cls.objects.filter(day__gte=start, day__lt=end, count__gt=0)
+        if currencies:
+            rows = rows.filter(currency__in=currencies)
+        periods = {}
+        totals = {}
+        for day, currency, status, count, amount in rows.order_by('day', 'currency').values_list(
+            'day', 'currency', 'status', 'count', 'amount'
+        ):
+            period = day.isoformat() if group == 'day' else day.strftime('%Y-%m')
+            for entries, key in ((periods, (period, currency)), (totals, currency)):
+                entry = entries.setdefault(key, {
+                    'revenue': Decimal('0.00'),
+                    'counts': {choice: 0 for choice, _ in BasePayment.STATUS_CHOICES},
+                })
+                entry['counts'][status] += count
+                if status == 'completed':
+                    entry['revenue'] += amount
+        return {
+            'periods': [
+                {'period': period, 'currency': currency, 'revenue': str(entry['revenue']), 'counts': entry['counts']}
+                for (period, currency), entry in periods.items()
+            ],
+            'totals': [
+                {'currency': currency, 'revenue': str(entry['revenue']), 'counts': entry['counts']}
+                for currency, entry in sorted(totals.items())
+            ],
+        }
+
+class WebhookEvent(models.Model):
+    """Verified HitPay webhook stored on receipt and applied later by the process_webhooks worker."""
+    payload = models.JSONField()
+    payment_request_id = models.CharField(max_length=255)
+    payment_id = models.CharField(max_length=255, blank=True, null=True)
+    status = models.CharField(max_length=50, blank=True, null=True)
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Webhook {self.payment_request_id} - {self.status}"
+
+    class Meta:
+        ordering = ['id']
+        constraints = [
+            # HitPay redeliveries of the same event are dropped on insert
+            models.UniqueConstraint(fields=['payment_id', 'status'], name='unique_webhook_payment_status'),
+        ]
+        indexes = [
+            models.Index(fields=['processed_at', 'id'], name='webhook_pending_idx'),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    """
+    Outcome of a request sent with an Idempotency-Key header, so retries get the
+    stored response instead of repeating the work. A row with no response_status
+    is a request still in flight.
+    """
+    key = models.CharField(max_length=255, unique=True)
+    fingerprint = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(blank=True, null=True)
+    response_body = models.JSONField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Idempotency key {self.key} - {self.response_status or 'in flight'}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='idempotency_created_idx'),
+        ]
@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ReviewCursorPagination(CursorPagination):
+    """
+    Keyset pagination for /api/reviews/ over the (created_at, id) index.
+
+    Every page is a range scan from the cursor position, so deep pages cost the
+    same as the first and no COUNT(*) is issued.
+    """
+    page_size = 10
+    ordering = ('-created_at', '-id')
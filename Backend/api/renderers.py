@@ -0,0 +1,58 @@
+"""
+JSON rendering with orjson when it is installed.
+
+Output matches DRF's JSONRenderer with the default settings (compact, UTF-8,
+U+2028/U+2029 escaped). Datetimes, Decimals and the other types orjson would
+format its own way go through DRF's encoder. Indented output, non-default
+UNICODE_JSON/COMPACT_JSON and anything orjson can't encode (such as integers
+beyond 64 bits) fall back to DRF's renderer, as do Decimals that DRF would
+write in exponent form. Only floats differ: very large or small ones are
+written as '1e16' rather than '1e+16', and NaN/Infinity render as null where
+DRF raises.
+"""
+from decimal import Decimal
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_drf_default = JSONEncoder().default
+
+if orjson is not None:
+    OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+def _default(obj):
+    value = _drf_default(obj)
+    # DRF writes Decimals as floats; leave the ones that need an exponent, NaN or
+    # Infinity to DRF, since orjson formats those differently
+    if isinstance(obj, Decimal) and isinstance(value, float) and any(c in repr(value) for c in 'en'):
+        raise TypeError(f"{obj!r} is rendered by DRF's encoder")
+    return value
+
+
+def dumps(data):
+    """Compact UTF-8 JSON bytes for data, encoded like DRF's JSONRenderer."""
+    return orjson.dumps(data, default=_default, option=OPTIONS).replace(
+        b'\xe2\x80\xa8', b'\\u2028'
+    ).replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or not self.compact
+            or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            return dumps(data)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
@@ -0,0 +1,84 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+REPLICA = 'replica'
+
+# Entered by ReplicaReadMixin for safe-method requests to the views that use it
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def payment_key(reference_number):
+    return f"payment:{reference_number}"
+
+
+def _written_key(key):
+    return f"replica-written:{key}"
+
+
+def mark_written(key):
+    """Record a committed write so reads of `key` stay on the primary until the replica has caught up."""
+    if replica_configured():
+        cache.set(_written_key(key), True, settings.REPLICA_READ_AFTER_WRITE_WINDOW)
+
+
+async def amark_written(key):
+    if replica_configured():
+        await cache.aset(_written_key(key), True, settings.REPLICA_READ_AFTER_WRITE_WINDOW)
+
+
+def recently_written(key):
+    return replica_configured() and cache.get(_written_key(key)) is not None
+
+
+def any_recently_written(keys):
+    """recently_written() for several keys with a single cache round trip."""
+    return replica_configured() and bool(cache.get_many([_written_key(key) for key in keys]))
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def primary_reads(enabled=True):
+    """Send reads in this block to the primary, e.g. when the replica may not have a fresh write yet."""
+    if not enabled:
+        yield
+        return
+    with replica_reads(False):
+        yield
+
+
+class PrimaryReplicaRouter:
+    """
+    Reads go to the replica only inside replica_reads(), which ReplicaReadMixin
+    enters for safe-method requests. Everything else, including every write and
+    the reads inside write requests, uses default.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and replica_configured():
+            return REPLICA
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary and receives its schema from it
+        return db != REPLICA
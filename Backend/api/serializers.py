@@ -1,7 +1,12 @@
 from rest_framework import serializers
-from .models import Review
+from .models import Review, Payment
 
 class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
         fields = "__all__"
+
+class PaymentStatusSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Payment
+        fields = ("reference_number", "status", "amount", "currency", "created_at", "paid_at")
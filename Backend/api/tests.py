@@ -1,3 +1,1015 @@
-from django.test import TestCase
+import base64
+import csv
+import hashlib
+import hmac
+import importlib
+import io
+import json
+import socket
+import time
+import uuid
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from benchmarks.fake_hitpay import FakeHitPay
+
+from . import archive, cache as payment_cache, events, feed, hitpay, imports, parsers, renderers, transitions
+from .models import ArchivedPayment, IdempotencyKey, Payment, RevenueRollup, Review, ReviewStats, WebhookEvent
+from .serializers import PaymentStatusSerializer, ReviewSerializer
+from .views import ReviewDetailView
+from .webhooks import WebhookRejected, verify_hitpay_webhook
+
+SALT = 'test-salt'
+
+
+def create_payment(amount='10.00', **fields):
+    return transitions.create(amount=Decimal(amount), name='Ana Lim', email='ana@example.com', **fields)
+
+
+def archived_payment(amount='10.00', days_old=200):
+    """A completed payment moved to the archive, as archive_payments would."""
+    old = timezone.now() - timedelta(days=days_old)
+    payment = create_payment(amount)
+    transitions.transition(payment, 'completed', {'paid_at': old})
+    Payment.objects.filter(pk=payment.pk).update(created_at=old)
+    archive.archive_batch(old + timedelta(seconds=1), 1)
+    return ArchivedPayment.objects.get(reference_number=payment.reference_number)
+
+
+def rollups():
+    """{(day, currency, status): (count, amount)} for every row with payments in it."""
+    return {
+        (row.day, row.currency, row.status): (row.count, row.amount)
+        for row in RevenueRollup.objects.all()
+        if row.count or row.amount
+    }
+
+
+class TransitionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_allowed_and_refused_transitions(self):
+        cases = [
+            ('pending', 'completed', True),
+            ('pending', 'failed', True),
+            ('pending', 'cancelled', True),
+            ('pending', 'pending', True),
+            ('failed', 'completed', True),
+            ('failed', 'failed', False),
+            ('failed', 'cancelled', False),
+            ('completed', 'failed', False),
+            ('completed', 'pending', False),
+            ('completed', 'cancelled', False),
+            ('cancelled', 'completed', False),
+            ('cancelled', 'pending', False),
+        ]
+        for current, new_status, allowed in cases:
+            with self.subTest(current=current, new_status=new_status):
+                payment = create_payment()
+                Payment.objects.filter(pk=payment.pk).update(status=current)
+                payment.status = current
+
+                changed = transitions.transition(payment, new_status, {'hitpay_status': new_status})
+
+                self.assertEqual(changed, allowed)
+                stored = Payment.objects.get(pk=payment.pk)
+                self.assertEqual(stored.status, new_status if allowed else current)
+                self.assertEqual(stored.hitpay_status, new_status if allowed else None)
+                # A refused transition leaves the instance untouched too
+                self.assertEqual(payment.status, stored.status)
+
+    def test_pending_to_pending_only_records_fields(self):
+        payment = create_payment()
+        before = rollups()
+
+        self.assertTrue(transitions.transition(payment, 'pending', {'hitpay_status': 'processing'}))
+
+        payment.refresh_from_db()
+        self.assertEqual((payment.status, payment.hitpay_status), ('pending', 'processing'))
+        self.assertEqual(rollups(), before)
+
+    def test_create_and_discard_update_rollups(self):
+        payment = create_payment('12.50')
+        day = timezone.localdate(payment.created_at)
+        self.assertEqual(rollups(), {(day, 'SGD', 'pending'): (1, Decimal('12.50'))})
+
+        transitions.discard(payment)
+
+        self.assertFalse(Payment.objects.filter(pk=payment.pk).exists())
+        self.assertEqual(rollups(), {})
+
+    def test_transition_moves_payment_between_rollup_rows(self):
+        payment = create_payment('30.00')
+        created_day = timezone.localdate(payment.created_at)
+        paid_at = payment.created_at + timedelta(days=2)
+
+        self.assertTrue(transitions.transition(payment, 'completed', {'paid_at': paid_at}))
+
+        # Completed payments count on the day they were paid
+        self.assertEqual(rollups(), {(timezone.localdate(paid_at), 'SGD', 'completed'): (1, Decimal('30.00'))})
+        self.assertNotEqual(created_day, timezone.localdate(paid_at))
+
+    def test_refused_transition_leaves_rollups_alone(self):
+        payment = create_payment()
+        transitions.transition(payment, 'cancelled')
+        before = rollups()
+
+        self.assertFalse(transitions.transition(payment, 'completed', {'paid_at': timezone.now()}))
+
+        self.assertEqual(rollups(), before)
+
+    def test_transition_many_changes_only_allowed_payments(self):
+        pending = [create_payment('5.00') for _ in range(3)]
+        failed = create_payment('7.00')
+        transitions.transition(failed, 'failed')
+        completed = create_payment('9.00')
+        transitions.transition(completed, 'completed', {'paid_at': timezone.now()})
+        references = [payment.reference_number for payment in [*pending, failed, completed]]
+
+        changed = transitions.transition_many(references, 'completed', {'paid_at': timezone.now()})
+
+        self.assertCountEqual(
+            [payment.reference_number for payment in changed],
+            [payment.reference_number for payment in [*pending, failed]],
+        )
+        self.assertTrue(all(payment.status == 'completed' for payment in changed))
+        self.assertEqual(Payment.objects.filter(status='completed').count(), 5)
+        totals = {}
+        for (_, _, status), (count, amount) in rollups().items():
+            total_count, total_amount = totals.get(status, (0, Decimal(0)))
+            totals[status] = (total_count + count, total_amount + amount)
+        self.assertEqual(totals, {'completed': (5, Decimal('31.00'))})
+
+    def test_failed_payments_stay_live_for_a_retry(self):
+        old = timezone.now() - timedelta(days=400)
+        payments = {status: create_payment() for status in ('completed', 'cancelled', 'failed', 'pending')}
+        for status, payment in payments.items():
+            if status != 'pending':
+                transitions.transition(payment, status, {'paid_at': old} if status == 'completed' else None)
+        Payment.objects.update(created_at=old)
+
+        self.assertEqual(archive.archive_batch(timezone.now(), 10), 2)
+
+        self.assertCountEqual(ArchivedPayment.objects.values_list('status', flat=True), ['completed', 'cancelled'])
+        failed = Payment.objects.get(pk=payments['failed'].pk)
+        self.assertTrue(transitions.transition(failed, 'completed', {'paid_at': timezone.now()}))
+
+    async def test_stream_stays_open_after_a_failure(self):
+        reference = '00000000-0000-0000-0000-000000000001'
+        await cache.aset(events._event_key(reference), {'reference_number': reference, 'status': 'completed'})
+
+        stream = events.stream_payment_status(reference, {'reference_number': reference, 'status': 'failed'}, None)
+        messages = [message async for message in stream]
+
+        self.assertEqual(len(messages), 3)
+        self.assertIn('"status": "failed"', messages[1])
+        self.assertIn('"status": "completed"', messages[2])
+
+
+@override_settings(HITPAY_SALT=SALT)
+class WebhookVerificationTests(TestCase):
+    fields = {
+        'payment_id': 'pay-1',
+        'payment_request_id': 'req-1',
+        'amount': '10.00',
+        'currency': 'SGD',
+        'status': 'completed',
+        'reference_number': 'ref-1',
+    }
+
+    def setUp(self):
+        cache.clear()
+
+    def sign_fields(self, fields):
+        message = ''.join(f"{key}{value}" for key, value in sorted(fields.items()))
+        return hmac.new(SALT.encode(), message.encode(), hashlib.sha256).hexdigest()
+
+    def test_form_body(self):
+        body = urlencode({**self.fields, 'hmac': self.sign_fields(self.fields)}).encode()
+
+        fields, signature = verify_hitpay_webhook(body, 'application/x-www-form-urlencoded')
+
+        self.assertEqual(fields, self.fields)
+        self.assertEqual(signature, self.sign_fields(self.fields))
+
+    def test_json_body_with_hmac_field(self):
+        body = json.dumps({**self.fields, 'hmac': self.sign_fields(self.fields)}).encode()
+
+        fields, _ = verify_hitpay_webhook(body, 'application/json')
+
+        self.assertEqual(fields, self.fields)
+
+    def test_json_body_with_signature_header(self):
+        body = json.dumps({'id': 'pay-1', 'status': 'completed', 'amount': 10.0}).encode()
+        signature = hmac.new(SALT.encode(), body, hashlib.sha256).hexdigest()
+
+        fields, received = verify_hitpay_webhook(body, 'application/json', signature)
+
+        self.assertEqual(fields['status'], 'completed')
+        self.assertEqual(received, signature)
+
+    def test_rejects_tampered_and_unsigned_bodies(self):
+        tampered = {**self.fields, 'hmac': self.sign_fields(self.fields), 'amount': '0.01'}
+        json_body = json.dumps({'id': 'pay-1', 'status': 'completed'}).encode()
+        cases = [
+            ('tampered form', urlencode(tampered).encode(), 'application/x-www-form-urlencoded', None),
+            ('unsigned form', urlencode(self.fields).encode(), 'application/x-www-form-urlencoded', None),
+            ('wrong header', json_body, 'application/json', 'f' * 64),
+            ('header on a form', urlencode(self.fields).encode(), 'application/x-www-form-urlencoded',
+             hmac.new(SALT.encode(), urlencode(self.fields).encode(), hashlib.sha256).hexdigest()),
+            ('malformed json', b'{"status": ', 'application/json', None),
+            ('json array', b'[]', 'application/json', None),
+        ]
+        for name, body, content_type, signature in cases:
+            with self.subTest(name):
+                with self.assertRaises(WebhookRejected) as raised:
+                    verify_hitpay_webhook(body, content_type, signature)
+                self.assertEqual(raised.exception.status_code, 400)
+
+    @override_settings(HITPAY_SALT='')
+    def test_rejects_everything_without_a_salt(self):
+        body = urlencode({**self.fields, 'hmac': self.sign_fields(self.fields)}).encode()
+
+        with self.assertRaises(WebhookRejected) as raised:
+            verify_hitpay_webhook(body, 'application/x-www-form-urlencoded')
+
+        self.assertEqual(raised.exception.status_code, 500)
+
+    def test_view_stores_verified_webhooks_once(self):
+        body = urlencode({**self.fields, 'hmac': self.sign_fields(self.fields)})
+        for _ in range(2):
+            response = self.client.post(
+                '/api/payments/hitpay/webhook/', body, content_type='application/x-www-form-urlencoded'
+            )
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+        response = self.client.post(
+            '/api/payments/hitpay/webhook/', urlencode(self.fields), content_type='application/x-www-form-urlencoded'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class StatusUpdateConflictTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_manual_update_refused_with_409(self):
+        payment = create_payment()
+        transitions.transition(payment, 'completed', {'paid_at': timezone.now()})
+
+        response = self.client.post(
+            f'/api/payments/update-status/{payment.reference_number}/', {'status': 'failed'},
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {
+            'error': 'Cannot change a completed payment to failed',
+            'reference_number': str(payment.reference_number),
+            'status': 'completed',
+        })
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'completed')
+
+    def test_manual_update_applies_allowed_change(self):
+        payment = create_payment()
+
+        response = self.client.post(
+            f'/api/payments/update-status/{payment.reference_number}/', {'status': 'failed'},
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'failed')
+
+    def test_bulk_update_requires_staff(self):
+        payment = create_payment()
+        updates = {'updates': [{'reference_number': str(payment.reference_number), 'status': 'completed'}]}
+        User.objects.create_user('customer', password='x')
+
+        anonymous = self.client.post('/api/payments/bulk-update-status/', updates, content_type='application/json')
+        self.client.login(username='customer', password='x')
+        customer = self.client.post('/api/payments/bulk-update-status/', updates, content_type='application/json')
+
+        self.assertEqual(anonymous.status_code, 403)
+        self.assertEqual(customer.status_code, 403)
+        self.assertEqual(Payment.objects.get(pk=payment.pk).status, 'pending')
+
+    def test_bulk_update_accepts_basic_auth(self):
+        payment = create_payment()
+        User.objects.create_superuser('ops', 'ops@example.com', 'secret')
+
+        response = self.client.post(
+            '/api/payments/bulk-update-status/',
+            {'updates': [{'reference_number': str(payment.reference_number), 'status': 'completed'}]},
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f"Basic {base64.b64encode(b'ops:secret').decode()}",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Payment.objects.get(pk=payment.pk).status, 'completed')
+
+    def test_bulk_update_reports_each_result(self):
+        self.client.force_login(User.objects.create_superuser('ops', 'ops@example.com', 'x'))
+        pending = create_payment()
+        completed = create_payment()
+        transitions.transition(completed, 'completed', {'paid_at': timezone.now()})
+        unknown = '00000000-0000-0000-0000-000000000000'
+
+        response = self.client.post('/api/payments/bulk-update-status/', {'updates': [
+            {'reference_number': str(pending.reference_number), 'status': 'failed'},
+            {'reference_number': str(completed.reference_number), 'status': 'failed'},
+            {'reference_number': unknown, 'status': 'failed'},
+            {'reference_number': str(pending.reference_number), 'status': 'completed'},
+        ]}, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['updated'], 1)
+        self.assertEqual([result['result'] for result in data['results']], ['updated', 'conflict', 'not_found', 'invalid'])
+        self.assertEqual(data['results'][1]['error'], 'Cannot change a completed payment to failed')
+        self.assertEqual(Payment.objects.get(pk=completed.pk).status, 'completed')
+
+
+class StatusStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_initial_status_comes_from_the_status_cache(self):
+        payment = create_payment()
+        url = f'/api/payments/status/{payment.reference_number}/stream/'
+        self.client.get(url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertIn(f'"reference_number": "{payment.reference_number}"', response.content.decode())
+        self.assertIn('"status": "pending"', response.content.decode())
+
+    def test_status_change_reaches_the_next_stream(self):
+        payment = create_payment()
+        url = f'/api/payments/status/{payment.reference_number}/stream/'
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                f'/api/payments/update-status/{payment.reference_number}/', {'status': 'failed'},
+                content_type='application/json',
+            )
+
+        self.assertIn('"status": "failed"', self.client.get(url).content.decode())
+
+    def test_unknown_payment(self):
+        for reference in ['00000000-0000-0000-0000-000000000000', 'not-a-reference']:
+            with self.subTest(reference):
+                self.assertEqual(self.client.get(f'/api/payments/status/{reference}/stream/').status_code, 404)
+
+
+class PaymentStatusCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_write_during_a_miss_is_not_served_afterwards(self):
+        payment = create_payment()
+        read_payment = archive.get_payment
+
+        def read_then_write(reference):
+            stale = read_payment(reference)
+            # Another request completes the payment after this miss has read it
+            transitions.transition(Payment.objects.get(pk=payment.pk), 'completed', {'paid_at': timezone.now()})
+            payment_cache.invalidate_payment_status(str(reference))
+            return stale
+
+        with mock.patch.object(archive, 'get_payment', read_then_write):
+            entry = payment_cache.get_payment_status(str(payment.reference_number))
+        self.assertEqual(entry['data']['status'], 'pending')
+
+        self.assertEqual(payment_cache.get_payment_status(str(payment.reference_number))['data']['status'], 'completed')
+
+    def test_write_after_the_generation_key_expires_is_seen(self):
+        payment = create_payment()
+        reference = str(payment.reference_number)
+        payment_cache.get_payment_status(reference)
+        cache.delete(payment_cache._generation_key(reference))
+        payment_cache.get_payment_status(reference)
+
+        transitions.transition(payment, 'failed')
+        payment_cache.invalidate_payment_status(reference)
+
+        self.assertEqual(payment_cache.get_payment_status(reference)['data']['status'], 'failed')
+
+    def test_repeat_poll_with_etag_gets_304(self):
+        payment = create_payment()
+        url = f'/api/payments/status/{payment.reference_number}/'
+        first = self.client.get(url)
+        self.assertEqual(first['Cache-Control'], 'no-cache')
+
+        with self.assertNumQueries(0):
+            by_etag = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+            by_date = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+
+        for response in [by_etag, by_date]:
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b'')
+            self.assertEqual(response['ETag'], first['ETag'])
+
+    def test_status_change_gets_a_new_etag(self):
+        payment = create_payment()
+        url = f'/api/payments/status/{payment.reference_number}/'
+        first = self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/payments/update-status/{payment.reference_number}/', {'status': 'completed'},
+                             content_type='application/json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response.json()['status'], 'completed')
+
+    def test_spellings_of_a_reference_share_one_entry(self):
+        payment = create_payment()
+        first = self.client.get(f'/api/payments/status/{payment.reference_number}/')
+
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/api/payments/status/{str(payment.reference_number).upper()}/')
+
+        self.assertEqual(response['ETag'], first['ETag'])
+
+
+class ReviewsFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def post_review(self, text):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/reviews/', {'author_name': 'Ana', 'rating': 5, 'text': text},
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_write_during_a_rebuild_is_not_served_afterwards(self):
+        request = mock.Mock(accepted_media_type='application/json')
+        request.build_absolute_uri.return_value = 'http://testserver/api/reviews/'
+
+        def render_then_write():
+            # A review is written after this rebuild has queried the page
+            feed.invalidate()
+            return b'stale'
+
+        self.assertEqual(feed.get_page(request, render_then_write), b'stale')
+        self.assertEqual(feed.get_page(request, lambda: b'fresh'), b'fresh')
+
+    def test_write_after_the_generation_key_expires_is_seen(self):
+        self.post_review('first')
+        self.client.get('/api/reviews/')
+        cache.delete(feed.GENERATION_KEY)
+        self.client.get('/api/reviews/')
+
+        self.post_review('second')
+
+        texts = [review['text'] for review in self.client.get('/api/reviews/').json()['results']]
+        self.assertEqual(texts, ['second', 'first'])
+
+
+class HitPayTestCase(TestCase):
+    """Runs each test against a local FakeHitPay with a fresh circuit breaker."""
+
+    fail_next = 0
+
+    def setUp(self):
+        cache.clear()
+        self.hitpay = self.enterContext(FakeHitPay(fail_next=self.fail_next))
+        self.enterContext(override_settings(HITPAY_API_BASE=self.hitpay.base_url, HITPAY_RETRY_BACKOFF=0))
+        self.enterContext(mock.patch.object(hitpay, 'breaker', hitpay.CircuitBreaker()))
+
+    def checkout(self, url='/api/payments/create/', key=None, **fields):
+        data = {'amount': '25.00', 'name': 'Ana Lim', 'email': 'ana@example.com', **fields}
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key is not None else {}
+        return self.client.post(url, data, content_type='application/json', **headers)
+
+
+class IdempotencyTests(HitPayTestCase):
+    def test_retry_replays_the_first_response(self):
+        for url in ['/api/payments/create/', '/api/payments/create/async/']:
+            with self.subTest(url):
+                first = self.checkout(url, key=f'key-{url}')
+                retry = self.checkout(url, key=f'key-{url}')
+
+                self.assertEqual(first.status_code, 200)
+                self.assertNotIn('Idempotent-Replayed', first)
+                self.assertEqual(retry.status_code, 200)
+                self.assertEqual(retry['Idempotent-Replayed'], 'true')
+                self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Payment.objects.count(), 2)
+        self.assertEqual(len(self.hitpay.payment_requests), 2)
+
+    def test_key_reused_for_a_different_request(self):
+        for url in ['/api/payments/create/', '/api/payments/create/async/']:
+            with self.subTest(url):
+                self.checkout(url, key=f'key-{url}')
+
+                response = self.checkout(url, key=f'key-{url}', amount='99.00')
+
+                self.assertEqual(response.status_code, 422)
+        self.assertEqual(Payment.objects.count(), 2)
+
+    def test_failed_request_releases_the_key(self):
+        for url in ['/api/payments/create/', '/api/payments/create/async/']:
+            with self.subTest(url):
+                self.hitpay.fail_next = 1
+
+                failed = self.checkout(url, key=f'key-{url}')
+                retry = self.checkout(url, key=f'key-{url}')
+
+                self.assertEqual(failed.status_code, 400)
+                self.assertEqual(retry.status_code, 200)
+                self.assertNotIn('Idempotent-Replayed', retry)
+        self.assertEqual(IdempotencyKey.objects.filter(response_status=200).count(), 2)
+
+    def test_abandoned_claim_is_taken_over(self):
+        IdempotencyKey.objects.create(key='key-1', fingerprint='from a request that died')
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(seconds=61))
+
+        response = self.checkout(key='key-1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(IdempotencyKey.objects.get(key='key-1').response_status, 200)
+
+    @override_settings(IDEMPOTENCY_WAIT=0.2)
+    def test_request_in_flight_answers_409_after_waiting(self):
+        for url in ['/api/payments/create/', '/api/payments/create/async/']:
+            with self.subTest(url):
+                self.checkout(url, key=f'key-{url}')
+                # As if the first request were still talking to HitPay
+                IdempotencyKey.objects.filter(key=f'key-{url}').update(response_status=None, response_body=None)
+
+                response = self.checkout(url, key=f'key-{url}')
+
+                self.assertEqual(response.status_code, 409)
+        self.assertEqual(Payment.objects.count(), 2)
+
+
+@override_settings(HITPAY_CIRCUIT_FAILURE_THRESHOLD=3, HITPAY_CIRCUIT_RESET_TIMEOUT=30)
+class CircuitBreakerTests(HitPayTestCase):
+    fail_next = 3
+    urls = ['/api/payments/create/', '/api/payments/create/async/']
+
+    def test_open_circuit_answers_503_with_retry_after(self):
+        for _ in range(3):
+            self.assertEqual(self.checkout().status_code, 400)
+        requests_made = len(self.hitpay.payment_requests)
+
+        for url in self.urls:
+            with self.subTest(url):
+                response = self.checkout(url)
+
+                self.assertEqual(response.status_code, 503)
+                self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(len(self.hitpay.payment_requests), requests_made)
+        self.assertEqual(Payment.objects.count(), 0)
+
+    @override_settings(HITPAY_CIRCUIT_RESET_TIMEOUT=0.1)
+    def test_closed_open_half_open_closed(self):
+        for _ in range(3):
+            self.checkout()
+        self.assertEqual(hitpay.breaker.snapshot()['state'], 'open')
+        self.assertEqual(self.checkout().status_code, 503)
+
+        time.sleep(0.15)
+        hitpay.breaker.before_call('trial')
+        self.assertEqual(hitpay.breaker.state, 'half_open')
+        # Only one trial call at a time
+        with self.assertRaises(hitpay.HitPayUnavailable):
+            hitpay.breaker.before_call('second')
+        hitpay.breaker.abandon()
+
+        self.assertEqual(self.checkout().status_code, 200)
+        self.assertEqual(hitpay.breaker.snapshot(), {'state': 'closed', 'failures': 0})
+
+    @override_settings(HITPAY_CIRCUIT_RESET_TIMEOUT=0.1)
+    def test_failed_trial_reopens_the_circuit(self):
+        for _ in range(3):
+            self.checkout()
+        time.sleep(0.15)
+        self.hitpay.fail_next = 1
+
+        self.assertEqual(self.checkout().status_code, 400)
+
+        self.assertEqual(hitpay.breaker.state, 'open')
+        self.assertEqual(self.checkout().status_code, 503)
+
+
+@override_settings(HITPAY_CIRCUIT_FAILURE_THRESHOLD=100, HITPAY_MAX_RETRIES=2)
+class HitPayRetryTests(HitPayTestCase):
+    urls = ['/api/payments/create/', '/api/payments/create/async/']
+
+    def test_creation_that_reached_hitpay_is_not_retried(self):
+        for url in self.urls:
+            with self.subTest(url):
+                self.hitpay.fail_next = 1
+
+                response = self.checkout(url)
+
+                # A retry would have succeeded; the 503 from HitPay comes back as is
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('Injected failure', response.json()['error'])
+        self.assertEqual(hitpay.breaker.failures, 2)
+
+    def test_creation_that_never_connected_is_retried(self):
+        with socket.socket() as unused:
+            unused.bind(('127.0.0.1', 0))
+            port = unused.getsockname()[1]
+        for url in self.urls:
+            with self.subTest(url), override_settings(HITPAY_API_BASE=f'http://127.0.0.1:{port}/v1'):
+                failures = hitpay.breaker.failures
+
+                response = self.checkout(url)
+
+                self.assertEqual(response.status_code, 503)
+                self.assertNotIn('Retry-After', response)
+                self.assertEqual(hitpay.breaker.failures - failures, 3)
+        self.assertEqual(Payment.objects.count(), 0)
+
+
+class ReviewStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_superuser('ops', 'ops@example.com', 'x'))
+
+    def assertStatsMatchRebuild(self):
+        maintained = ReviewStats.objects.get(pk=1).summary()
+        self.assertEqual(ReviewStats.rebuild().summary(), maintained)
+        return maintained
+
+    def test_stats_match_a_rebuild_after_every_kind_of_write(self):
+        ids = []
+        for rating in [5, 4, 4, 1]:
+            response = self.client.post('/api/reviews/', {'author_name': 'Ana', 'rating': rating, 'text': 'ok'},
+                                        content_type='application/json')
+            ids.append(response.json()['id'])
+        self.assertEqual(self.assertStatsMatchRebuild()['count'], 4)
+
+        self.client.patch(f'/api/reviews/{ids[0]}/', {'rating': 2}, content_type='application/json')
+        self.client.patch(f'/api/reviews/{ids[1]}/', {'text': 'rating unchanged'}, content_type='application/json')
+        self.assertEqual(self.assertStatsMatchRebuild()['histogram']['2'], 1)
+
+        self.assertEqual(self.client.delete(f'/api/reviews/{ids[2]}/').status_code, 204)
+        self.assertEqual(self.client.delete(f'/api/reviews/{ids[2]}/').status_code, 404)
+        self.assertEqual(self.assertStatsMatchRebuild()['count'], 3)
+
+        # Two requests that both loaded the review before either deleted it
+        loaded = [Review.objects.get(pk=ids[3]), Review.objects.get(pk=ids[3])]
+        for review in loaded:
+            ReviewDetailView().perform_destroy(review)
+        self.assertEqual(self.assertStatsMatchRebuild()['count'], 2)
+
+        # Ratings outside 1-5 count towards the total but not the histogram
+        csv_body = 'author_name,rating,text\nBo,3,fine\nCy,9,off the scale\nDi,5,great\n'
+        response = self.client.post('/api/reviews/import/', csv_body, content_type='text/csv')
+        self.assertEqual(response.json()['imported'], 3)
+        self.assertEqual(self.assertStatsMatchRebuild()['count'], 5)
+
+
+class RevenueRollupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_rollups_match_a_rebuild(self):
+        payments = [create_payment(f'{i + 1}.25') for i in range(6)]
+        transitions.transition(payments[0], 'completed', {'paid_at': timezone.now() + timedelta(days=1)})
+        transitions.transition(payments[1], 'failed')
+        transitions.transition(payments[1], 'completed', {'paid_at': timezone.now()})
+        transitions.transition(payments[2], 'cancelled')
+        transitions.transition_many([payments[3].reference_number, payments[4].reference_number], 'failed')
+        transitions.discard(payments[5])
+        maintained = rollups()
+
+        RevenueRollup.rebuild()
+
+        self.assertEqual(rollups(), maintained)
+
+    def test_backfill_counts_existing_payments(self):
+        backfill = importlib.import_module('api.migrations.0013_revenuerollup').backfill_revenue_rollups
+        old = timezone.now() - timedelta(days=400)
+        archived = create_payment('40.00')
+        transitions.transition(archived, 'completed', {'paid_at': old})
+        Payment.objects.filter(pk=archived.pk).update(created_at=old)
+        archive.archive_batch(timezone.now() - timedelta(days=1), 10)
+        pending = [create_payment('15.00') for _ in range(2)]
+        failed = create_payment('5.00')
+        transitions.transition(failed, 'failed')
+        expected = rollups()
+        # Payments made before the rollup table existed
+        RevenueRollup.objects.all().delete()
+
+        backfill(apps, None)
+
+        self.assertEqual(rollups(), expected)
+        transitions.transition(pending[0], 'completed', {'paid_at': timezone.now()})
+        transitions.transition(failed, 'completed', {'paid_at': timezone.now()})
+        transitions.discard(pending[1])
+        self.assertFalse(RevenueRollup.objects.filter(Q(count__lt=0) | Q(amount__lt=0)).exists())
+        maintained = rollups()
+        RevenueRollup.rebuild()
+        self.assertEqual(rollups(), maintained)
+
+
+class ReviewCursorPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reviews = Review.objects.bulk_create([Review(author_name=f'Author {i}', rating=4, text='ok') for i in range(25)])
+        start = timezone.now() - timedelta(days=1)
+        for i, review in enumerate(reviews):
+            Review.objects.filter(pk=review.pk).update(created_at=start + timedelta(minutes=i))
+
+    def test_pages_cover_every_review_once_in_order(self):
+        # Ties on created_at are broken by id
+        Review.objects.filter(pk__lte=Review.objects.order_by('pk')[12].pk).update(created_at=timezone.now())
+        expected = list(Review.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        seen = []
+        url = '/api/reviews/?pagination=cursor'
+        while url:
+            page = self.client.get(url).json()
+            self.assertNotIn('count', page)
+            seen += [review['id'] for review in page['results']]
+            url = page['next']
+
+        self.assertEqual(seen, expected)
+
+    def test_new_reviews_do_not_shift_later_pages(self):
+        first = self.client.get('/api/reviews/?pagination=cursor').json()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/reviews/', {'author_name': 'Late', 'rating': 5, 'text': 'new'},
+                             content_type='application/json')
+
+        second = self.client.get(first['next']).json()
+        back = self.client.get(second['previous']).json()
+
+        expected = list(Review.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual([review['id'] for review in second['results']], expected[11:21])
+        self.assertEqual([review['id'] for review in back['results']], expected[1:11])
+
+    def test_page_number_pagination_stays_the_default(self):
+        page = self.client.get('/api/reviews/?page=3').json()
+
+        self.assertEqual(page['count'], 25)
+        self.assertEqual(len(page['results']), 5)
+
+    def test_cursor_page_skips_the_count_query(self):
+        with self.assertNumQueries(1):
+            self.client.get('/api/reviews/?pagination=cursor')
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_superuser('ops', 'ops@example.com', 'x'))
+
+    def test_command_moves_old_settled_payments_with_ids_and_timestamps(self):
+        old = timezone.now() - timedelta(days=200)
+        payments = [create_payment() for _ in range(5)]
+        for payment in payments[:3]:
+            transitions.transition(payment, 'completed', {'paid_at': old})
+        Payment.objects.filter(pk__in=[payment.pk for payment in payments[1:]]).update(created_at=old)
+        before = {payment.pk: Payment.objects.get(pk=payment.pk).updated_at for payment in payments[1:3]}
+
+        call_command('archive_payments', batch_size=1, pause=0, stdout=io.StringIO())
+
+        # Recent, or old but still pending, payments stay live
+        self.assertCountEqual(Payment.objects.values_list('pk', flat=True),
+                              [payment.pk for payment in [payments[0], *payments[3:]]])
+        self.assertEqual(dict(ArchivedPayment.objects.values_list('pk', 'updated_at')), before)
+
+    def test_status_lookup_falls_back_to_the_archive(self):
+        payment = archived_payment('12.00')
+
+        response = self.client.get(f'/api/payments/status/{payment.reference_number}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'completed')
+        self.assertEqual(response.json()['amount'], '12.00')
+
+    def test_export_merges_live_and_archived_payments_oldest_first(self):
+        older = archived_payment(days_old=300)
+        live = create_payment()
+        newer = archived_payment(days_old=100)
+
+        response = self.client.get('/api/payments/export/csv/')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+        self.assertEqual([row['reference_number'] for row in rows],
+                         [str(older.reference_number), str(newer.reference_number), str(live.reference_number)])
+
+    def test_export_of_live_only_statuses_skips_the_archive(self):
+        archived_payment()
+        pending = create_payment()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/payments/export/ndjson/?status=pending')
+            lines = b''.join(response.streaming_content).splitlines()
+
+        self.assertFalse([query for query in queries if ArchivedPayment._meta.db_table in query['sql']])
+        self.assertEqual([json.loads(line)['reference_number'] for line in lines], [str(pending.reference_number)])
+
+
+class PaymentStatusBatchTests(TestCase):
+    url = '/api/payments/status/batch/'
+
+    def setUp(self):
+        cache.clear()
+
+    def lookup(self, reference_numbers):
+        return self.client.post(self.url, {'reference_numbers': reference_numbers}, content_type='application/json')
+
+    def test_live_and_archived_payments_in_request_order(self):
+        live = create_payment()
+        archived = archived_payment()
+        missing = '00000000-0000-0000-0000-000000000000'
+
+        with self.assertNumQueries(2):
+            response = self.lookup([str(archived.reference_number), missing, str(live.reference_number),
+                                    str(live.reference_number).upper(), 'not-a-reference', missing])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([payment['reference_number'] for payment in response.json()['payments']],
+                         [str(archived.reference_number), str(live.reference_number)])
+        self.assertEqual(response.json()['not_found'], [missing, 'not-a-reference'])
+
+    def test_archive_is_not_queried_when_everything_is_live(self):
+        payments = [create_payment() for _ in range(3)]
+
+        with self.assertNumQueries(1):
+            response = self.lookup([str(payment.reference_number) for payment in payments])
+
+        self.assertEqual(len(response.json()['payments']), 3)
+
+    def test_rejects_bad_and_oversized_requests(self):
+        for body in [{}, {'reference_numbers': []}, {'reference_numbers': 'abc'},
+                     {'reference_numbers': ['00000000-0000-0000-0000-000000000000'] * 501}]:
+            with self.subTest(body=str(body)[:60]):
+                response = self.client.post(self.url, body, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+
+    def test_single_lookup_is_unchanged(self):
+        payment = create_payment()
+
+        batch = self.lookup([str(payment.reference_number)]).json()['payments'][0]
+        single = self.client.get(f'/api/payments/status/{payment.reference_number}/').json()
+
+        self.assertEqual(batch, single)
+
+
+class ReviewImportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_csv_errors_report_the_line_of_each_row(self):
+        lines = [
+            b'author_name,rating,text\n',
+            b'Ana,5,great\n',
+            b'Bo,not a number,meh\n',
+            b'Cy,4,"spans\n',
+            b'two lines"\n',
+            b',3,no author\n',
+        ]
+
+        summary = imports.import_reviews(lines, 'csv')
+
+        self.assertEqual((summary['rows'], summary['imported'], summary['invalid']), (4, 2, 2))
+        self.assertEqual([error['line'] for error in summary['errors']], [3, 6])
+        self.assertIn('rating', summary['errors'][0]['errors'])
+        self.assertEqual(Review.objects.get(author_name='Cy').text, 'spans\ntwo lines')
+
+    def test_jsonl_line_numbers_count_blank_lines(self):
+        lines = [
+            '{"author_name": "Ana", "rating": 5, "text": "great"}\n',
+            '\n',
+            '[1, 2]\n',
+            '{"author_name": "Bo", "rating": 4}\n',
+            '{broken\n',
+        ]
+
+        summary = imports.import_reviews(lines, 'jsonl')
+
+        self.assertEqual((summary['rows'], summary['imported'], summary['invalid']), (4, 1, 3))
+        self.assertEqual([error['line'] for error in summary['errors']], [3, 4, 5])
+        self.assertEqual(summary['errors'][0]['errors'], {'non_field_errors': ['Expected a JSON object']})
+
+    def test_rows_are_inserted_a_batch_at_a_time(self):
+        lines = ['author_name,rating,text\n'] + [f'Author {i},{i % 5 + 1},ok\n' for i in range(7)]
+
+        with mock.patch.object(Review.objects, 'bulk_create', wraps=Review.objects.bulk_create) as bulk_create:
+            summary = imports.import_reviews(lines, 'csv', batch_size=3)
+
+        self.assertEqual(summary['imported'], 7)
+        self.assertEqual([len(call.args[0]) for call in bulk_create.call_args_list], [3, 3, 1])
+        self.assertEqual(ReviewStats.objects.get(pk=1).count, 7)
+
+    def test_malformed_file_keeps_the_rows_before_it(self):
+        lines = [b'author_name,rating,text\n', b'Ana,5,great\n', b'Bo,4,\xff\n', b'Cy,3,never read\n']
+
+        summary = imports.import_reviews(lines, 'csv', batch_size=10)
+
+        self.assertEqual(summary['error'], 'Line 3 is not valid UTF-8')
+        self.assertEqual(list(Review.objects.values_list('author_name', flat=True)), ['Ana'])
+
+    def test_missing_csv_column(self):
+        summary = imports.import_reviews([b'author_name,text\n', b'Ana,great\n'], 'csv')
+
+        self.assertEqual(summary['error'], 'CSV header is missing: rating')
+        self.assertEqual(summary['rows'], 0)
+
+    def test_endpoint_is_staff_only_and_checks_the_content_type(self):
+        body = 'author_name,rating,text\nAna,5,great\n'
+        self.assertEqual(self.client.post('/api/reviews/import/', body, content_type='text/csv').status_code, 403)
+        self.client.force_login(User.objects.create_superuser('ops', 'ops@example.com', 'x'))
+
+        self.assertEqual(self.client.post('/api/reviews/import/', body, content_type='text/plain').status_code, 415)
+        response = self.client.post('/api/reviews/import/', body, content_type='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['imported'], 1)
+
+
+class JSONCodecTests(TestCase):
+    def test_renderer_output_is_byte_for_byte_drf(self):
+        payment = create_payment('1234.50', phone='+65 9123 4567')
+        transitions.transition(payment, 'completed', {'paid_at': timezone.now()})
+        review = Review.objects.create(author_name='Zoë ☆', rating=5, text='line\u2028break\u2029 and "quotes"')
+        cases = {
+            'payment': PaymentStatusSerializer(payment).data,
+            'reviews': ReviewSerializer([review, review], many=True).data,
+            'decimals': [Decimal('0.10'), Decimal('1E+2'), Decimal('-0'), Decimal('1E-7'),
+                         Decimal('12345678901234567890.123')],
+            'datetimes': [
+                datetime(2026, 1, 2, 3, 4, 5, 123456, tzinfo=dt_timezone.utc),
+                datetime(2026, 1, 2, 3, 4, 5, 123000),
+                datetime(2026, 1, 2, 3, 4, 5, tzinfo=dt_timezone(timedelta(hours=8))),
+                date(2026, 1, 2), dt_time(3, 4, 5, 6), timedelta(days=1, seconds=5),
+            ],
+            'scalars': [None, True, False, 0, -1, 2 ** 63 - 1, 1.5, '', 'ascii', 'ünïcode ✓ 🎉', '\x00\x1f</script>'],
+            'other types': {1: uuid.UUID(int=7), 2.5: gettext_lazy('lazy'), None: (1, 2), 'bytes': b'raw'},
+            'falls back': [2 ** 70, {'nested': {'deep': [2 ** 64]}}],
+            'empty': [{}, [], ''],
+        }
+        for name, data in cases.items():
+            with self.subTest(name):
+                self.assertEqual(
+                    renderers.ORJSONRenderer().render(data, 'application/json'),
+                    JSONRenderer().render(data, 'application/json'),
+                )
+
+    def test_indented_and_empty_output_match_drf(self):
+        data = {'amount': Decimal('10.00'), 'items': [1, 2]}
+        for media_type in ['application/json; indent=2', 'application/json']:
+            with self.subTest(media_type):
+                self.assertEqual(renderers.ORJSONRenderer().render(data, media_type),
+                                 JSONRenderer().render(data, media_type))
+        self.assertEqual(renderers.ORJSONRenderer().render(None), JSONRenderer().render(None))
+
+    def test_parser_reads_bodies_like_drf(self):
+        bodies = [
+            b'{"amount": "10.00", "reference_numbers": ["a", "b"], "nested": {"x": null, "y": true}}',
+            b'{"big": 12345678901234567890123, "negative": -9223372036854775809, "max": 9223372036854775807}',
+            b'{"float": 1.5e300, "small": 1e-7, "int": 10}',
+            '{"name": "Zoë ☆ 🎉", "escaped": "\\u00e9\\ud83c\\udf89"}'.encode(),
+            b'  [1, 2, 3]  ',
+        ]
+        for body in bodies:
+            with self.subTest(body):
+                expected = JSONParser().parse(io.BytesIO(body))
+                self.assertEqual(parsers.ORJSONParser().parse(io.BytesIO(body)), expected)
+                self.assertEqual(parsers.loads(body), expected)
+
+    def test_parser_honours_the_charset(self):
+        body = '{"name": "Zoë"}'.encode('latin-1')
+        context = {'encoding': 'latin-1'}
+
+        self.assertEqual(parsers.ORJSONParser().parse(io.BytesIO(body), parser_context=context), {'name': 'Zoë'})
+
+    def test_parser_errors_match_drf(self):
+        for body in [b'{"status": ', b'', b'{"a": NaN}', b'{"a": 1,}', b'\xff']:
+            with self.subTest(body):
+                with self.assertRaises(ParseError) as expected:
+                    JSONParser().parse(io.BytesIO(body))
+                with self.assertRaises(ParseError) as raised:
+                    parsers.ORJSONParser().parse(io.BytesIO(body))
+                self.assertEqual(str(raised.exception), str(expected.exception))
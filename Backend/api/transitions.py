@@ -0,0 +1,134 @@
+"""
+Payment state machine.
+
+Every status change is a single conditional
+UPDATE ... WHERE id = %s AND status IN (allowed) that writes only the fields
+the transition sets, plus updated_at. If the payment has already moved on
+(a webhook for a settled payment, an older event delivered after a newer one,
+a manual update racing a webhook), the UPDATE matches no row and the
+transition is a no-op, so concurrent writers can't undo each other's changes.
+Creating a payment, each status change and discarding a payment HitPay never
+accepted also update RevenueRollup in the same transaction.
+"""
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Payment, RevenueRollup
+
+# Target status -> the statuses it may be reached from. A declined card can be
+# retried on the same HitPay payment request, so a failed payment may still
+# complete; completed and cancelled are final. pending -> pending records a
+# non-final HitPay status without changing ours.
+TRANSITIONS = {
+    'pending': ('pending',),
+    'completed': ('pending', 'failed'),
+    'failed': ('pending',),
+    'cancelled': ('pending',),
+}
+
+
+def changes(new_status, fields, now):
+    """The column values a transition to new_status writes."""
+    values = dict(fields, updated_at=now)
+    if TRANSITIONS[new_status] != (new_status,):
+        values['status'] = new_status
+    return values
+
+
+def _applied(payment, new_status, values):
+    for name, value in values.items():
+        setattr(payment, name, value)
+    payment.status = new_status
+
+
+def transition(payment, new_status, fields=None):
+    """
+    Move payment to new_status, also setting `fields`, if its stored status
+    allows it. Returns True and updates the instance if the row changed; False
+    (instance untouched) if the transition no longer applies.
+    """
+    values = changes(new_status, fields or {}, timezone.now())
+    with transaction.atomic(savepoint=False):
+        # One UPDATE per allowed source status, so the rollup knows which row the payment leaves
+        for source in TRANSITIONS[new_status]:
+            if Payment.objects.filter(pk=payment.pk, status=source).update(**values):
+                break
+        else:
+            return False
+        _applied(payment, new_status, values)
+        if source != new_status:
+            RevenueRollup.record(added=[(payment, new_status)], removed=[(payment, source)])
+    return True
+
+
+def transition_many(references, new_status, fields=None):
+    """
+    transition() for payments by reference number: per allowed source status,
+    one SELECT ... FOR UPDATE and one conditional UPDATE. Returns the payments
+    that changed, already updated.
+    """
+    values = changes(new_status, fields or {}, timezone.now())
+    remaining = set(references)
+    changed = []
+    with transaction.atomic(savepoint=False):
+        for source in TRANSITIONS[new_status]:
+            if not remaining:
+                break
+            payments = list(Payment.objects.select_for_update().filter(reference_number__in=remaining, status=source))
+            if not payments:
+                continue
+            Payment.objects.filter(pk__in=[payment.pk for payment in payments], status=source).update(**values)
+            for payment in payments:
+                _applied(payment, new_status, values)
+            if source != new_status:
+                RevenueRollup.record(
+                    added=[(payment, new_status) for payment in payments],
+                    removed=[(payment, source) for payment in payments],
+                )
+            remaining.difference_update(payment.reference_number for payment in payments)
+            changed.extend(payments)
+    return changed
+
+
+def create(**fields):
+    """Insert a new pending payment and count it in the rollups."""
+    with transaction.atomic():
+        payment = Payment.objects.create(reference_number=uuid.uuid4(), status='pending', **fields)
+        RevenueRollup.record(added=[(payment, 'pending')])
+    return payment
+
+
+def discard(payment):
+    """Delete a payment HitPay never accepted, and uncount it."""
+    with transaction.atomic():
+        if Payment.objects.filter(pk=payment.pk, status='pending').delete()[0]:
+            RevenueRollup.record(removed=[(payment, 'pending')])
+
+
+acreate = sync_to_async(create)
+adiscard = sync_to_async(discard)
+
+
+def attach_checkout(payment, payment_request_id, checkout_url):
+    """Record HitPay's payment request on a new payment; False if it already has one."""
+    values = {'payment_request_id': payment_request_id, 'checkout_url': checkout_url, 'updated_at': timezone.now()}
+    if not _unattached(payment).update(**values):
+        return False
+    _applied(payment, 'pending', values)
+    return True
+
+
+async def aattach_checkout(payment, payment_request_id, checkout_url):
+    """attach_checkout() for async views."""
+    values = {'payment_request_id': payment_request_id, 'checkout_url': checkout_url, 'updated_at': timezone.now()}
+    if not await _unattached(payment).aupdate(**values):
+        return False
+    _applied(payment, 'pending', values)
+    return True
+
+
+def _unattached(payment):
+    return Payment.objects.filter(pk=payment.pk, status='pending', payment_request_id__isnull=True)
@@ -1,11 +1,20 @@
 from django.urls import path
-from .views import ReviewListCreateView, ReviewDetailView, CreatePaymentRequestView, HitPayWebhookView, PaymentStatusView, ManualStatusUpdateView
+from .views import ReviewListCreateView, ReviewDetailView, ReviewStatsView, ReviewImportView, CreatePaymentRequestView, AsyncCreatePaymentRequestView, HitPayWebhookView, PaymentStatusView, PaymentStatusBatchView, PaymentStatusStreamView, PaymentStatusCacheStatsView, ManualStatusUpdateView, BulkStatusUpdateView, PaymentExportView, PaymentSummaryView
 
 urlpatterns = [
     path("reviews/", ReviewListCreateView.as_view(), name="review-list"),
+    path("reviews/stats/", ReviewStatsView.as_view(), name="review-stats"),
+    path("reviews/import/", ReviewImportView.as_view(), name="review-import"),
     path("reviews/<int:pk>/", ReviewDetailView.as_view(), name="review-detail"),
     path("payments/create/", CreatePaymentRequestView.as_view(), name="create-payment"),
+    path("payments/create/async/", AsyncCreatePaymentRequestView.as_view(), name="create-payment-async"),
     path("payments/hitpay/webhook/", HitPayWebhookView.as_view(), name="hitpay-webhook"),
+    path("payments/status-cache/stats/", PaymentStatusCacheStatsView.as_view(), name="payment-status-cache-stats"),
+    path("payments/status/batch/", PaymentStatusBatchView.as_view(), name="payment-status-batch"),
     path("payments/status/<str:reference_number>/", PaymentStatusView.as_view(), name="payment-status"),
+    path("payments/status/<str:reference_number>/stream/", PaymentStatusStreamView.as_view(), name="payment-status-stream"),
     path("payments/update-status/<str:reference_number>/", ManualStatusUpdateView.as_view(), name="manual-status-update"),
+    path("payments/bulk-update-status/", BulkStatusUpdateView.as_view(), name="bulk-status-update"),
+    path("payments/export/<str:export_format>/", PaymentExportView.as_view(), name="payment-export"),
+    path("payments/summary/", PaymentSummaryView.as_view(), name="payment-summary"),
 ]
@@ -1,219 +1,548 @@
 import os
-import hmac
-import hashlib
-import requests
-import uuid
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.http import FileResponse, Http404, HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from rest_framework import generics, status
+from rest_framework.authentication import BasicAuthentication, SessionAuthentication
+from rest_framework.permissions import SAFE_METHODS, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from .models import Review, Payment
-from .serializers import ReviewSerializer
+from .models import Review, ReviewStats, Payment, RevenueRollup, WebhookEvent
+from .pagination import ReviewCursorPagination
+from .serializers import ReviewSerializer, PaymentStatusSerializer
+from . import archive, cache as payment_cache, events, exports, feed, hitpay, idempotency, imports, metrics, parsers, routers, transitions
+from .webhooks import WebhookRejected, claim_delivery, process_inbox, release_delivery, verify_hitpay_webhook
 from django.utils import timezone
-import json
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date
+from django.utils.http import http_date
+from datetime import timedelta
+
+class ReplicaReadMixin:
+    """
+    Serve safe-method requests from the read replica, unless `replica_guard_key`
+    was written within REPLICA_READ_AFTER_WRITE_WINDOW.
+    """
+    replica_guard_key = None
+
+    def dispatch(self, request, *args, **kwargs):
+        use_replica = request.method in SAFE_METHODS and not (
+            self.replica_guard_key and routers.recently_written(self.replica_guard_key)
+        )
+        with routers.replica_reads(use_replica):
+            return super().dispatch(request, *args, **kwargs)
+
 
 # Reviews CRUD
-class ReviewListCreateView(generics.ListCreateAPIView):
-    queryset = Review.objects.all().order_by("-created_at")
+class ReviewListCreateView(ReplicaReadMixin, generics.ListCreateAPIView):
+    queryset = Review.objects.all().order_by("-created_at", "-id")
     serializer_class = ReviewSerializer
+    replica_guard_key = 'reviews'
+
+    @property
+    def paginator(self):
+        # ?pagination=cursor (or following a cursor link) selects keyset pagination;
+        # page-number pagination stays the default for existing clients.
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if params.get('pagination') == 'cursor' or 'cursor' in params:
+                self._paginator = ReviewCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def list(self, request, *args, **kwargs):
+        # JSON pages come pre-rendered from api/feed.py; the browsable API renders as usual
+        if not feed.cacheable(request):
+            return super().list(request, *args, **kwargs)
+
+        def render():
+            response = super(ReviewListCreateView, self).list(request, *args, **kwargs)
+            return request.accepted_renderer.render(
+                response.data, request.accepted_media_type, self.get_renderer_context()
+            )
+
+        return HttpResponse(feed.get_page(request, render), content_type=request.accepted_renderer.media_type)
 
-class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            review = serializer.save()
+            ReviewStats.record(added=review.rating)
+            feed.reviews_written()
+
+class ReviewDetailView(ReplicaReadMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
+    replica_guard_key = 'reviews'
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            # The stored rating, locked: the instance was loaded before the transaction
+            # and a concurrent edit may have changed it since
+            old_rating = self._locked_rating(serializer.instance)
+            if old_rating is None:
+                raise Http404
+            review = serializer.save()
+            if review.rating != old_rating:
+                ReviewStats.record(added=review.rating, removed=old_rating)
+            feed.reviews_written()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            rating = self._locked_rating(instance)
+            # Only the request that actually deleted the row uncounts it
+            if rating is not None and instance.delete()[0]:
+                ReviewStats.record(removed=rating)
+                feed.reviews_written()
+
+    def _locked_rating(self, review):
+        return Review.objects.select_for_update().filter(pk=review.pk).values_list('rating', flat=True).first()
+
+# Bulk review import for staff: POST a CSV (author_name,rating,text header) or JSON Lines
+# body with Content-Type text/csv or application/jsonl. The body is read as a stream and
+# imported in batches; the response counts imported and invalid rows and lists the first errors.
+class ReviewImportView(APIView):
+    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        import_format = imports.CONTENT_TYPES.get(request.content_type.split(';')[0].strip().lower())
+        if import_format is None:
+            return Response({
+                'error': f"Content-Type must be one of: {', '.join(imports.CONTENT_TYPES)}"
+            }, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        if request.stream is None:
+            return Response({'error': 'Request body is empty'}, status=status.HTTP_400_BAD_REQUEST)
+
+        summary = imports.import_reviews(request.stream, import_format)
+        return Response(summary, status=status.HTTP_400_BAD_REQUEST if summary['error'] else status.HTTP_200_OK)
+
+# Review count, mean rating and star histogram from the ReviewStats summary row
+class ReviewStatsView(ReplicaReadMixin, APIView):
+    replica_guard_key = 'reviews'
+
+    def get(self, request):
+        try:
+            min_rating = request.query_params.get('min_rating')
+            max_rating = request.query_params.get('max_rating')
+            rating = request.query_params.get('rating')
+            if rating is not None:
+                min_rating = max_rating = rating
+            min_rating = int(min_rating) if min_rating is not None else None
+            max_rating = int(max_rating) if max_rating is not None else None
+        except ValueError:
+            return Response({'error': 'Ratings must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        stats = ReviewStats.objects.filter(pk=1).first()
+        if stats is None:
+            with routers.primary_reads():
+                stats = ReviewStats.rebuild()
+        return Response(stats.summary(min_rating, max_rating))
 
 # HitPay Payment Views
+def _payment_fields(data):
+    """Pull the checkout fields out of request data; returns (fields, error)."""
+    fields = {
+        'amount': data.get('amount'),
+        'name': data.get('name'),
+        'email': data.get('email'),
+        'phone': data.get('phone', ''),
+        'currency': data.get('currency', 'SGD'),
+    }
+    if not all([fields['amount'], fields['name'], fields['email']]):
+        return None, 'Missing required fields: amount, name, email'
+    return fields, None
+
+
+def _checkout_response(payment):
+    return {
+        'checkout_url': payment.checkout_url,
+        'payment_request_id': payment.payment_request_id,
+        'reference_number': str(payment.reference_number),
+        'status': 'pending'
+    }
+
+
+def _unavailable_response(error):
+    """(body, status, headers) for a checkout refused because HitPay is unreachable or the circuit is open."""
+    headers = {'Retry-After': str(error.retry_after)} if error.retry_after else None
+    return {'error': str(error)}, status.HTTP_503_SERVICE_UNAVAILABLE, headers
+
+
+# Fields that identify a checkout request for Idempotency-Key reuse checks
+CHECKOUT_FINGERPRINT_FIELDS = ('amount', 'name', 'email', 'phone', 'currency', 'purpose')
+
+
+# Send an Idempotency-Key header to make retries safe: the first successful
+# response is stored and replayed, and a concurrent duplicate waits for it.
 class CreatePaymentRequestView(APIView):
     def post(self, request):
+        key = request.headers.get(idempotency.HEADER)
+        if key is None:
+            return self.create_payment(request)
         try:
-            # Extract payment data from request
-            amount = request.data.get('amount')
-            name = request.data.get('name')
-            email = request.data.get('email')
-            phone = request.data.get('phone', '')
-            currency = request.data.get('currency', 'SGD')
-            purpose = request.data.get('purpose', '')
-            
-            # Validate required fields
-            if not all([amount, name, email]):
-                return Response({
-                    'error': 'Missing required fields: amount, name, email'
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Create payment record in database
-            payment = Payment.objects.create(
-                reference_number=str(uuid.uuid4()),
-                amount=amount,
-                name=name,
-                email=email,
-                phone=phone,
-                currency=currency,
-                status='pending'
+            record, stored = idempotency.begin(
+                key, idempotency.fingerprint(request.path, request.data, CHECKOUT_FINGERPRINT_FIELDS)
             )
-            
-            # Prepare HitPay API request
-            hitpay_data = {
-                'amount': str(amount),
-                'currency': currency,
-                'reference_number': str(payment.reference_number),
-                'name': name,
-                'email': email,
-                'phone': phone,
-                'purpose': purpose,  # Add purpose parameter
-                'redirect_url': f"{settings.FRONTEND_URL}/payment/status?reference_number={payment.reference_number}",
-                'webhook': "https://goeasytrip.com/api/webhooks/hitpay",  # Temporary for testing - replace with your webhook URL
-            }
-            
-            # HitPay API headers
-            headers = {
-                'X-BUSINESS-API-KEY': settings.HITPAY_API_KEY,
-                'Content-Type': 'application/x-www-form-urlencoded',
-                'X-Requested-With': 'XMLHttpRequest'
-            }
-            
+        except idempotency.IdempotencyError as e:
+            return Response({'error': str(e)}, status=e.status_code)
+        if stored is not None:
+            return Response(stored.response_body, status=stored.response_status,
+                            headers={idempotency.REPLAYED_HEADER: 'true'})
+
+        try:
+            response = self.create_payment(request)
+        except BaseException:
+            idempotency.finish(record, status.HTTP_500_INTERNAL_SERVER_ERROR, None)
+            raise
+        idempotency.finish(record, response.status_code, response.data)
+        return response
+
+    def create_payment(self, request):
+        try:
+            fields, error = _payment_fields(request.data)
+            if error:
+                return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Create payment record in database
+            payment = transitions.create(**fields)
+
             # Make request to HitPay API
-            response = requests.post(
-                f"{settings.HITPAY_API_BASE}/payment-requests",
-                data=hitpay_data,
-                headers=headers
-            )
-            
+            hitpay_data = hitpay.build_payment_request(payment, request.data.get('purpose', ''))
+            try:
+                response = hitpay.create_payment_request(hitpay_data)
+            except hitpay.HitPayUnavailable as e:
+                transitions.discard(payment)
+                body, code, headers = _unavailable_response(e)
+                return Response(body, status=code, headers=headers)
+
             if response.status_code in [200, 201]:
                 response_data = response.json()
-                
+
                 # Update payment with HitPay response
-                payment.payment_request_id = response_data.get('id')
-                payment.checkout_url = response_data.get('url')
-                payment.save()
-                
-                return Response({
-                    'checkout_url': payment.checkout_url,
-                    'payment_request_id': payment.payment_request_id,
-                    'reference_number': str(payment.reference_number),
-                    'status': 'pending'
-                })
+                transitions.attach_checkout(payment, response_data.get('id'), response_data.get('url'))
+                routers.mark_written(routers.payment_key(payment.reference_number))
+
+                return Response(_checkout_response(payment))
             else:
                 # If HitPay request fails, delete the payment record
-                payment.delete()
+                transitions.discard(payment)
                 return Response({
                     'error': f'HitPay API error: {response.text}'
                 }, status=status.HTTP_400_BAD_REQUEST)
-                
+
         except Exception as e:
             return Response({
                 'error': f'Server error: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+
+# Async variant of CreatePaymentRequestView for ASGI deployments (backend/asgi.py).
+# The HitPay round trip awaits on the shared AsyncClient instead of holding a worker.
 @method_decorator(csrf_exempt, name='dispatch')
-class HitPayWebhookView(APIView):
-    def post(self, request):
+class AsyncCreatePaymentRequestView(View):
+    async def post(self, request):
         try:
-            # Get the HMAC from the request
-            
+            if request.content_type == 'application/json':
+                data = parsers.loads(request.body or b'{}')
+            else:
+                data = request.POST
+        except ValueError:
+            return JsonResponse({'error': 'Invalid JSON body'}, status=status.HTTP_400_BAD_REQUEST)
 
-            received_hmac = request.POST.get('hmac')
+        key = request.headers.get(idempotency.HEADER)
+        if key is None:
+            body, code, headers = await self.create_payment(data)
+            return JsonResponse(body, status=code, headers=headers)
+        try:
+            record, stored = await idempotency.abegin(
+                key, idempotency.fingerprint(request.path, data, CHECKOUT_FINGERPRINT_FIELDS)
+            )
+        except idempotency.IdempotencyError as e:
+            return JsonResponse({'error': str(e)}, status=e.status_code)
+        if stored is not None:
+            return JsonResponse(stored.response_body, status=stored.response_status,
+                                headers={idempotency.REPLAYED_HEADER: 'true'})
 
-            # If no hmac in form-data, try JSON
-            if not received_hmac:
-                try:
-                    data = json.loads(request.body.decode("utf-8"))
-                    received_hmac = data.get("hmac")
-                except Exception:
-                    pass
+        try:
+            body, code, headers = await self.create_payment(data)
+        except BaseException:
+            await idempotency.afinish(record, status.HTTP_500_INTERNAL_SERVER_ERROR, None)
+            raise
+        await idempotency.afinish(record, code, body)
+        return JsonResponse(body, status=code, headers=headers)
 
-            if not received_hmac:
-                return Response({'error': 'No HMAC provided'}, status=status.HTTP_400_BAD_REQUEST)
+    async def create_payment(self, data):
+        """(body, status, headers) for the checkout response."""
+        try:
+            fields, error = _payment_fields(data)
+            if error:
+                return {'error': error}, status.HTTP_400_BAD_REQUEST, None
+
+            payment = await transitions.acreate(**fields)
+
+            hitpay_data = hitpay.build_payment_request(payment, data.get('purpose', ''))
+            try:
+                response = await hitpay.acreate_payment_request(hitpay_data)
+            except hitpay.HitPayUnavailable as e:
+                await transitions.adiscard(payment)
+                return _unavailable_response(e)
+
+            if response.status_code in [200, 201]:
+                response_data = response.json()
+
+                await transitions.aattach_checkout(payment, response_data.get('id'), response_data.get('url'))
+                await routers.amark_written(routers.payment_key(payment.reference_number))
+
+                return _checkout_response(payment), status.HTTP_200_OK, None
+            else:
+                await transitions.adiscard(payment)
+                return {
+                    'error': f'HitPay API error: {response.text}'
+                }, status.HTTP_400_BAD_REQUEST, None
+
+        except Exception as e:
+            return {
+                'error': f'Server error: {str(e)}'
+            }, status.HTTP_500_INTERNAL_SERVER_ERROR, None
+
+# Plain View rather than APIView: the signature is checked on the raw body once,
+# and bad or replayed webhooks are turned away before any parsing or ORM work.
+@method_decorator(csrf_exempt, name='dispatch')
+class HitPayWebhookView(View):
+    max_body_size = 64 * 1024
+
+    def post(self, request):
+        try:
+            try:
+                content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+            except ValueError:
+                content_length = 0
+            if content_length > self.max_body_size:
+                return JsonResponse({'error': 'Webhook body too large'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+            try:
+                form_data, signature = verify_hitpay_webhook(
+                    request.body, request.content_type, request.headers.get('Hitpay-Signature'),
+                    form=request.POST if request.content_type == 'multipart/form-data' else None,
+                )
+            except WebhookRejected as e:
+                return JsonResponse({'error': str(e)}, status=e.status_code)
 
-            
-            # Get all form data except hmac
-            form_data = {}
-            for key, value in request.POST.items():
-                if key != 'hmac':
-                    form_data[key] = value
-            
-            # Sort the form data by key
-            sorted_data = sorted(form_data.items())
-            
-            # Concatenate key=value pairs
-            concatenated_string = ''.join([f"{key}{value}" for key, value in sorted_data])
-            
-            # Compute HMAC-SHA256
-            computed_hmac = hmac.new(
-                settings.HITPAY_SALT.encode('utf-8'),
-                concatenated_string.encode('utf-8'),
-                hashlib.sha256
-            ).hexdigest()
-            
-            # Verify HMAC
-            if not hmac.compare_digest(computed_hmac, received_hmac):
-                return Response({'error': 'HMAC verification failed'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # HMAC verified, process the webhook
             payment_request_id = form_data.get('payment_request_id')
-            payment_id = form_data.get('payment_id')
-            status = form_data.get('status')
-            
             if not payment_request_id:
-                return Response({'error': 'No payment_request_id provided'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Find the payment record
+                return JsonResponse({'error': 'No payment_request_id provided'}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Already accepted within the replay window: acknowledge without touching the DB
+            if not claim_delivery(signature):
+                return JsonResponse({'status': 'success'})
+
+            # HMAC verified: store the event in the inbox and ack right away.
+            # The process_webhooks worker applies it to the payment.
+            # Redeliveries of the same payment_id + status are ignored by the unique constraint
             try:
-                payment = Payment.objects.get(payment_request_id=payment_request_id)
-            except Payment.DoesNotExist:
-                return Response({'error': 'Payment not found'}, status=status.HTTP_404_NOT_FOUND)
-            
-            # Update payment status based on HitPay status
-            if status == 'completed':
-                payment.status = 'completed'
-                payment.hitpay_payment_id = payment_id
-                payment.hitpay_status = status
-                payment.paid_at = timezone.now()
-            elif status == 'failed':
-                payment.status = 'failed'
-                payment.hitpay_payment_id = payment_id
-                payment.hitpay_status = status
-            else:
-                payment.hitpay_status = status
-            
-            payment.save()
-            
-            return Response({'status': 'success'})
-            
+                WebhookEvent.objects.bulk_create([WebhookEvent(
+                    payload=form_data,
+                    payment_request_id=payment_request_id,
+                    payment_id=form_data.get('payment_id'),
+                    status=form_data.get('status'),
+                )], ignore_conflicts=True)
+            except Exception:
+                release_delivery(signature)
+                raise
+
+            if settings.HITPAY_WEBHOOK_INLINE:
+                process_inbox()
+
+            return JsonResponse({'status': 'success'})
+
         except Exception as e:
-            return Response({
+            return JsonResponse({
                 'error': f'Webhook processing error: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-# Utility view to get payment status by reference number
-class PaymentStatusView(APIView):
+# Utility view to get payment status by reference number.
+# Served from the read-through status cache with ETag/Last-Modified so repeat polls get a 304.
+# The per-payment read-after-write guard lives in payment_cache.get_payment_status
+class PaymentStatusView(ReplicaReadMixin, APIView):
     def get(self, request, reference_number):
-        try:
-            payment = Payment.objects.get(reference_number=reference_number)
-            return Response({
-                'reference_number': str(payment.reference_number),
-                'status': payment.status,
-                'amount': str(payment.amount),
-                'currency': payment.currency,
-                'created_at': payment.created_at,
-                'paid_at': payment.paid_at
-            })
-        except Payment.DoesNotExist:
+        entry = payment_cache.get_payment_status(reference_number)
+        if entry is None:
             return Response({'error': 'Payment not found'}, status=status.HTTP_404_NOT_FOUND)
 
-# Manual status update for testing (remove in production)
+        response = get_conditional_response(request, etag=entry['etag'], last_modified=entry['last_modified'])
+        if response is None:
+            response = Response(entry['data'])
+        response['ETag'] = entry['etag']
+        response['Last-Modified'] = http_date(entry['last_modified'])
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+# Status of many payments in one request: takes {"reference_numbers": [...]} and returns
+# {"payments": [...], "not_found": [...]}, both in request order with duplicates dropped.
+# A POST because 500 references don't fit in a URL, but still a read: it goes to the replica
+# unless one of the payments was written within REPLICA_READ_AFTER_WRITE_WINDOW.
+# Reads the database directly (one IN query, plus one on the archive for any misses), not the status cache.
+class PaymentStatusBatchView(APIView):
+    MAX_ITEMS = 500
+
+    def post(self, request):
+        reference_numbers = request.data.get('reference_numbers')
+        if not isinstance(reference_numbers, list) or not reference_numbers:
+            return Response({
+                'error': 'reference_numbers must be a non-empty list'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(reference_numbers) > self.MAX_ITEMS:
+            return Response({
+                'error': f'At most {self.MAX_ITEMS} reference numbers per request'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        requested = [(str(value), Payment.parse_reference(value)) for value in reference_numbers]
+        references = list(dict.fromkeys(reference for _, reference in requested if reference is not None))
+        payments = {}
+        if references:
+            use_replica = not routers.any_recently_written(routers.payment_key(ref) for ref in references)
+            with routers.replica_reads(use_replica):
+                payments = archive.get_payments(references)
+
+        found = []
+        not_found = []
+        seen = set()
+        for reference_number, reference in requested:
+            key = reference or reference_number
+            if key in seen:
+                continue
+            seen.add(key)
+            if reference in payments:
+                found.append(payments[reference])
+            else:
+                not_found.append(reference_number)
+        return Response({
+            'payments': PaymentStatusSerializer(found, many=True).data,
+            'not_found': not_found,
+        })
+
+# Hit/miss counters for the payment status cache in this worker process
+class PaymentStatusCacheStatsView(APIView):
+    def get(self, request):
+        return Response(payment_cache.cache_stats())
+
+# Streaming CSV/NDJSON export of payments for finance, staff only.
+# Filters: ?start=&end= (created_at, end exclusive), ?status=, ?currency= (comma-separated).
+class PaymentExportView(APIView):
+    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, export_format):
+        if export_format not in exports.FORMATS:
+            return Response({'error': f"Format must be one of: {', '.join(exports.FORMATS)}"},
+                            status=status.HTTP_404_NOT_FOUND)
+        try:
+            filters = exports.parse_filters(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        chunks = exports.render(export_format, exports.export_rows(filters))
+        if isinstance(request._request, ASGIRequest):
+            chunks = exports.aiter_chunks(chunks)
+        response = StreamingHttpResponse(chunks, content_type=exports.FORMATS[export_format])
+        response['Content-Disposition'] = (
+            f'attachment; filename="payments-{timezone.now():%Y%m%dT%H%M%SZ}.{export_format}"'
+        )
+        response['Cache-Control'] = 'no-store'
+        return response
+
+# Revenue and payment counts per day or month for finance, staff only, read from
+# the RevenueRollup table so the cost follows the number of days, not payments.
+# ?start=&end= (YYYY-MM-DD, end exclusive; default the last 30 days, or 12 months by month),
+# ?group=day|month, ?currency= (comma-separated)
+class PaymentSummaryView(APIView):
+    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAdminUser]
+    GROUPS = ('day', 'month')
+
+    def get(self, request):
+        params = request.query_params
+        group = params.get('group', 'day')
+        if group not in self.GROUPS:
+            return Response({'error': f"group must be one of: {', '.join(self.GROUPS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            end = parse_date(params['end']) if params.get('end') else timezone.localdate() + timedelta(days=1)
+            if params.get('start'):
+                start = parse_date(params['start'])
+            else:
+                start = end - timedelta(days=30) if group == 'day' else (end - timedelta(days=365)).replace(day=1)
+        except ValueError:
+            start = end = None
+        if start is None or end is None:
+            return Response({'error': 'start and end must be dates (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+        currencies = [value.strip().upper() for value in params.get('currency', '').split(',') if value.strip()]
+
+        return Response({
+            'group': group,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            **RevenueRollup.summary(start, end, group, currencies),
+        })
+
+# Prometheus scrape endpoint, mounted at /metrics in backend/urls.py
+class MetricsView(View):
+    def get(self, request):
+        return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# Server-sent events stream of payment status changes, replacing client polling.
+# Sends the current status, then each change until the payment is completed or cancelled.
+# Under WSGI it sends only the current status and the client reconnects to get the next one.
+class PaymentStatusStreamView(View):
+    async def get(self, request, reference_number):
+        entry = await sync_to_async(payment_cache.get_payment_status)(reference_number)
+        if entry is None:
+            return JsonResponse({'error': 'Payment not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        initial = entry['data']
+        if isinstance(request, ASGIRequest):
+            response = StreamingHttpResponse(
+                events.stream_payment_status(initial['reference_number'], initial, entry['updated_at']),
+                content_type='text/event-stream'
+            )
+        else:
+            # WSGI (e.g. runserver) would buffer the whole stream until it ends
+            response = HttpResponse(events.status_snapshot(initial), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+# Statuses the manual update tools may set
+MANUAL_STATUSES = ['completed', 'failed', 'pending']
+
+# Manual status update for testing (remove in production).
+# Goes through the payment state machine like webhooks do: a change the payment's
+# current status doesn't allow (e.g. completed -> failed) is refused with 409.
 class ManualStatusUpdateView(APIView):
     def post(self, request, reference_number):
         try:
-            payment = Payment.objects.get(reference_number=reference_number)
+            reference = Payment.parse_reference(reference_number)
+            if reference is None:
+                raise Payment.DoesNotExist
+            payment = Payment.objects.get(reference_number=reference)
             new_status = request.data.get('status')
             
-            if new_status in ['completed', 'failed', 'pending']:
-                payment.status = new_status
-                if new_status == 'completed':
-                    payment.paid_at = timezone.now()
-                payment.save()
+            if new_status in MANUAL_STATUSES:
+                fields = {'paid_at': timezone.now()} if new_status == 'completed' else {}
+                if not transitions.transition(payment, new_status, fields):
+                    payment.refresh_from_db(fields=['status'])
+                    return Response({
+                        'error': f'Cannot change a {payment.status} payment to {new_status}',
+                        'reference_number': str(payment.reference_number),
+                        'status': payment.status
+                    }, status=status.HTTP_409_CONFLICT)
+                events.publish_payment_status(payment)
                 
                 return Response({
                     'message': f'Payment status updated to {new_status}',
@@ -226,4 +555,75 @@ class ManualStatusUpdateView(APIView):
         except Payment.DoesNotExist:
             return Response({'error': 'Payment not found'}, status=status.HTTP_404_NOT_FOUND)
 
+# Bulk manual status update: one request and one transaction for many payments.
+# Takes {"updates": [{"reference_number": ..., "status": ...}, ...]} and returns a result per item.
+# Staff only, like exports: one request can complete hundreds of payments.
+class BulkStatusUpdateView(APIView):
+    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAdminUser]
+    MAX_ITEMS = 500
+
+    def post(self, request):
+        updates = request.data.get('updates')
+        if not isinstance(updates, list) or not updates:
+            return Response({'error': 'updates must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(updates) > self.MAX_ITEMS:
+            return Response({
+                'error': f'At most {self.MAX_ITEMS} updates per request'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        results = []
+        references = []
+        seen = set()
+        by_status = {}
+        for item in updates:
+            item = item if isinstance(item, dict) else {}
+            reference_number = str(item.get('reference_number') or '')
+            reference = Payment.parse_reference(reference_number)
+            new_status = item.get('status')
+            result = {'reference_number': reference_number, 'status': new_status}
+            if not reference_number:
+                result.update(result='invalid', error='Missing reference_number')
+            elif new_status not in MANUAL_STATUSES:
+                result.update(result='invalid', error='Invalid status')
+            elif reference is None:
+                result['result'] = 'not_found'
+            elif reference in seen:
+                result.update(result='invalid', error='Duplicate reference_number')
+            else:
+                seen.add(reference)
+                by_status.setdefault(new_status, []).append(reference)
+            references.append(reference if 'result' not in result else None)
+            results.append(result)
+
+        requested = [ref for refs in by_status.values() for ref in refs]
+        with transaction.atomic():
+            now = timezone.now()
+            updated = []
+            for new_status, refs in by_status.items():
+                fields = {'paid_at': now} if new_status == 'completed' else {}
+                updated.extend(transitions.transition_many(refs, new_status, fields))
+            for payment in updated:
+                events.publish_payment_status(payment)
+
+            # Statuses of the rest, to tell a refused transition from an unknown reference
+            updated = {payment.reference_number for payment in updated}
+            current = dict(
+                Payment.objects.filter(reference_number__in=[ref for ref in requested if ref not in updated])
+                .values_list('reference_number', 'status')
+            )
+
+        for result, reference in zip(results, references):
+            if 'result' in result:
+                continue
+            if reference in updated:
+                result['result'] = 'updated'
+            elif reference in current:
+                result.update(result='conflict', error=f"Cannot change a {current[reference]} payment to {result['status']}")
+            else:
+                result['result'] = 'not_found'
 
+        return Response({
+            'updated': sum(1 for result in results if result['result'] == 'updated'),
+            'results': results
+        })
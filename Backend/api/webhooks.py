@@ -0,0 +1,153 @@
+import hashlib
+import hmac
+import json
+from urllib.parse import parse_qsl
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from . import events, parsers, transitions
+from .models import Payment, WebhookEvent
+
+# HMAC-SHA256 state already keyed with HITPAY_SALT; copied per message so the
+# key schedule runs once per process instead of once per webhook
+_keyed_hmac = (None, None)
+
+
+class WebhookRejected(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _signer():
+    global _keyed_hmac
+    salt, signer = _keyed_hmac
+    if salt != settings.HITPAY_SALT:
+        if not settings.HITPAY_SALT:
+            raise WebhookRejected('Webhook verification is not configured', 500)
+        salt = settings.HITPAY_SALT
+        signer = hmac.new(salt.encode('utf-8'), digestmod=hashlib.sha256)
+        _keyed_hmac = (salt, signer)
+    return signer.copy()
+
+
+def _field_value(value):
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def verify_hitpay_webhook(body, content_type, signature=None, form=None):
+    """
+    Check a HitPay webhook against its raw body; returns (fields, signature).
+
+    Form bodies (and JSON bodies carrying an 'hmac' field) are signed over the
+    sorted key+value pairs of the other fields. JSON bodies sent with a
+    Hitpay-Signature header are signed over the raw body. HitPay posts
+    urlencoded forms; `form` takes already-parsed multipart fields instead.
+    Raises WebhookRejected for anything unsigned or wrongly signed.
+    """
+    try:
+        if form is not None:
+            fields = form.dict()
+        elif content_type == 'application/json':
+            data = parsers.loads(body)
+            if not isinstance(data, dict):
+                raise ValueError
+            fields = {key: _field_value(value) for key, value in data.items()}
+        else:
+            fields = dict(parse_qsl(body.decode('utf-8'), keep_blank_values=True))
+    except ValueError:
+        raise WebhookRejected('Malformed webhook body')
+
+    signer = _signer()
+    received = fields.pop('hmac', None)
+    if received is None and signature and content_type == 'application/json':
+        received = signature
+        signer.update(body)
+    elif received is not None:
+        signer.update(''.join(f"{key}{value}" for key, value in sorted(fields.items())).encode('utf-8'))
+    else:
+        raise WebhookRejected('No HMAC provided')
+
+    if not hmac.compare_digest(signer.hexdigest().encode('ascii'), received.encode('utf-8')):
+        raise WebhookRejected('HMAC verification failed')
+    return fields, received
+
+
+def _delivery_key(signature):
+    return f"hitpay-webhook-seen:{signature}"
+
+
+def claim_delivery(signature):
+    """
+    True the first time a signature is seen within HITPAY_WEBHOOK_REPLAY_WINDOW.
+
+    A verified signature identifies the exact payload, so a repeat is a
+    redelivery or a replay and can be acknowledged without touching the DB.
+    """
+    return cache.add(_delivery_key(signature), True, settings.HITPAY_WEBHOOK_REPLAY_WINDOW)
+
+
+def release_delivery(signature):
+    """Forget a claimed delivery that could not be stored, so HitPay's retry is accepted."""
+    cache.delete(_delivery_key(signature))
+
+
+def hitpay_transition(hitpay_status, payment_id, received_at):
+    """(new status, fields) for a HitPay payment status, for transitions.transition()."""
+    if hitpay_status == 'completed':
+        return 'completed', {'hitpay_payment_id': payment_id, 'hitpay_status': hitpay_status, 'paid_at': received_at}
+    elif hitpay_status == 'failed':
+        return 'failed', {'hitpay_payment_id': payment_id, 'hitpay_status': hitpay_status}
+    elif hitpay_status in ('expired', 'canceled', 'cancelled'):
+        return 'cancelled', {'hitpay_status': hitpay_status}
+    else:
+        return 'pending', {'hitpay_status': hitpay_status}
+
+
+def apply_hitpay_status(payment, hitpay_status, payment_id, received_at):
+    """Apply a HitPay status to a Payment; False if it was stale (the payment had moved on)."""
+    return transitions.transition(payment, *hitpay_transition(hitpay_status, payment_id, received_at))
+
+
+def process_inbox(batch_size=100):
+    """
+    Apply one batch of unprocessed webhook events to their payments.
+
+    The whole batch is one transaction: one query for the events and one for
+    the payments, then each event is one conditional UPDATE of its payment, in
+    arrival order. Events the payment's status no longer allows (duplicates,
+    or older than what was already applied) are marked processed with an
+    error. Returns the number of events processed.
+    """
+    with transaction.atomic():
+        batch = list(
+            WebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True)
+            .order_by('id')[:batch_size]
+        )
+        if not batch:
+            return 0
+
+        payments = Payment.objects.in_bulk(
+            {event.payment_request_id for event in batch}, field_name='payment_request_id'
+        )
+        now = timezone.now()
+        changed = {}
+        for event in batch:
+            payment = payments.get(event.payment_request_id)
+            if payment is None:
+                event.error = 'Payment not found'
+            elif apply_hitpay_status(payment, event.status, event.payment_id, event.received_at):
+                changed[payment.pk] = payment
+            else:
+                event.error = 'Ignored: the payment has already moved past this status'
+            event.processed_at = now
+
+        WebhookEvent.objects.bulk_update(batch, ['processed_at', 'error'])
+        for payment in changed.values():
+            events.publish_payment_status(payment)
+
+    return len(batch)
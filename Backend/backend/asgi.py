@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Serve with an ASGI server (e.g. ``uvicorn backend.asgi:application --workers 4``)
+so that async views such as AsyncCreatePaymentRequestView run on the event loop.
 """
 
 import os
@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 
 # Load environment variables from .env file
 load_dotenv()
@@ -9,9 +10,62 @@ load_dotenv()
 HITPAY_API_KEY = os.getenv("HITPAY_API_KEY")
 HITPAY_SALT = os.getenv("HITPAY_SALT")
 HITPAY_API_BASE = os.getenv("HITPAY_API_BASE", "https://api.sandbox.hit-pay.com/v1")
+HITPAY_CONNECT_TIMEOUT = float(os.getenv("HITPAY_CONNECT_TIMEOUT", "3.05"))
+HITPAY_READ_TIMEOUT = float(os.getenv("HITPAY_READ_TIMEOUT", "10"))
+HITPAY_POOL_SIZE = int(os.getenv("HITPAY_POOL_SIZE", "20"))
+# Retries with full-jitter backoff for transient HitPay failures (api/hitpay.py).
+# Payment creation is only retried when the request was never sent.
+HITPAY_MAX_RETRIES = int(os.getenv("HITPAY_MAX_RETRIES", "2"))
+HITPAY_RETRY_BACKOFF = float(os.getenv("HITPAY_RETRY_BACKOFF", "0.2"))
+HITPAY_RETRY_BACKOFF_MAX = float(os.getenv("HITPAY_RETRY_BACKOFF_MAX", "2"))
+# Consecutive failures that open the circuit, and seconds it stays open before a trial call
+HITPAY_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("HITPAY_CIRCUIT_FAILURE_THRESHOLD", "5"))
+HITPAY_CIRCUIT_RESET_TIMEOUT = float(os.getenv("HITPAY_CIRCUIT_RESET_TIMEOUT", "30"))
+# Apply webhooks inside the request instead of via `manage.py process_webhooks` (local development only)
+HITPAY_WEBHOOK_INLINE = os.getenv("HITPAY_WEBHOOK_INLINE", "false").lower() == "true"
+# Idempotency-Key handling for payment creation (api/idempotency.py): keys are kept
+# for IDEMPOTENCY_KEY_TTL seconds; a duplicate waits up to IDEMPOTENCY_WAIT seconds
+# for the in-flight original, and a claim older than IDEMPOTENCY_LOCK_TIMEOUT
+# (well past the HitPay timeouts) is treated as abandoned.
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "20"))
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "60"))
+# Seconds a verified webhook signature is remembered; repeats inside it are acked without DB work
+HITPAY_WEBHOOK_REPLAY_WINDOW = int(os.getenv("HITPAY_WEBHOOK_REPLAY_WINDOW", "86400"))
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
 PUBLIC_BACKEND_URL = os.getenv("PUBLIC_BACKEND_URL", "http://localhost:8000")
 
+# Payment status stream (server-sent events)
+PAYMENT_STATUS_STREAM_HEARTBEAT = float(os.getenv("PAYMENT_STATUS_STREAM_HEARTBEAT", "15"))
+PAYMENT_STATUS_STREAM_MAX_AGE = int(os.getenv("PAYMENT_STATUS_STREAM_MAX_AGE", "300"))
+PAYMENT_STATUS_STREAM_RETRY_MS = 3000
+
+# Payment status read-through cache
+PAYMENT_STATUS_CACHE_TIMEOUT = int(os.getenv("PAYMENT_STATUS_CACHE_TIMEOUT", "30"))
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Pre-rendered /api/reviews/ pages (api/feed.py), rebuilt after review writes; 0 disables.
+# Without REDIS_URL other worker processes only see a write once their copy expires.
+REVIEWS_FEED_CACHE_TIMEOUT = int(os.getenv("REVIEWS_FEED_CACHE_TIMEOUT", "300"))
+
+# Settled payments older than this many days are moved to the archive table by
+# `manage.py archive_payments` (api/archive.py), PAYMENT_ARCHIVE_BATCH_SIZE per transaction
+PAYMENT_ARCHIVE_AFTER_DAYS = int(os.getenv("PAYMENT_ARCHIVE_AFTER_DAYS", "90"))
+PAYMENT_ARCHIVE_BATCH_SIZE = int(os.getenv("PAYMENT_ARCHIVE_BATCH_SIZE", "1000"))
+
+# Rows validated and inserted per transaction by review imports (api/imports.py)
+REVIEW_IMPORT_BATCH_SIZE = int(os.getenv("REVIEW_IMPORT_BATCH_SIZE", "1000"))
+
+# Rows fetched per round trip when streaming payment exports (api/exports.py)
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+
+# Prometheus metrics on /metrics (api/metrics.py). With several worker processes,
+# point METRICS_DIR at a directory they share (emptied on deploy) so the
+# endpoint reports totals across all of them.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1"))
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
@@ -39,6 +93,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -69,13 +124,84 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'backend.wsgi.application'
 
+# SQLite profiles. "concurrent" (the default) is tuned for concurrent webhook and
+# checkout writers: a 20s busy timeout ('timeout') makes writers queue instead of
+# failing with "database is locked", and BEGIN IMMEDIATE takes the write lock when
+# a transaction starts, so a read-then-write transaction can never fail on lock
+# upgrade. "wal" adds WAL journaling so readers run alongside the single writer;
+# use it in deployments. WAL mode is stored in the database file, so it is not the
+# default: every connection would rewrite the committed development db.sqlite3.
+# "default" is stock Django/SQLite.
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "concurrent")
+_SQLITE_CONCURRENT = {
+    'timeout': 20,
+    'transaction_mode': 'IMMEDIATE',
+    'init_command': (
+        'PRAGMA temp_store=MEMORY;'
+        'PRAGMA cache_size=-20000;'
+    ),
+}
+SQLITE_PROFILES = {
+    'default': {},
+    'concurrent': _SQLITE_CONCURRENT,
+    'wal': {
+        **_SQLITE_CONCURRENT,
+        'init_command': (
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            + _SQLITE_CONCURRENT['init_command']
+        ),
+    },
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / "db.sqlite3",
+        'OPTIONS': SQLITE_PROFILES[SQLITE_PROFILE],
+        'CONN_MAX_AGE': int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Optional read replica for the status and review read views (api/routers.py).
+# Locally this is a second SQLite file refreshed by `manage.py sync_replica`.
+# Reads of anything written within REPLICA_READ_AFTER_WRITE_WINDOW seconds stay
+# on the primary, so the window must exceed the replica's worst-case lag.
+# Those recent writes are recorded in the cache, which must be shared (REDIS_URL)
+# for webhooks applied by `process_webhooks` or other workers to be seen.
+DATABASE_REPLICA_NAME = os.getenv("DATABASE_REPLICA_NAME")
+REPLICA_READ_AFTER_WRITE_WINDOW = int(os.getenv("REPLICA_READ_AFTER_WRITE_WINDOW", "30"))
+if DATABASE_REPLICA_NAME:
+    if not REDIS_URL:
+        raise ImproperlyConfigured(
+            "DATABASE_REPLICA_NAME requires REDIS_URL: without a shared cache, writes made by "
+            "other processes don't keep reads on the primary and may be read stale from the replica."
+        )
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': DATABASE_REPLICA_NAME,
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['api.routers.PrimaryReplicaRouter']
+
+# Use Redis when available so cache invalidations reach every worker process;
+# the local-memory cache is only coherent within a single process.
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
 AUTH_PASSWORD_VALIDATORS = []
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
@@ -117,6 +243,7 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',
     'origin',
     'user-agent',
     'x-csrftoken',
@@ -133,5 +260,15 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # orjson-backed JSON with the same output as DRF's; falls back to the stdlib without orjson
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
@@ -0,0 +1,17 @@
+"""
+Benchmarks for the api app.
+
+The suite (payment creation, webhook ingestion, status polling and the
+reviews list at several concurrency levels) is run from the Backend
+directory and writes JSON results to benchmarks/results/:
+
+    python -m benchmarks.run --requests 500 --concurrency 1 8 32
+
+The bench_* modules are standalone scripts for individual features, e.g.
+
+    python -m benchmarks.bench_checkout --requests 200 --latency 0.2
+
+Benchmarks run against a throwaway SQLite database (see benchmarks/settings.py)
+and a local HitPay stand-in (see benchmarks/fake_hitpay.py), never the real
+sandbox or db.sqlite3.
+"""
@@ -0,0 +1,103 @@
+"""
+Payment admin changelist page load time on a large synthetic table.
+
+Seeds --rows payments, then renders the changelist for a set of typical
+admin views with the stock ModelAdmin options (same columns, filter, date
+hierarchy and search, but exact counts, DISTINCT date drill-down and
+icontains search) and with PaymentAdmin, reporting the median time and
+query count of each:
+
+    python -m benchmarks.bench_admin_changelist --rows 1000000
+"""
+import argparse
+import multiprocessing
+import statistics
+import time
+
+
+def scenarios(reference, email, deep_page, cursor):
+    return [
+        ('first page', {}),
+        ('status filter', {'status__exact': 'failed'}),
+        ('year', {'created_at__year': '2025'}),
+        ('year + month', {'created_at__year': '2025', 'created_at__month': '6'}),
+        ('search reference', {'q': reference}),
+        ('search email', {'q': email}),
+        (f'page {deep_page}', {'p': str(deep_page)}),
+        (f'page {deep_page} (keyset)', {'before': cursor}),
+    ]
+
+
+def run(rows, repeat, deep_page):
+    from benchmarks.bench_export import seed
+    seed(rows)
+
+    from django.contrib import admin
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test import RequestFactory
+    from django.test.utils import CaptureQueriesContext
+
+    from api.admin import PaymentAdmin
+    from api.models import Payment
+
+    user = User.objects.create_superuser('bench-admin', 'admin@example.com', 'x')
+    stock = admin.ModelAdmin(Payment, admin.site)
+    # Not PaymentAdmin's template, which renders its own date_hierarchy_links
+    stock.change_list_template = 'admin/change_list.html'
+    stock.list_display = PaymentAdmin.list_display
+    stock.list_filter = ('status',)
+    stock.date_hierarchy = 'created_at'
+    stock.search_fields = ('reference_number', 'payment_request_id', 'email')
+    tuned = PaymentAdmin(Payment, admin.site)
+
+    sample = Payment.objects.order_by('-created_at', '-id')[rows // 2]
+    # The row just above the deep page, so the keyset page shows the same payments as ?p=
+    above = Payment.objects.order_by('-created_at', '-id')[(deep_page - 1) * tuned.list_per_page - 1]
+    cursor = f"{above.created_at.isoformat()},{above.pk}"
+    factory = RequestFactory()
+
+    def load(model_admin, params):
+        request = factory.get('/admin/api/payment/', params)
+        request.user = user
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = model_admin.changelist_view(request)
+            response.render()
+            elapsed = time.perf_counter() - started
+        assert response.status_code == 200, response.status_code
+        return elapsed, len(queries)
+
+    results = []
+    for name, params in scenarios(str(sample.reference_number), sample.email, deep_page, cursor):
+        row = [name]
+        for model_admin in (stock, tuned):
+            if 'before' in params and model_admin is stock:
+                row += [None, None]
+                continue
+            timings = [load(model_admin, params) for _ in range(repeat)]
+            row += [statistics.median(t for t, _ in timings) * 1000, timings[-1][1]]
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--deep-page', type=int, default=5000)
+    args = parser.parse_args()
+
+    # Seeded and measured in a spawned process, like the other table benchmarks
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        results = pool.apply(run, (args.rows, args.repeat, args.deep_page))
+
+    print(f"{args.rows} rows, median of {args.repeat}")
+    print(f"{'view':>22} {'stock ms':>9} {'queries':>8} {'tuned ms':>9} {'queries':>8}")
+    for name, stock_ms, stock_queries, tuned_ms, tuned_queries in results:
+        stock = f"{stock_ms:9.1f} {stock_queries:8}" if stock_ms is not None else f"{'-':>9} {'-':>8}"
+        print(f"{name:>22} {stock} {tuned_ms:9.1f} {tuned_queries:8}")
+
+
+if __name__ == '__main__':
+    main()
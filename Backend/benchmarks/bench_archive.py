@@ -0,0 +1,120 @@
+"""
+Hot payments table size and write latency before and after archiving.
+
+Seeds --rows payments over a year, measures the live table (rows and on-disk
+size of the table and its indexes) and checkout-style write latency (insert a
+pending payment, then mark it completed), moves settled payments older than
+--older-than-days to the archive, and measures again. Also reports archive
+throughput and lookup latency for a live and an archived reference.
+
+    python -m benchmarks.bench_archive --rows 1000000
+"""
+import argparse
+import multiprocessing
+import time
+import uuid
+from datetime import timedelta
+
+from benchmarks.common import percentile
+
+
+def _table_mb(connection, table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+            "(SELECT name FROM sqlite_master WHERE tbl_name = %s)",
+            [table],
+        )
+        return (cursor.fetchone()[0] or 0) / 1024 / 1024
+
+
+def _write_latencies(writes):
+    from api.models import Payment
+
+    latencies = []
+    for _ in range(writes):
+        started = time.perf_counter()
+        payment = Payment.objects.create(
+            reference_number=uuid.uuid4(), payment_request_id=str(uuid.uuid4()), amount='25.00',
+            email='bench@example.com',
+        )
+        payment.status = 'completed'
+        payment.save()
+        latencies.append(time.perf_counter() - started)
+    return sorted(latencies)
+
+
+def _lookup_ms(reference, repeat=200):
+    from api import archive
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        archive.get_payment(reference)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def run(rows, older_than_days, writes, batch_size):
+    from benchmarks.bench_export import NOW, seed
+    seed(rows)
+
+    from django.db import connection
+
+    from api import archive
+    from api.models import ArchivedPayment, Payment
+
+    def measure(label):
+        latencies = _write_latencies(writes)
+        return {
+            'label': label,
+            'hot_rows': Payment.objects.count(),
+            'hot_mb': _table_mb(connection, Payment._meta.db_table),
+            'archive_rows': ArchivedPayment.objects.count(),
+            'p50': percentile(latencies, 50) * 1000,
+            'p95': percentile(latencies, 95) * 1000,
+            'p99': percentile(latencies, 99) * 1000,
+        }
+
+    results = [measure('before')]
+    cutoff = NOW - timedelta(days=older_than_days)
+    started = time.perf_counter()
+    moved = 0
+    while True:
+        count = archive.archive_batch(cutoff, batch_size)
+        moved += count
+        if count < batch_size:
+            break
+    archive_seconds = time.perf_counter() - started
+    results.append(measure('after'))
+    with connection.cursor() as cursor:
+        cursor.execute('VACUUM')
+    results.append(measure('after VACUUM'))
+
+    live = Payment.objects.order_by('-created_at').values_list('reference_number', flat=True).first()
+    archived = ArchivedPayment.objects.values_list('reference_number', flat=True).first()
+    lookups = {'live': _lookup_ms(live), 'archived': _lookup_ms(archived)}
+    return results, moved, archive_seconds, lookups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--older-than-days', type=int, default=90)
+    parser.add_argument('--writes', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        results, moved, seconds, lookups = pool.apply(
+            run, (args.rows, args.older_than_days, args.writes, args.batch_size)
+        )
+
+    print(f"{args.rows} rows; archived {moved} in {seconds:.1f}s ({moved / seconds:.0f} rows/s)")
+    print(f"{'':>13} {'hot rows':>9} {'hot MB':>7} {'archived':>9} {'write p50':>10} {'p95':>7} {'p99':>7}")
+    for r in results:
+        print(f"{r['label']:>13} {r['hot_rows']:9} {r['hot_mb']:7.1f} {r['archive_rows']:9} "
+              f"{r['p50']:10.2f} {r['p95']:7.2f} {r['p99']:7.2f}")
+    print(f"lookup by reference: live {lookups['live']:.3f} ms, archived {lookups['archived']:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Concurrent checkout throughput: sync CreatePaymentRequestView vs AsyncCreatePaymentRequestView.
+
+The sync view is driven by a fixed pool of threads, modelling a WSGI server
+with --workers worker slots. The async view is driven from a single event
+loop with --concurrency requests in flight, as it is under backend/asgi.py.
+Both talk to the same local HitPay stand-in with --latency seconds of delay.
+
+    python -m benchmarks.bench_checkout --requests 200 --workers 4 --concurrency 50 --latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import print_table, run_concurrent, setup_django, summarize
+from benchmarks.fake_hitpay import FakeHitPay
+
+PAYLOAD = {
+    'name': 'Bench User',
+    'email': 'bench@example.com',
+    'amount': '10.00',
+    'currency': 'SGD',
+    'purpose': 'Benchmark',
+}
+
+
+def run_sync(total, workers):
+    from django.test import RequestFactory
+    from api.views import CreatePaymentRequestView
+
+    view = CreatePaymentRequestView.as_view()
+    factory = RequestFactory()
+
+    def call(_):
+        request = factory.post('/api/payments/create/', json.dumps(PAYLOAD), content_type='application/json')
+        return view(request).status_code == 200
+
+    return run_concurrent(f'sync x{workers}', call, total, workers)
+
+
+async def run_async(total, concurrency):
+    from django.test import AsyncRequestFactory
+    from api.views import AsyncCreatePaymentRequestView
+
+    view = AsyncCreatePaymentRequestView.as_view()
+    factory = AsyncRequestFactory()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            request = factory.post('/api/payments/create/async/', json.dumps(PAYLOAD), content_type='application/json')
+            started = time.perf_counter()
+            response = await view(request)
+            return time.perf_counter() - started, response.status_code == 200
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    errors = sum(1 for _, ok in results if not ok)
+    return summarize(f'async x{concurrency}', [r[0] for r in results], elapsed, errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=4, help='sync worker slots (WSGI workers x threads)')
+    parser.add_argument('--concurrency', type=int, default=50, help='in-flight requests for the async view')
+    parser.add_argument('--latency', type=float, default=0.2, help='seconds of HitPay stand-in delay')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+
+    with FakeHitPay(latency=args.latency) as fake:
+        settings.HITPAY_API_BASE = fake.base_url
+        rows = [
+            run_sync(args.requests, args.workers),
+            asyncio.run(run_async(args.requests, args.concurrency)),
+        ]
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
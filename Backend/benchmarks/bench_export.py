@@ -0,0 +1,118 @@
+"""
+Payment export throughput and peak memory on a large synthetic table.
+
+Seeds --rows payments, then runs each export mode in its own process and
+reports rows/s, MB/s and peak RSS growth over the process's starting RSS:
+
+  command  manage.py export_payments streaming to /dev/null
+  endpoint GET /api/payments/export/<format>/ through the request stack
+  list     loading every row into memory first, for comparison
+
+    python -m benchmarks.bench_export --rows 1000000 --format csv ndjson
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+NOW = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+STATUSES = ['completed'] * 80 + ['failed'] * 10 + ['pending'] * 5 + ['cancelled'] * 5
+
+
+def _rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def seed(rows):
+    from benchmarks.common import setup_django
+    setup_django()
+    from django.db import connection, transaction
+
+    columns = ('reference_number', 'payment_request_id', 'amount', 'currency', 'name', 'email', 'phone',
+               'status', 'created_at', 'updated_at', 'paid_at')
+    sql = f"INSERT INTO api_payment ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    rng = random.Random(42)
+    batch = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for i in range(rows):
+            created = NOW - timedelta(seconds=rng.randrange(365 * 86400))
+            status = rng.choice(STATUSES)
+            paid = created + timedelta(minutes=rng.randrange(1, 30)) if status == 'completed' else None
+            batch.append((
+                uuid.uuid4().hex, str(uuid.uuid4()), f"{rng.randrange(1000, 500000) / 100:.2f}",
+                rng.choice(['SGD', 'SGD', 'SGD', 'USD']), f'Customer {i}', f"customer{i}@example.com", '',
+                status, created.isoformat(' '), created.isoformat(' '), paid.isoformat(' ') if paid else None,
+            ))
+            if len(batch) == 50000:
+                cursor.executemany(sql, batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+
+
+def run_mode(mode, export_format):
+    from benchmarks.common import setup_django
+    setup_django(fresh=False, migrate=False)
+    from api import exports
+
+    start_rss = _rss_mb()
+    started = time.perf_counter()
+    written = 0
+    if mode == 'command':
+        from django.core.management import call_command
+        call_command('export_payments', export_format=export_format, output=os.devnull)
+        written = None
+    elif mode == 'endpoint':
+        from django.contrib.auth.models import User
+        from django.test import Client
+
+        user, _ = User.objects.get_or_create(username='bench-finance', defaults={'is_staff': True})
+        client = Client()
+        client.force_login(user)
+        response = client.get(f'/api/payments/export/{export_format}/')
+        for chunk in response.streaming_content:
+            written += len(chunk)
+    else:
+        from api.models import Payment
+
+        rows = list(Payment.objects.order_by('created_at', 'id').values_list(*exports.EXPORT_FIELDS))
+        for chunk in exports.render(export_format, iter(rows)):
+            written += len(chunk)
+    elapsed = time.perf_counter() - started
+    return elapsed, written, _peak_rss_mb() - start_rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--format', nargs='+', choices=['csv', 'ndjson'], default=['csv', 'ndjson'])
+    parser.add_argument('--modes', nargs='+', choices=['command', 'endpoint', 'list'],
+                        default=['command', 'endpoint', 'list'])
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1) as pool:
+        pool.apply(seed, (args.rows,))
+
+    print(f"{args.rows} rows")
+    print(f"{'mode':>10} {'format':>7} {'seconds':>8} {'rows/s':>9} {'MB/s':>7} {'peak RSS +MB':>13}")
+    for export_format in args.format:
+        for mode in args.modes:
+            # A fresh process per run so each peak RSS is its own
+            with context.Pool(1) as pool:
+                elapsed, written, rss = pool.apply(run_mode, (mode, export_format))
+            throughput = f"{written / elapsed / 1e6:7.1f}" if written else f"{'-':>7}"
+            print(f"{mode:>10} {export_format:>7} {elapsed:8.2f} {args.rows / elapsed:9.0f} {throughput} {rss:13.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+HitPay client behaviour under injected faults: retries and the circuit breaker.
+
+Drives POST /api/payments/create/ (not retried unless the request was never
+sent) and hitpay.get_payment_request (retried) through a sequence of phases
+against the local HitPay stand-in, reporting per phase how calls ended, how
+long they took, and the breaker's state, retries and fast-fail rejections.
+
+Phases: healthy -> flaky (--error-rate of 503s) -> outage (all 503) ->
+slow (latency past the read timeout) -> recovered (after the reset timeout).
+
+    python -m benchmarks.bench_hitpay_faults --calls 40 --error-rate 0.3
+"""
+import argparse
+import time
+from collections import Counter
+
+from benchmarks.common import percentile, setup_django
+from benchmarks.fake_hitpay import FakeHitPay
+
+PAYLOAD = {'name': 'Bench User', 'email': 'bench@example.com', 'amount': '10.00', 'currency': 'SGD'}
+
+
+def _counter_total(name):
+    from api import metrics
+
+    return sum(value for (series, _), value in metrics._counters.items() if series == name)
+
+
+def run_phase(name, calls, fake, request_ids):
+    from django.test import Client
+    from api import hitpay
+
+    client = Client()
+    outcomes = Counter()
+    latencies = []
+    retries = _counter_total('hitpay_retries_total')
+    rejections = _counter_total('hitpay_circuit_rejections_total')
+    for i in range(calls):
+        started = time.perf_counter()
+        if i % 2:
+            response = client.post('/api/payments/create/', PAYLOAD, content_type='application/json')
+            outcomes[f"create {response.status_code}"] += 1
+        else:
+            try:
+                response = hitpay.get_payment_request(request_ids[i % len(request_ids)])
+                outcomes[f"get {response.status_code}"] += 1
+            except hitpay.HitPayUnavailable:
+                outcomes['get unavailable'] += 1
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return {
+        'phase': name,
+        'outcomes': ', '.join(f"{k}: {v}" for k, v in sorted(outcomes.items())),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'max_ms': round(latencies[-1] * 1000, 1),
+        'retries': _counter_total('hitpay_retries_total') - retries,
+        'rejected': _counter_total('hitpay_circuit_rejections_total') - rejections,
+        'circuit': hitpay.breaker.snapshot()['state'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=40, help='calls per phase, alternating create and get')
+    parser.add_argument('--error-rate', type=float, default=0.3, help='share of 503s in the flaky phase')
+    parser.add_argument('--read-timeout', type=float, default=0.3)
+    parser.add_argument('--reset-timeout', type=float, default=1.0, help='HITPAY_CIRCUIT_RESET_TIMEOUT')
+    args = parser.parse_args()
+
+    setup_django()
+    import logging
+    from django.conf import settings
+
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+    settings.HITPAY_READ_TIMEOUT = args.read_timeout
+    settings.HITPAY_CIRCUIT_RESET_TIMEOUT = args.reset_timeout
+    settings.HITPAY_RETRY_BACKOFF = 0.02
+
+    rows = []
+    with FakeHitPay(latency=0.01, seed=1) as fake:
+        settings.HITPAY_API_BASE = fake.base_url
+        request_ids = [f"req-{i}" for i in range(10)]
+        for request_id in request_ids:
+            fake.register(request_id)
+
+        rows.append(run_phase('healthy', args.calls, fake, request_ids))
+        fake.error_rate = args.error_rate
+        rows.append(run_phase(f'flaky {args.error_rate:.0%}', args.calls, fake, request_ids))
+        fake.error_rate = 1.0
+        rows.append(run_phase('outage', args.calls, fake, request_ids))
+        fake.error_rate, fake.latency = 0.0, args.read_timeout * 2
+        time.sleep(args.reset_timeout)
+        rows.append(run_phase('slow', args.calls, fake, request_ids))
+        fake.latency = 0.01
+        time.sleep(args.reset_timeout)
+        rows.append(run_phase('recovered', args.calls, fake, request_ids))
+
+    for row in rows:
+        print(f"{row['phase']:>10}  circuit={row['circuit']:<9} retries={row['retries']:<3} "
+              f"rejected={row['rejected']:<3} p50={row['p50_ms']}ms max={row['max_ms']}ms")
+        print(f"{'':>12}{row['outcomes']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+JSON rendering and parsing cost per endpoint: DRF's stdlib-backed
+JSONRenderer/JSONParser versus api.renderers.ORJSONRenderer and
+api.parsers.ORJSONParser.
+
+Responses are captured from real requests against seeded data, then each one
+is rendered --iterations times with both renderers (and checked to produce
+identical bytes). Request bodies the endpoints accept are parsed the same way.
+
+    python -m benchmarks.bench_json --iterations 2000
+"""
+import argparse
+import io
+import json
+import time
+import uuid
+from decimal import Decimal
+
+from benchmarks.common import setup_django
+
+
+def _per_call_us(function, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def capture_responses():
+    """(endpoint, data, accepted media type) for each JSON endpoint, from real requests."""
+    from django.contrib.auth.models import User
+    from django.test import Client, override_settings
+
+    from api.models import Payment, Review, ReviewStats
+
+    Review.objects.bulk_create(
+        [Review(author_name=f'Reviewer {i}', rating=i % 5 + 1, text='Great tour – would go again. ' * 8)
+         for i in range(200)]
+    )
+    ReviewStats.rebuild()
+    payments = Payment.objects.bulk_create([
+        Payment(reference_number=uuid.uuid4(), amount=Decimal('120.50'), name=f'Customer {i}',
+                email=f'customer{i}@example.com', status='pending', payment_request_id=f'req-{i}')
+        for i in range(500)
+    ])
+    client = Client()
+    admin = Client()
+    admin.force_login(User.objects.create_superuser('bench-admin', 'admin@example.com', 'x'))
+
+    bad_rows = '\n'.join(['author_name,rating,text'] + [f'Reviewer {i},five,Text' for i in range(200)])
+    bulk = {'updates': [{'reference_number': str(p.reference_number), 'status': 'completed'} for p in payments]}
+    requests = [
+        ('reviews page', lambda: client.get('/api/reviews/?page=2')),
+        ('reviews cursor page', lambda: client.get('/api/reviews/?pagination=cursor')),
+        ('review detail', lambda: client.get(f'/api/reviews/{Review.objects.first().pk}/')),
+        ('review stats', lambda: client.get('/api/reviews/stats/')),
+        ('payment status', lambda: client.get(f'/api/payments/status/{payments[0].reference_number}/')),
+        ('bulk status update x500', lambda: admin.post('/api/payments/bulk-update-status/', bulk,
+                                                        content_type='application/json')),
+        ('import summary, 100 errors', lambda: admin.post('/api/reviews/import/', bad_rows,
+                                                          content_type='text/csv')),
+    ]
+    captured = []
+    with override_settings(REVIEWS_FEED_CACHE_TIMEOUT=0):
+        for name, request in requests:
+            response = request()
+            captured.append((name, response.data, response.accepted_media_type))
+    return captured
+
+
+def request_bodies():
+    """(endpoint, body) for the JSON bodies clients send."""
+    review = {'author_name': 'Ana', 'rating': 5, 'text': 'Lovely guide, the view was unreal. ' * 10}
+    checkout = {'amount': '120.50', 'name': 'Ana Lim', 'email': 'ana@example.com', 'phone': '+6590000000',
+                'currency': 'SGD', 'purpose': 'Island tour'}
+    bulk = {'updates': [{'reference_number': str(uuid.uuid4()), 'status': 'completed'} for _ in range(500)]}
+    return [
+        ('POST /api/reviews/', json.dumps(review).encode()),
+        ('POST /api/payments/create/', json.dumps(checkout).encode()),
+        ('POST bulk-update-status x500', json.dumps(bulk).encode()),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from api import parsers, renderers
+
+    if renderers.orjson is None:
+        print('orjson is not installed: ORJSONRenderer and ORJSONParser fall back to the stdlib')
+
+    print(f"{'render':<30} {'bytes':>8} {'stdlib us':>10} {'orjson us':>10} {'speedup':>8}")
+    stdlib_renderer, fast_renderer = JSONRenderer(), renderers.ORJSONRenderer()
+    for name, data, media_type in capture_responses():
+        expected = stdlib_renderer.render(data, media_type, {})
+        rendered = fast_renderer.render(data, media_type, {})
+        if rendered != expected:
+            raise SystemExit(f"{name}: output differs from JSONRenderer")
+        before = _per_call_us(lambda: stdlib_renderer.render(data, media_type, {}), args.iterations)
+        after = _per_call_us(lambda: fast_renderer.render(data, media_type, {}), args.iterations)
+        print(f"{name:<30} {len(expected):8} {before:10.1f} {after:10.1f} {before / after:7.1f}x")
+
+    print(f"\n{'parse':<30} {'bytes':>8} {'stdlib us':>10} {'orjson us':>10} {'speedup':>8}")
+    stdlib_parser, fast_parser = JSONParser(), parsers.ORJSONParser()
+    for name, body in request_bodies():
+        if fast_parser.parse(io.BytesIO(body)) != stdlib_parser.parse(io.BytesIO(body)):
+            raise SystemExit(f"{name}: parsed data differs from JSONParser")
+        before = _per_call_us(lambda: stdlib_parser.parse(io.BytesIO(body)), args.iterations)
+        after = _per_call_us(lambda: fast_parser.parse(io.BytesIO(body)), args.iterations)
+        print(f"{name:<30} {len(body):8} {before:10.1f} {after:10.1f} {before / after:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+Payment table query plans and timings before and after the 0009 indexes/UUID migration.
+
+Builds a synthetic table of --rows payments on the schema as of --before
+(default: no Payment indexes, string reference numbers), times the real
+query shapes, migrates forward, and times them again.
+
+    python -m benchmarks.bench_payment_indexes --rows 2000000
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from benchmarks.common import setup_django
+
+STATUSES = ['completed'] * 80 + ['failed'] * 10 + ['pending'] * 5 + ['cancelled'] * 5
+NOW = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def populate(rows, customers):
+    """Bulk insert rows with raw SQL; the ORM would take far longer at this size."""
+    from django.db import connection, transaction
+
+    columns = ('reference_number', 'payment_request_id', 'amount', 'currency', 'name', 'email', 'phone',
+               'status', 'created_at', 'updated_at', 'paid_at')
+    sql = f"INSERT INTO api_payment ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    rng = random.Random(42)
+    batch = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for i in range(rows):
+            created = NOW - timedelta(seconds=rng.randrange(365 * 86400))
+            status = rng.choice(STATUSES)
+            paid = created + timedelta(minutes=rng.randrange(1, 30)) if status == 'completed' else None
+            batch.append((
+                str(uuid.uuid4()), str(uuid.uuid4()), f"{rng.randrange(1000, 500000) / 100:.2f}", 'SGD',
+                'Customer', f"customer{rng.randrange(customers)}@example.com", '', status,
+                created.isoformat(' '), created.isoformat(' '), paid.isoformat(' ') if paid else None,
+            ))
+            if len(batch) == 50000:
+                cursor.executemany(sql, batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+
+
+def queries(sample_reference):
+    from django.db.models import Sum
+    from api.models import Payment
+
+    day = NOW - timedelta(days=30)
+    return {
+        'reconcile: pending older than 30m': lambda: list(
+            Payment.objects.filter(status='pending', created_at__lt=NOW - timedelta(minutes=30))
+            .order_by('created_at').values_list('id', flat=True)[:100]),
+        'admin: failed, newest first': lambda: list(
+            Payment.objects.filter(status='failed').order_by('-created_at').values_list('id', flat=True)[:100]),
+        'customer history by email': lambda: list(
+            Payment.objects.filter(email='customer123@example.com').order_by('-created_at')
+            .values_list('id', flat=True)[:20]),
+        'revenue for one day (paid_at)': lambda: Payment.objects.filter(
+            paid_at__gte=day, paid_at__lt=day + timedelta(days=1)).aggregate(Sum('amount')),
+        'status lookup by reference': lambda: Payment.objects.filter(
+            reference_number=sample_reference).values_list('id', flat=True).first(),
+    }
+
+
+def measure(label, sample_reference, repeat):
+    from django.db import connection
+    from django.db.models import QuerySet
+
+    print(f"\n== {label} ==")
+    with connection.cursor() as cursor:
+        # Pages in use; a table rebuild leaves the old pages on the freelist until VACUUM
+        cursor.execute('SELECT (page_count - freelist_count) * page_size FROM pragma_page_count, pragma_freelist_count, pragma_page_size')
+        print(f"database size: {cursor.fetchone()[0] / 1024 / 1024:.1f} MiB")
+
+    results = {}
+    for name, run in queries(sample_reference).items():
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        results[name] = statistics.median(timings) * 1000
+
+        # Re-run with the SQL captured to show the plan SQLite picked
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as captured:
+            run()
+        sql = captured.captured_queries[-1]['sql']
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            plan = '; '.join(row[-1] for row in cursor.fetchall())
+        print(f"{name:<36} {results[name]:>10.2f} ms  {plan}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--customers', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--before', default='0007_reviewstats', help='api migration for the "before" schema')
+    args = parser.parse_args()
+
+    setup_django(migrate=False)
+    from django.core.management import call_command
+    from django.db import connection
+
+    call_command('migrate', 'api', args.before, verbosity=0)
+    started = time.perf_counter()
+    populate(args.rows, args.customers)
+    print(f"inserted {args.rows} payments in {time.perf_counter() - started:.1f}s")
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+        cursor.execute('SELECT reference_number FROM api_payment ORDER BY id DESC LIMIT 1')
+        sample_reference = cursor.fetchone()[0]
+
+    before = measure(f'before (api {args.before})', sample_reference, args.repeat)
+
+    started = time.perf_counter()
+    call_command('migrate', 'api', verbosity=0)
+    print(f"\nmigrated forward in {time.perf_counter() - started:.1f}s")
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    after = measure('after (latest)', sample_reference, args.repeat)
+
+    print(f"\n{'query':<36} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for name in before:
+        print(f"{name:<36} {before[name]:>10.2f} {after[name]:>10.2f} {before[name] / after[name]:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
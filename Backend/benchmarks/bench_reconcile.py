@@ -0,0 +1,54 @@
+"""
+Reconciliation throughput: `manage.py reconcile_payments` against the local HitPay stand-in.
+
+Creates --payments stale pending payments, registers them with the fake
+(a third completed, a third failed, the rest still pending) and runs the
+command with the given pool size and rate limit.
+
+    python -m benchmarks.bench_reconcile --payments 500 --workers 8 --rate 0 --latency 0.05
+"""
+import argparse
+import random
+import uuid
+from datetime import timedelta
+
+from benchmarks.common import setup_django
+from benchmarks.fake_hitpay import FakeHitPay
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--payments', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=0, help='lookups per second, 0 for unlimited')
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db.models import Count
+    from django.utils import timezone
+    from api.models import Payment
+
+    with FakeHitPay(latency=args.latency) as fake:
+        settings.HITPAY_API_BASE = fake.base_url
+        rows = []
+        for i in range(args.payments):
+            request_id = str(uuid.uuid4())
+            fake.register(request_id, random.choice(['completed', 'failed', 'pending']))
+            rows.append(Payment(reference_number=str(uuid.uuid4()), payment_request_id=request_id, amount='10.00'))
+        Payment.objects.bulk_create(rows)
+        Payment.objects.update(created_at=timezone.now() - timedelta(hours=2))
+
+        call_command(
+            'reconcile_payments', older_than=30, workers=args.workers, rate=args.rate,
+            dry_run=args.dry_run,
+        )
+
+    print(dict(Payment.objects.values_list('status').annotate(Count('id'))))
+
+
+if __name__ == '__main__':
+    main()
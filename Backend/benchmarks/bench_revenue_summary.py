@@ -0,0 +1,106 @@
+"""
+Revenue reporting from the RevenueRollup table versus aggregating the
+payments table, and what keeping the rollups costs a status transition.
+
+Seeds --rows payments spread over a year, backfills the rollups with
+`manage.py rebuild_revenue_rollups`, then times:
+  - 30 days by day and 12 months by month, as a GROUP BY day over
+    api_payment (paid_at day for completed, created_at day otherwise; months
+    would still need summing) and as GET /api/payments/summary/;
+  - --transitions pending -> completed changes, as a bare conditional UPDATE
+    and through transitions.transition() with its two rollup UPDATEs.
+
+    python -m benchmarks.bench_revenue_summary --rows 1000000
+"""
+import argparse
+import time
+from datetime import date, timedelta
+from io import StringIO
+
+from benchmarks.bench_export import seed
+
+
+def _best_ms(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--transitions', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    seed(args.rows)
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import models
+    from django.db.models.functions import TruncDate
+    from django.test import Client
+    from django.utils import timezone
+
+    from api import transitions
+    from api.models import Payment, RevenueRollup
+
+    settings.DEBUG = False
+    started = time.perf_counter()
+    call_command('rebuild_revenue_rollups')
+    print(f"backfill of {args.rows} payments: {time.perf_counter() - started:.2f}s")
+
+    def scan(start, end):
+        day = models.Case(
+            models.When(status='completed', paid_at__isnull=False, then=TruncDate('paid_at')),
+            default=TruncDate('created_at'), output_field=models.DateField(),
+        )
+        rows = (
+            Payment.objects.order_by().annotate(day=day).filter(day__gte=start, day__lt=end)
+            .values('day', 'currency', 'status')
+            .annotate(count=models.Count('id'), amount=models.Sum('amount'))
+        )
+        return list(rows)
+
+    client = Client()
+    client.force_login(User.objects.create_superuser('bench-admin', 'admin@example.com', 'x'))
+    end = date(2026, 1, 1)
+    reports = [
+        ('30 days by day', end - timedelta(days=30), 'day'),
+        ('12 months by month', date(2025, 1, 1), 'month'),
+    ]
+    print(f"\n{'report':<20} {'scan ms':>10} {'rollup ms':>10}")
+    for name, start, group in reports:
+        url = f'/api/payments/summary/?start={start}&end={end}&group={group}'
+        scan_ms = _best_ms(lambda: scan(start, end), args.repeat)
+        rollup_ms = _best_ms(lambda: client.get(url), args.repeat)
+        print(f"{name:<20} {scan_ms:10.1f} {rollup_ms:10.2f}")
+
+    pending = list(Payment.objects.filter(status='pending')[:args.transitions])
+    now = timezone.now()
+    values = transitions.changes('completed', {'paid_at': now}, now)
+    started = time.perf_counter()
+    for payment in pending:
+        Payment.objects.filter(pk=payment.pk, status='pending').update(**values)
+    bare = (time.perf_counter() - started) / len(pending) * 1e6
+    # Put them back, so only the transitions below change what the rollups count
+    Payment.objects.filter(pk__in=[payment.pk for payment in pending]).update(status='pending', paid_at=None)
+    started = time.perf_counter()
+    for payment in pending:
+        transitions.transition(payment, 'completed', {'paid_at': timezone.now(), 'hitpay_status': 'completed'})
+    rolled = (time.perf_counter() - started) / len(pending) * 1e6
+    print(f"\npending -> completed x{len(pending)}: bare UPDATE {bare:.0f} us, with rollups {rolled:.0f} us")
+
+    def rollups():
+        return sorted(RevenueRollup.objects.filter(count__gt=0).values_list('day', 'currency', 'status', 'count', 'amount'))
+
+    incremental = rollups()
+    call_command('rebuild_revenue_rollups', stdout=StringIO())
+    print(f"incrementally maintained rollups {'match' if incremental == rollups() else 'DIFFER FROM'} a rebuild")
+
+
+if __name__ == '__main__':
+    main()
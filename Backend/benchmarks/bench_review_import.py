@@ -0,0 +1,115 @@
+"""
+Review import throughput: one POST per review versus the bulk import paths.
+
+Writes --rows synthetic reviews (1% invalid) to CSV and JSON Lines files,
+then runs each mode in a fresh process against an empty database and reports
+rows/s and peak RSS growth:
+
+  post      POST /api/reviews/ per review (first --post-rows rows only)
+  command   manage.py import_reviews <file>
+  endpoint  POST /api/reviews/import/ with the file as the body (the test
+            client holds the whole body in memory, unlike a real upload)
+
+    python -m benchmarks.bench_review_import --rows 1000000
+"""
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.bench_export import _peak_rss_mb, _rss_mb
+
+WORDS = 'great trip guide tour hotel view food beach tidy late friendly quick clean value staff'.split()
+
+
+def write_files(directory, rows):
+    rng = random.Random(42)
+    paths = {'csv': os.path.join(directory, 'reviews.csv'), 'jsonl': os.path.join(directory, 'reviews.jsonl')}
+    with open(paths['csv'], 'w', newline='') as csv_file, open(paths['jsonl'], 'w') as jsonl_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(['author_name', 'rating', 'text'])
+        for i in range(rows):
+            # Every hundredth row has an out-of-type rating so the error path is exercised too
+            rating = 'five' if i % 100 == 99 else rng.randint(1, 5)
+            text = ' '.join(rng.choices(WORDS, k=rng.randint(5, 40)))
+            writer.writerow([f'Reviewer {i}', rating, text])
+            jsonl_file.write(json.dumps({'author_name': f'Reviewer {i}', 'rating': rating, 'text': text}) + '\n')
+    return paths
+
+
+def run_mode(mode, path, import_format, post_rows):
+    from benchmarks.common import setup_django
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.test import Client
+
+    # With DEBUG on, Django keeps the SQL of recent queries, which for bulk inserts is most of the RSS
+    settings.DEBUG = False
+    # The invalid rows would log a "Bad Request" line each in post mode
+    logging.getLogger('django.request').setLevel(logging.ERROR)
+
+    client = Client()
+    start_rss = _rss_mb()
+    started = time.perf_counter()
+    if mode == 'post':
+        rows = 0
+        with open(path, newline='') as f:
+            for record in csv.DictReader(f):
+                if rows == post_rows:
+                    break
+                client.post('/api/reviews/', record, content_type='application/json')
+                rows += 1
+    elif mode == 'command':
+        from django.core.management import call_command
+
+        with open(os.devnull, 'w') as devnull:
+            call_command('import_reviews', path, stdout=devnull, stderr=devnull)
+        rows = None
+    else:
+        client.force_login(User.objects.create_superuser('bench-admin', 'admin@example.com', 'x'))
+        content_type = 'text/csv' if import_format == 'csv' else 'application/jsonl'
+        with open(path, 'rb') as f:
+            response = client.post('/api/reviews/import/', f.read(), content_type=content_type)
+        rows = response.json()['rows']
+    elapsed = time.perf_counter() - started
+
+    from api.models import Review
+    imported = Review.objects.count()
+    return rows, imported, elapsed, _peak_rss_mb() - start_rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--post-rows', type=int, default=5000)
+    parser.add_argument('--format', nargs='+', choices=['csv', 'jsonl'], default=['csv', 'jsonl'])
+    parser.add_argument('--modes', nargs='+', choices=['post', 'command', 'endpoint'],
+                        default=['post', 'command', 'endpoint'])
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_files(directory, args.rows)
+        print(f"{args.rows} rows, {os.path.getsize(paths['csv']) / 1e6:.0f} MB as CSV")
+        print(f"{'mode':>9} {'format':>7} {'rows':>9} {'imported':>9} {'seconds':>8} {'rows/s':>9} {'peak RSS +MB':>13}")
+        for import_format in args.format:
+            for mode in args.modes:
+                if mode == 'post' and import_format != 'csv':
+                    continue
+                with context.Pool(1) as pool:
+                    rows, imported, elapsed, rss = pool.apply(
+                        run_mode, (mode, paths[import_format], import_format, args.post_rows)
+                    )
+                rows = rows if rows is not None else args.rows
+                label = 'json' if mode == 'post' else import_format
+                print(f"{mode:>9} {label:>7} {rows:9} {imported:9} {elapsed:8.2f} {rows / elapsed:9.0f} {rss:13.1f}")
+
+
+if __name__ == '__main__':
+    main()
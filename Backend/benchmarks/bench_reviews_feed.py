@@ -0,0 +1,88 @@
+"""
+Reviews feed throughput with and without the pre-rendered page cache, and
+how many rebuilds a burst of concurrent misses causes.
+
+Seeds --reviews reviews, then runs GET /api/reviews/ (page-number pages and
+the first cursor page) through the request stack at each concurrency, first
+with REVIEWS_FEED_CACHE_TIMEOUT=0 (rendered per request) and then cached.
+The stampede run invalidates the feed and sends --concurrency requests for
+one page at the same moment.
+
+    python -m benchmarks.bench_reviews_feed --reviews 5000 --requests 3000 --concurrency 1 8 32
+"""
+import argparse
+import threading
+
+from benchmarks.common import print_table, run_concurrent, setup_django
+
+_local = threading.local()
+
+
+def _client():
+    from django.test import Client
+
+    if not hasattr(_local, 'client'):
+        _local.client = Client()
+    return _local.client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reviews', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--pages', type=int, default=20, help='distinct pages requested')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import override_settings
+    from django.test.utils import CaptureQueriesContext
+
+    from api import feed, metrics
+    from api.models import Review
+
+    Review.objects.bulk_create(
+        [Review(author_name=f'Reviewer {i}', rating=i % 5 + 1, text='Great trip. ' * 20) for i in range(args.reviews)],
+        batch_size=500,
+    )
+
+    def call(i):
+        page = i % args.pages
+        url = '/api/reviews/?pagination=cursor' if page == 0 else f'/api/reviews/?page={page}'
+        return _client().get(url).status_code == 200
+
+    results = []
+    for label, timeout in (('uncached', 0), ('cached', 300)):
+        with override_settings(REVIEWS_FEED_CACHE_TIMEOUT=timeout):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                call(1)
+                call(1)
+            print(f"{label}: {len(queries)} queries for two requests of the same page")
+            for concurrency in args.concurrency:
+                results.append(run_concurrent(f'{label} x{concurrency}', call, args.requests, concurrency))
+    print_table(results)
+
+    concurrency = max(args.concurrency)
+    feed.invalidate()
+    before = dict(metrics._counters)
+    barrier = threading.Barrier(concurrency)
+
+    def burst(i):
+        barrier.wait()
+        return _client().get('/api/reviews/?page=1').status_code == 200
+
+    run_concurrent('stampede', burst, concurrency, concurrency)
+    outcomes = {
+        labels[0]: value - before.get((name, labels), 0)
+        for (name, labels), value in metrics._counters.items()
+        if name == 'reviews_feed_requests_total'
+    }
+    print(f"stampede of {concurrency} concurrent misses: "
+          + ', '.join(f"{outcome} {count}" for outcome, count in sorted(outcomes.items()) if count))
+
+
+if __name__ == '__main__':
+    main()
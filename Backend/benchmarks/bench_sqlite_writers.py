@@ -0,0 +1,95 @@
+"""
+SQLite writer throughput and lock errors across worker processes, per SQLITE_PROFILE.
+
+Each of --processes workers runs --transactions write transactions shaped
+like production traffic: a checkout insert, then a webhook-style
+read-then-update of an existing payment inside one transaction. Lock
+errors ("database is locked") are counted instead of retried.
+
+    python -m benchmarks.bench_sqlite_writers --processes 8 --transactions 300
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import time
+import uuid
+
+
+def _setup(profile, db):
+    os.environ['SQLITE_PROFILE'] = profile
+    os.environ['BENCH_DB'] = db
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+    from benchmarks.common import setup_django
+    setup_django(fresh=False, migrate=False)
+
+
+def prepare(profile, db, payments):
+    for suffix in ('', '-wal', '-shm'):
+        try:
+            os.remove(db + suffix)
+        except FileNotFoundError:
+            pass
+    _setup(profile, db)
+    from django.core.management import call_command
+    from api.models import Payment
+
+    call_command('migrate', verbosity=0)
+    Payment.objects.bulk_create(
+        [Payment(reference_number=uuid.uuid4(), amount='10.00') for _ in range(payments)], batch_size=500
+    )
+
+
+def worker(profile, db, transactions, payments, seed):
+    _setup(profile, db)
+    from django.db import OperationalError, transaction
+    from api.models import Payment
+
+    rng = random.Random(seed)
+    done = errors = 0
+    started = time.perf_counter()
+    for _ in range(transactions):
+        try:
+            Payment.objects.create(reference_number=uuid.uuid4(), amount='10.00', email='bench@example.com')
+            with transaction.atomic():
+                payment = Payment.objects.filter(pk=rng.randint(1, payments)).first()
+                payment.hitpay_status = rng.choice(['completed', 'failed'])
+                payment.save(update_fields=['hitpay_status', 'updated_at'])
+            done += 1
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            errors += 1
+    return done, errors, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--transactions', type=int, default=300, help='per process')
+    parser.add_argument('--payments', type=int, default=1000, help='payments seeded for the updates')
+    parser.add_argument('--profiles', nargs='+', default=['default', 'concurrent', 'wal'])
+    parser.add_argument('--db', default=os.path.join('/tmp', 'goeasytrip-bench-writers.sqlite3'))
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    print(f"{'profile':>12} {'ok':>8} {'locked':>8} {'error %':>8} {'txn/s':>8} {'wall s':>8}")
+    for profile in args.profiles:
+        with context.Pool(1) as pool:
+            pool.apply(prepare, (profile, args.db, args.payments))
+
+        started = time.perf_counter()
+        with context.Pool(args.processes) as pool:
+            results = pool.starmap(worker, [
+                (profile, args.db, args.transactions, args.payments, seed) for seed in range(args.processes)
+            ])
+        wall = time.perf_counter() - started
+
+        done = sum(r[0] for r in results)
+        errors = sum(r[1] for r in results)
+        total = done + errors
+        print(f"{profile:>12} {done:>8} {errors:>8} {errors / total * 100:>7.1f}% {done / wall:>8.1f} {wall:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
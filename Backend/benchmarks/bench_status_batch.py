@@ -0,0 +1,79 @@
+"""
+Checking the status of many payments: one GET /api/payments/status/<ref>/
+per reference versus one POST /api/payments/status/batch/.
+
+Seeds --payments payments, then for each of --rounds rounds picks --batch
+reference numbers and looks them all up through the request stack:
+  - per reference, with the status cache cleared first (each GET is a miss);
+  - per reference, with the status cache already warm;
+  - one batch request.
+Reports the time to check all --batch references and the queries it took.
+
+    python -m benchmarks.bench_status_batch --payments 20000 --batch 500 --rounds 10
+"""
+import argparse
+import random
+import time
+import uuid
+from decimal import Decimal
+
+from benchmarks.common import setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--payments', type=int, default=20000)
+    parser.add_argument('--batch', type=int, default=500)
+    parser.add_argument('--rounds', type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    from api.models import Payment
+
+    Payment.objects.bulk_create([
+        Payment(reference_number=uuid.uuid4(), amount=Decimal('42.00'), name=f'Customer {i}',
+                email=f'customer{i}@example.com', payment_request_id=f'req-{i}')
+        for i in range(args.payments)
+    ], batch_size=1000)
+    all_references = [str(ref) for ref in Payment.objects.values_list('reference_number', flat=True)]
+    client = Client()
+
+    def single(references):
+        for reference in references:
+            assert client.get(f'/api/payments/status/{reference}/').status_code == 200
+
+    def batch(references):
+        response = client.post('/api/payments/status/batch/', {'reference_numbers': references},
+                               content_type='application/json')
+        assert response.status_code == 200 and not response.json()['not_found']
+
+    strategies = (
+        ('per reference, cold cache', single, True),
+        ('per reference, warm cache', single, False),
+        ('batch', batch, True),
+    )
+    print(f"{'strategy':<28} {'refs':>6} {'mean ms':>9} {'min ms':>9} {'queries':>8}")
+    for label, lookup, cold in strategies:
+        timings = []
+        queries = 0
+        for _ in range(args.rounds):
+            references = random.sample(all_references, args.batch)
+            cache.clear()
+            if not cold:
+                single(references)
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                lookup(references)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries += len(captured)
+        print(f"{label:<28} {args.batch:6} {sum(timings) / len(timings):9.1f} {min(timings):9.1f} "
+              f"{queries / args.rounds:8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Conflicting concurrent status updates: get-and-save versus the conditional
+UPDATEs in api/transitions.py.
+
+Each of --payments pending payments gets three racing writers:
+  - a HitPay "completed" webhook;
+  - a manual update to "failed";
+  - a late HitPay "pending" event.
+--think-ms models the time between reading the payment and writing it back
+(request handling, a networked database). For both strategies the benchmark
+reports throughput and two kinds of damage:
+  - lost completions: the webhook was applied, but the payment did not end up
+    completed;
+  - torn rows: a row mixing two writers' fields, e.g. failed with a paid_at,
+    or completed with a stale hitpay_status.
+
+    python -m benchmarks.bench_transitions --payments 500 --concurrency 8 --think-ms 1
+"""
+import argparse
+import time
+import uuid
+from decimal import Decimal
+
+from benchmarks.common import print_table, run_concurrent, setup_django
+
+OPERATIONS = ('webhook completed', 'manual failed', 'late pending event')
+
+
+def get_and_save(pk, operation, think):
+    """The old views: load the payment, change it in memory, save() every column."""
+    from django.utils import timezone
+
+    from api.models import Payment
+
+    payment = Payment.objects.get(pk=pk)
+    time.sleep(think)
+    if operation == 'webhook completed':
+        payment.status = 'completed'
+        payment.hitpay_payment_id = f'pay-{pk}'
+        payment.hitpay_status = 'completed'
+        payment.paid_at = timezone.now()
+    elif operation == 'manual failed':
+        payment.status = 'failed'
+    else:
+        payment.hitpay_status = 'pending'
+    payment.save()
+    return True
+
+
+def conditional(pk, operation, think):
+    """The same writes through the state machine; False when the transition no longer applied."""
+    from django.utils import timezone
+
+    from api import transitions
+    from api.models import Payment
+    from api.webhooks import apply_hitpay_status
+
+    payment = Payment.objects.get(pk=pk)
+    time.sleep(think)
+    if operation == 'webhook completed':
+        return apply_hitpay_status(payment, 'completed', f'pay-{pk}', timezone.now())
+    elif operation == 'manual failed':
+        return transitions.transition(payment, 'failed')
+    return apply_hitpay_status(payment, 'pending', None, timezone.now())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--payments', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--think-ms', type=float, default=1.0)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db.models import Count, Q
+
+    from api.models import Payment
+
+    results = []
+    damage = []
+    for label, write in (('get-and-save', get_and_save), ('conditional', conditional)):
+        Payment.objects.all().delete()
+        pks = [payment.pk for payment in Payment.objects.bulk_create([
+            Payment(reference_number=uuid.uuid4(), amount=Decimal('42.00'), name=f'Customer {i}',
+                    email=f'customer{i}@example.com', payment_request_id=f'req-{uuid.uuid4()}')
+            for i in range(args.payments)
+        ])]
+        applied_completions = set()
+
+        def call(i):
+            pk, operation = pks[i // len(OPERATIONS)], OPERATIONS[i % len(OPERATIONS)]
+            applied = write(pk, operation, args.think_ms / 1000)
+            if applied and operation == 'webhook completed':
+                applied_completions.add(pk)
+            return True
+
+        results.append(run_concurrent(label, call, len(pks) * len(OPERATIONS), args.concurrency))
+        lost = Payment.objects.filter(pk__in=applied_completions).exclude(status='completed').count()
+        torn = Payment.objects.filter(
+            Q(status='completed', hitpay_status='pending') | Q(status='failed', paid_at__isnull=False)
+            | Q(status='pending', paid_at__isnull=False)
+        ).count()
+        by_status = dict(Payment.objects.order_by().values_list('status').annotate(Count('id')))
+        damage.append((label, len(applied_completions), lost, torn, by_status))
+
+    print_table(results)
+    print(f"\n{'strategy':>14} {'completions applied':>20} {'lost':>6} {'torn rows':>10}  final statuses")
+    for label, applied, lost, torn, by_status in damage:
+        print(f"{label:>14} {applied:20} {lost:6} {torn:10}  {by_status}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Webhook verification throughput: valid, replayed and rejected deliveries.
+
+Part one times signature checking alone: a fresh hmac.new() per message vs
+copying the pre-keyed state in api.webhooks. Part two posts urlencoded
+webhooks (as HitPay sends them) through the full request stack, so the cost
+of a rejected or replayed webhook can be compared with one that is stored.
+
+    python -m benchmarks.bench_webhook_verify --requests 2000 --concurrency 1 8
+"""
+import argparse
+import hashlib
+import hmac
+import time
+import uuid
+from urllib.parse import urlencode
+
+from benchmarks.common import print_table, run_concurrent, setup_django
+from benchmarks.fake_hitpay import webhook_payload
+
+
+def bench_signing(bodies, salt):
+    from urllib.parse import parse_qsl
+
+    from django.conf import settings
+    from api.webhooks import verify_hitpay_webhook
+
+    messages = []
+    for body in bodies:
+        fields = dict(parse_qsl(body.decode()))
+        fields.pop('hmac')
+        messages.append(''.join(f"{key}{value}" for key, value in sorted(fields.items())).encode())
+    key = salt.encode()
+    keyed = hmac.new(key, digestmod=hashlib.sha256)
+
+    def pre_keyed(message):
+        signer = keyed.copy()
+        signer.update(message)
+        return signer.hexdigest()
+
+    settings.HITPAY_SALT = salt
+    rows = []
+    for name, verify, inputs in (
+        ('hmac.new per message', lambda message: hmac.new(key, message, hashlib.sha256).hexdigest(), messages),
+        ('pre-keyed copy', pre_keyed, messages),
+        ('verify_hitpay_webhook', lambda body: verify_hitpay_webhook(body, 'application/x-www-form-urlencoded'), bodies),
+    ):
+        started = time.perf_counter()
+        for item in inputs:
+            verify(item)
+        elapsed = time.perf_counter() - started
+        rows.append((name, len(inputs) / elapsed, elapsed / len(inputs) * 1e6))
+    print(f"{'signature check':>24} {'per s':>10} {'us each':>8}")
+    for name, rate, micros in rows:
+        print(f"{name:>24} {rate:>10.0f} {micros:>8.2f}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    args = parser.parse_args()
+
+    setup_django()
+    import logging
+    from django.conf import settings
+    from django.core.cache import cache
+    from django.test import Client
+    from api.models import Payment
+
+    salt = settings.HITPAY_SALT
+    content_type = 'application/x-www-form-urlencoded'
+
+    def signed_bodies(count):
+        request_ids = [str(uuid.uuid4()) for _ in range(count)]
+        Payment.objects.bulk_create(
+            [Payment(reference_number=uuid.uuid4(), payment_request_id=r, amount='10.00') for r in request_ids],
+            batch_size=500,
+        )
+        return [urlencode(webhook_payload(r, 'completed', salt)).encode() for r in request_ids]
+
+    bench_signing([urlencode(webhook_payload(str(uuid.uuid4()), 'completed', salt)).encode()
+                   for _ in range(args.requests * 10)], salt)
+
+    # Every rejected webhook would otherwise log a "Bad Request" warning
+    logging.getLogger('django.request').setLevel(logging.ERROR)
+    client = Client()
+    url = '/api/payments/hitpay/webhook/'
+    rows = []
+    for concurrency in args.concurrency:
+        cache.clear()
+        bodies = signed_bodies(args.requests)
+        rows.append(run_concurrent(
+            f'valid x{concurrency}',
+            lambda i: client.post(url, bodies[i], content_type=content_type).status_code == 200,
+            args.requests, concurrency,
+        ))
+        rows.append(run_concurrent(
+            f'replayed x{concurrency}',
+            lambda i: client.post(url, bodies[i], content_type=content_type).status_code == 200,
+            args.requests, concurrency,
+        ))
+        forged = [body.replace(b'amount=10.00', b'amount=99.00') for body in bodies]
+        rows.append(run_concurrent(
+            f'bad signature x{concurrency}',
+            lambda i: client.post(url, forged[i], content_type=content_type).status_code == 400,
+            args.requests, concurrency,
+        ))
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django(fresh=True, migrate=True):
+    """Configure Django with benchmarks.settings and migrate the benchmark database."""
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+    from benchmarks import settings as bench_settings
+    if fresh:
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.remove(bench_settings.BENCH_DB + suffix)
+            except FileNotFoundError:
+                pass
+
+    import django
+    django.setup()
+
+    if migrate:
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+
+
+def run_concurrent(name, call, total, concurrency):
+    """
+    Run call(i) for i in range(total) on `concurrency` threads and summarize.
+
+    call returns True on success; exceptions count as errors.
+    """
+    from django.db import connections
+
+    def one(i):
+        started = time.perf_counter()
+        try:
+            ok = call(i)
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - started
+        return elapsed, ok
+
+    def worker(indexes):
+        try:
+            return [one(i) for i in indexes]
+        finally:
+            connections.close_all()
+
+    chunks = [range(start, total, concurrency) for start in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = [r for chunk in pool.map(worker, chunks) for r in chunk]
+    elapsed = time.perf_counter() - started
+    return summarize(name, [r[0] for r in results], elapsed, sum(1 for _, ok in results if not ok))
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(name, latencies, elapsed, errors=0):
+    """Throughput and latency percentiles (milliseconds) for one benchmark run."""
+    ordered = sorted(latencies)
+    return {
+        'name': name,
+        'requests': len(latencies),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 2) if ordered else 0.0,
+        'p50_ms': round(percentile(ordered, 50) * 1000, 2),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 2),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 2),
+    }
+
+
+def print_table(rows):
+    columns = ['name', 'requests', 'errors', 'throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms']
+    print('  '.join(f"{c:>16}" for c in columns))
+    for row in rows:
+        print('  '.join(f"{str(row.get(c, '')):>16}" for c in columns))
@@ -0,0 +1,166 @@
+"""
+In-process stand-in for the HitPay API.
+
+Serves POST /payment-requests and GET /payment-requests/<id> like the
+sandbox does, with an optional artificial delay so benchmarks can model a
+slow provider, and an error rate to model a failing one.
+"""
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+def sign_webhook(fields, salt):
+    """HMAC HitPay puts in the webhook 'hmac' field: SHA-256 over the sorted key+value pairs."""
+    message = ''.join(f"{key}{value}" for key, value in sorted(fields.items()))
+    return hmac.new(salt.encode('utf-8'), message.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def webhook_payload(payment_request_id, status, salt, **extra):
+    """Signed form fields for a HitPay webhook about one payment request."""
+    fields = {
+        'payment_id': extra.pop('payment_id', None) or str(uuid.uuid4()),
+        'payment_request_id': payment_request_id,
+        'status': status,
+        'amount': extra.pop('amount', '10.00'),
+        'currency': extra.pop('currency', 'SGD'),
+        **extra,
+    }
+    return {**fields, 'hmac': sign_webhook(fields, salt)}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; without this, Nagle plus
+    # delayed ACKs add ~40ms to every keep-alive response.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _inject_fault(self):
+        """Apply the fake's latency and maybe answer with its error status; True if the request was handled."""
+        fake = self.server.fake
+        if fake.latency:
+            time.sleep(fake.latency)
+        with fake.lock:
+            fail = fake.fail_next > 0 or (fake.error_rate and fake.random.random() < fake.error_rate)
+            if fake.fail_next > 0:
+                fake.fail_next -= 1
+        if fail:
+            self._send_json(fake.error_status, {'message': 'Injected failure'})
+        return fail
+
+    def _send_json(self, status_code, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        fake = self.server.fake
+        if self._inject_fault():
+            return
+
+        request_id = self.path.rstrip('/').rsplit('/', 1)[-1]
+        with fake.lock:
+            form = fake.payment_requests.get(request_id)
+            hitpay_status = fake.statuses.get(request_id, 'pending')
+        if form is None:
+            self._send_json(404, {'message': 'No query results for model [PaymentRequest].'})
+            return
+
+        payments = []
+        if hitpay_status in ('completed', 'failed'):
+            payments.append({'id': f"pay-{request_id}", 'status': 'succeeded' if hitpay_status == 'completed' else 'failed'})
+        self._send_json(200, {
+            'id': request_id,
+            'reference_number': form.get('reference_number'),
+            'status': hitpay_status,
+            'payments': payments,
+        })
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode('utf-8')).items()}
+        if self._inject_fault():
+            return
+
+        fake = self.server.fake
+        if self.path.rstrip('/').endswith('/payment-requests'):
+            request_id = str(uuid.uuid4())
+            with fake.lock:
+                fake.payment_requests[request_id] = form
+            self._send_json(201, {
+                'id': request_id,
+                'url': f"{fake.base_url}/checkout/{request_id}",
+                'reference_number': form.get('reference_number'),
+                'status': 'pending',
+            })
+        else:
+            self._send_json(404, {'message': 'Not found'})
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients that time out hang up mid-response; that is expected here
+        pass
+
+
+class FakeHitPay:
+    """
+    Run with ``with FakeHitPay(latency=0.2) as hitpay: ...`` and point HITPAY_API_BASE at hitpay.base_url.
+
+    latency, error_rate (0-1) and error_status can be changed while running;
+    fail_next makes the next N requests fail.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, error_status=503, fail_next=0, host='127.0.0.1', port=0,
+                 seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.fail_next = fail_next
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.payment_requests = {}
+        self.statuses = {}
+        self._server = _Server((host, port), _Handler)
+        self._server.fake = self
+        self._thread = None
+
+    def register(self, request_id, status='pending', **form):
+        """Make a payment request known to the fake, e.g. for rows created directly in the DB."""
+        with self.lock:
+            self.payment_requests[request_id] = form
+            self.statuses[request_id] = status
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,183 @@
+"""
+Repeatable benchmark suite for the api endpoints.
+
+Runs each scenario through the full Django request stack against a throwaway
+database and an in-process HitPay stand-in, then prints throughput and
+p50/p95/p99 latency and writes them as JSON to benchmarks/results/.
+
+Scenarios:
+  create   POST /api/payments/create/ (HitPay stand-in with --latency delay)
+  webhook  POST /api/payments/hitpay/webhook/ with webhooks signed with HITPAY_SALT
+  status   GET  /api/payments/status/<reference_number>/ polling
+  reviews  GET  /api/reviews/ (page-number and cursor pages)
+
+    python -m benchmarks.run --requests 500 --concurrency 1 8 32
+    python -m benchmarks.run --scenarios status reviews --compare benchmarks/results/<previous>.json
+"""
+import argparse
+import json
+import platform
+import random
+import subprocess
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.common import BACKEND_DIR, print_table, run_concurrent, setup_django
+from benchmarks.fake_hitpay import FakeHitPay, webhook_payload
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+SCENARIOS = ('create', 'webhook', 'status', 'reviews')
+
+_local = threading.local()
+
+
+def _client():
+    from django.test import Client
+
+    if not hasattr(_local, 'client'):
+        _local.client = Client()
+    return _local.client
+
+
+def _seed_payments(count, with_request_id=False):
+    from api.models import Payment
+
+    payments = [
+        Payment(
+            reference_number=str(uuid.uuid4()),
+            payment_request_id=str(uuid.uuid4()) if with_request_id else None,
+            amount='10.00',
+            name='Bench User',
+            email='bench@example.com',
+        )
+        for _ in range(count)
+    ]
+    Payment.objects.bulk_create(payments, batch_size=500)
+    return payments
+
+
+def scenario_create(total, concurrency, args):
+    payload = {'name': 'Bench User', 'email': 'bench@example.com', 'amount': '10.00', 'currency': 'SGD'}
+
+    def call(i):
+        response = _client().post('/api/payments/create/', payload, content_type='application/json')
+        return response.status_code == 200
+
+    return run_concurrent(f'create x{concurrency}', call, total, concurrency)
+
+
+def scenario_webhook(total, concurrency, args):
+    from django.conf import settings
+
+    payments = _seed_payments(total, with_request_id=True)
+    bodies = [
+        webhook_payload(payment.payment_request_id, random.choice(['completed', 'failed']), settings.HITPAY_SALT)
+        for payment in payments
+    ]
+
+    def call(i):
+        return _client().post('/api/payments/hitpay/webhook/', bodies[i]).status_code == 200
+
+    return run_concurrent(f'webhook x{concurrency}', call, total, concurrency)
+
+
+def scenario_status(total, concurrency, args):
+    references = [str(p.reference_number) for p in _seed_payments(args.payments)]
+
+    def call(i):
+        response = _client().get(f'/api/payments/status/{references[i % len(references)]}/')
+        return response.status_code == 200
+
+    return run_concurrent(f'status x{concurrency}', call, total, concurrency)
+
+
+def scenario_reviews(total, concurrency, args):
+    from api.models import Review, ReviewStats
+
+    if not Review.objects.exists():
+        Review.objects.bulk_create(
+            [Review(author_name=f'Reviewer {i}', rating=i % 5 + 1, text='Great trip. ' * 20) for i in range(args.reviews)],
+            batch_size=500,
+        )
+        ReviewStats.rebuild()
+    pages = max(1, args.reviews // 10)
+
+    def call(i):
+        url = '/api/reviews/?pagination=cursor' if i % 2 else f'/api/reviews/?page={i % pages + 1}'
+        return _client().get(url).status_code == 200
+
+    return run_concurrent(f'reviews x{concurrency}', call, total, concurrency)
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def _compare(rows, previous_path):
+    previous = {row['name']: row for row in json.loads(Path(previous_path).read_text())['results']}
+    print(f"\nChange vs {previous_path}:")
+    for row in rows:
+        before = previous.get(row['name'])
+        if not before:
+            continue
+        deltas = []
+        for key in ('throughput_rps', 'p50_ms', 'p99_ms'):
+            if before[key]:
+                deltas.append(f"{key} {(row[key] - before[key]) / before[key] * 100:+.1f}%")
+        print(f"  {row['name']:>16}  " + '  '.join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=500, help='requests per scenario and concurrency level')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds of HitPay stand-in delay')
+    parser.add_argument('--payments', type=int, default=1000, help='payments seeded for status polling')
+    parser.add_argument('--reviews', type=int, default=1000, help='reviews seeded for the reviews list')
+    parser.add_argument('--output', type=Path, default=None, help='results file (default: benchmarks/results/)')
+    parser.add_argument('--compare', type=Path, default=None, help='previous results file to diff against')
+    args = parser.parse_args()
+
+    setup_django()
+    import django
+    from django.conf import settings
+
+    rows = []
+    with FakeHitPay(latency=args.latency) as fake:
+        settings.HITPAY_API_BASE = fake.base_url
+        for name in args.scenarios:
+            scenario = globals()[f'scenario_{name}']
+            for concurrency in args.concurrency:
+                rows.append(scenario(args.requests, concurrency, args))
+
+    print_table(rows)
+
+    revision = _git_revision()
+    generated_at = datetime.now(timezone.utc)
+    output = args.output or RESULTS_DIR / f"{generated_at:%Y%m%dT%H%M%SZ}-{revision}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        'revision': revision,
+        'generated_at': generated_at.isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': settings.DATABASES['default']['ENGINE'],
+        'options': {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+        'results': rows,
+    }, indent=2))
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        _compare(rows, args.compare)
+
+
+if __name__ == '__main__':
+    main()
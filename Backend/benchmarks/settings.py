@@ -0,0 +1,20 @@
+# Settings used by the benchmark scripts: the project settings pointed at a
+# throwaway database so runs never touch db.sqlite3.
+import os
+import tempfile
+
+from backend.settings import *  # noqa: F401,F403
+
+BENCH_DB = os.getenv("BENCH_DB") or os.path.join(tempfile.gettempdir(), "goeasytrip-bench.sqlite3")
+
+DATABASES = {
+    'default': {
+        **DATABASES['default'],  # noqa: F405
+        'NAME': BENCH_DB,
+    }
+}
+
+HITPAY_API_KEY = HITPAY_API_KEY or "bench-api-key"  # noqa: F405
+HITPAY_SALT = HITPAY_SALT or "bench-salt"  # noqa: F405
+
+ALLOWED_HOSTS = ['testserver', 'localhost', '127.0.0.1']
@@ -2,7 +2,7 @@ import { useState, useEffect } from 'react';
 import { useSearchParams } from 'react-router-dom';
 import { CheckCircle, XCircle, Loader2, AlertCircle } from 'lucide-react';
 import { Button } from '@/components/ui/button';
-import { paymentService } from '@/services/paymentService';
+import { paymentService, type PaymentStatus as PaymentStatusData } from '@/services/paymentService';
 
 const PaymentStatus = () => {
   const [searchParams] = useSearchParams();
@@ -52,30 +52,25 @@ const PaymentStatus = () => {
   };
 
   const pollForStatusUpdate = async (refNumber: string, maxAttempts = 5) => {
-    for (let attempt = 0; attempt < maxAttempts; attempt++) {
-      try {
-        console.log(`Polling attempt ${attempt + 1} for payment status...`);
-        await new Promise(resolve => setTimeout(resolve, 3000)); // Wait 3 seconds
-        
-        const status = await paymentService.getPaymentStatus(refNumber);
-        console.log(`Attempt ${attempt + 1} - Status:`, status);
-        
+    try {
+      // Waits on the status stream, falling back to polling if it is unavailable
+      const showStatus = (status: PaymentStatusData) => {
+        console.log('Payment status update:', status);
+
         if (status.status === 'completed') {
           setPaymentStatus('success');
           setPaymentDetails(status);
-          return;
         } else if (status.status === 'failed') {
           setPaymentStatus('failed');
           setPaymentDetails(status);
-          return;
         }
-      } catch (error) {
-        console.error(`Polling attempt ${attempt + 1} failed:`, error);
-      }
+      };
+      // A failed payment is shown straight away but can still turn completed on a card retry
+      showStatus(await paymentService.pollPaymentStatus(refNumber, maxAttempts, 3000, showStatus));
+    } catch (error) {
+      // If still pending after waiting, show a message
+      console.log('Payment still pending after polling attempts');
     }
-    
-    // If still pending after all attempts, show a message
-    console.log('Payment still pending after polling attempts');
   };
 
   const handleRetry = () => {
@@ -2,7 +2,7 @@ import { useState, useEffect } from 'react';
 import { useSearchParams } from 'react-router-dom';
 import { CheckCircle, XCircle, Loader2 } from 'lucide-react';
 import { Button } from '@/components/ui/button';
-import { paymentService } from '@/services/paymentService';
+import { paymentService, type PaymentStatus } from '@/services/paymentService';
 
 const PaymentSuccess = () => {
   const [searchParams] = useSearchParams();
@@ -21,20 +21,26 @@ const PaymentSuccess = () => {
     }
   }, [referenceNumber]);
 
+  const showStatus = (status: PaymentStatus) => {
+    setPaymentDetails(status);
+
+    if (status.status === 'completed') {
+      setPaymentStatus('success');
+    } else if (status.status === 'failed') {
+      setPaymentStatus('failed');
+    }
+  };
+
   const checkPaymentStatus = async (refNumber: string) => {
     try {
       setPaymentStatus('checking');
       
-      // Poll for payment status
-      const status = await paymentService.pollPaymentStatus(refNumber);
-      
-      setPaymentDetails(status);
+      // Poll for payment status; a failed payment is shown straight away but can
+      // still turn completed if the customer retries the card
+      const status = await paymentService.pollPaymentStatus(refNumber, 30, 2000, showStatus);
       
-      if (status.status === 'completed') {
-        setPaymentStatus('success');
-      } else if (status.status === 'failed') {
-        setPaymentStatus('failed');
-      } else {
+      showStatus(status);
+      if (status.status !== 'completed' && status.status !== 'failed') {
         setPaymentStatus('pending');
       }
       
@@ -26,10 +26,26 @@ export interface PaymentStatus {
   paid_at?: string;
 }
 
+// A failed payment can still complete if the customer retries the card, so it isn't terminal
+const TERMINAL_STATUSES = ['completed', 'cancelled'];
+const FIRST_EVENT_TIMEOUT_MS = 5000;
+
 class PaymentService {
+  // Idempotency-Key per pending payment, reused when the same payment is retried
+  // (e.g. after a timeout) so the backend replays the original checkout instead
+  // of creating a second one.
+  private idempotencyKeys = new Map<string, string>();
+
   // Create payment request
   async createPayment(data: PaymentRequestData): Promise<PaymentResponse> {
     console.log('Creating payment request...', data);
+
+    const attempt = JSON.stringify(data);
+    let idempotencyKey = this.idempotencyKeys.get(attempt);
+    if (!idempotencyKey) {
+      idempotencyKey = crypto.randomUUID();
+      this.idempotencyKeys.set(attempt, idempotencyKey);
+    }
     
     const controller = new AbortController();
     const timeoutId = setTimeout(() => controller.abort(), 15000); // 15 second timeout
@@ -39,6 +55,7 @@ class PaymentService {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Idempotency-Key': idempotencyKey,
         },
         body: JSON.stringify(data),
         signal: controller.signal,
@@ -48,11 +65,16 @@ class PaymentService {
       console.log('Payment API response status:', response.status);
 
       if (!response.ok) {
+        // A request still in progress (409) can be retried with the same key
+        if (response.status !== 409) {
+          this.idempotencyKeys.delete(attempt);
+        }
         const errorData = await response.json();
         throw new Error(errorData.error || 'Failed to create payment');
       }
 
       const result = await response.json();
+      this.idempotencyKeys.delete(attempt);
       console.log('Payment created successfully:', result);
       return result;
     } catch (error) {
@@ -76,25 +98,106 @@ class PaymentService {
     return response.json();
   }
 
-  // Poll payment status
-  async pollPaymentStatus(referenceNumber: string, maxAttempts = 30): Promise<PaymentStatus> {
+  // Wait for a terminal status over the server-sent event stream, passing every
+  // status to onStatus. Resolves with a failed status still standing at the timeout,
+  // and null if the stream is unavailable, buffered or silent (no event after the
+  // initial status) so callers can fall back to polling.
+  streamPaymentStatus(
+    referenceNumber: string,
+    timeoutMs: number,
+    onStatus?: (status: PaymentStatus) => void
+  ): Promise<PaymentStatus | null> {
+    return new Promise((resolve, reject) => {
+      const source = new EventSource(`${API_BASE_URL}/payments/status/${referenceNumber}/stream/`);
+      let events = 0;
+      let last: PaymentStatus | null = null;
+
+      const finish = (callback: () => void) => {
+        clearTimeout(timeoutId);
+        clearTimeout(firstEventTimeoutId);
+        source.close();
+        callback();
+      };
+      const timeoutId = setTimeout(
+        () => finish(() => {
+          if (last?.status === 'failed') {
+            resolve(last);
+          } else if (events > 1) {
+            reject(new Error('Payment status polling timeout'));
+          } else {
+            resolve(null);
+          }
+        }),
+        timeoutMs
+      );
+      // The initial status is sent straight away; nothing by now means a proxy is buffering the stream
+      const firstEventTimeoutId = setTimeout(
+        () => {
+          if (events === 0) {
+            finish(() => resolve(null));
+          }
+        },
+        Math.min(FIRST_EVENT_TIMEOUT_MS, timeoutMs)
+      );
+
+      source.addEventListener('status', (event) => {
+        events++;
+        const status: PaymentStatus = JSON.parse((event as MessageEvent).data);
+        last = status;
+        onStatus?.(status);
+        if (TERMINAL_STATUSES.includes(status.status)) {
+          finish(() => resolve(status));
+        }
+      });
+
+      source.onerror = () => {
+        // EventSource reconnects on its own after a dropped stream; only give up
+        // if we never got an event or the browser has closed it for good.
+        if (events === 0 || source.readyState === EventSource.CLOSED) {
+          finish(() => resolve(null));
+        }
+      };
+    });
+  }
+
+  // Wait for payment status, preferring the push stream over polling every intervalMs
+  async pollPaymentStatus(
+    referenceNumber: string,
+    maxAttempts = 30,
+    intervalMs = 2000,
+    onStatus?: (status: PaymentStatus) => void
+  ): Promise<PaymentStatus> {
+    if (typeof EventSource !== 'undefined') {
+      const status = await this.streamPaymentStatus(referenceNumber, maxAttempts * intervalMs, onStatus);
+      if (status) {
+        return status;
+      }
+    }
+
+    let last: PaymentStatus | null = null;
     for (let attempt = 0; attempt < maxAttempts; attempt++) {
       try {
         const status = await this.getPaymentStatus(referenceNumber);
+        last = status;
+        onStatus?.(status);
         
-        // If payment is completed or failed, return the status
-        if (status.status === 'completed' || status.status === 'failed') {
+        // If payment is completed or cancelled, return the status
+        if (TERMINAL_STATUSES.includes(status.status)) {
           return status;
         }
         
-        // Wait 2 seconds before next attempt
-        await new Promise(resolve => setTimeout(resolve, 2000));
+        // Wait before next attempt
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
       } catch (error) {
         console.error(`Polling attempt ${attempt + 1} failed:`, error);
-        await new Promise(resolve => setTimeout(resolve, 2000));
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
       }
     }
     
+    // Failed and not retried within the wait
+    if (last?.status === 'failed') {
+      return last;
+    }
     throw new Error('Payment status polling timeout');
   }
 }